@@ -0,0 +1,133 @@
+"""
+Offline dataset files for the seeder.
+
+Rows are the seeder's generated documents with two extra columns: ``_path`` (the
+Firestore document path, so an export can be replayed into a store) and ``id``.
+Each collection gets its own directory of chunk files:
+
+    <dir>/<collection>/part-00000.ndjson[.gz]    one JSON object per line
+    <dir>/<collection>/part-00000.parquet        one Parquet file per chunk
+
+Writers consume generators chunk by chunk, so an export never holds more than
+``chunk_rows`` documents in memory. Parquet needs pyarrow.
+"""
+
+import glob
+import gzip
+import json
+import os
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+FORMATS = ('ndjson', 'parquet')
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _parse_dates(row: Dict[str, Any]) -> Dict[str, Any]:
+    # NDJSON has no timestamp type; the seeder's timestamp fields are all named *At
+    for key, value in row.items():
+        if key.endswith('At') and isinstance(value, str):
+            try:
+                row[key] = datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    return row
+
+
+def _to_row(path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {'_path': path, 'id': path.rsplit('/', 1)[-1], **data}
+
+
+class DatasetWriter:
+    """Writes (path, data) generators into chunked per-collection files."""
+
+    def __init__(self, output_dir: str, fmt: str = 'ndjson', chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 compress: bool = False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'; expected one of {', '.join(FORMATS)}")
+        if fmt == 'parquet' and pa is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.chunk_rows = max(1, chunk_rows)
+        self.compress = compress
+
+    def write(self, collection: str, docs: Iterable[Tuple[str, Dict[str, Any]]]) -> Tuple[int, List[str]]:
+        """Write one collection; returns (row count, file paths)."""
+        directory = os.path.join(self.output_dir, collection)
+        os.makedirs(directory, exist_ok=True)
+        # Replace any earlier export of this collection
+        for stale in glob.glob(os.path.join(directory, 'part-*')):
+            os.remove(stale)
+
+        docs = iter(docs)
+        rows, files = 0, []
+        schema = None
+        while True:
+            chunk = [_to_row(path, data) for path, data in islice(docs, self.chunk_rows)]
+            if not chunk:
+                break
+            part = os.path.join(directory, f'part-{len(files):05d}')
+            if self.fmt == 'ndjson':
+                part += '.ndjson.gz' if self.compress else '.ndjson'
+                opener = gzip.open if self.compress else open
+                with opener(part, 'wt', encoding='utf-8') as f:
+                    for row in chunk:
+                        f.write(json.dumps(row, default=_json_default, separators=(',', ':')))
+                        f.write('\n')
+            else:
+                part += '.parquet'
+                # Later chunks reuse the first chunk's schema so all parts read as one dataset
+                table = pa.Table.from_pylist(chunk, schema=schema)
+                schema = table.schema
+                pq.write_table(table, part, compression='zstd' if self.compress else 'snappy')
+            rows += len(chunk)
+            files.append(part)
+        return rows, files
+
+
+def collections(input_dir: str) -> List[str]:
+    """Collections present in an export directory."""
+    return sorted(name for name in os.listdir(input_dir)
+                  if glob.glob(os.path.join(input_dir, name, 'part-*')))
+
+
+def iter_rows(input_dir: str, collection: str, columns: Optional[List[str]] = None,
+              batch_rows: int = 65_536) -> Iterator[Dict[str, Any]]:
+    """Stream rows of one exported collection, whichever format it was written in."""
+    for part in sorted(glob.glob(os.path.join(input_dir, collection, 'part-*'))):
+        if part.endswith('.parquet'):
+            if pq is None:
+                raise RuntimeError("Reading Parquet exports requires pyarrow (pip install pyarrow)")
+            for batch in pq.ParquetFile(part).iter_batches(batch_size=batch_rows, columns=columns):
+                yield from batch.to_pylist()
+        else:
+            opener = gzip.open if part.endswith('.gz') else open
+            with opener(part, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    row = _parse_dates(json.loads(line))
+                    if columns is not None:
+                        row = {k: row.get(k) for k in columns}
+                    yield row
+
+
+def iter_documents(input_dir: str, collection: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Stream (path, data) pairs back out of an export, e.g. to seed a store from it."""
+    for row in iter_rows(input_dir, collection):
+        path = row.pop('_path')
+        row.pop('id', None)
+        yield path, {k: v for k, v in row.items() if v is not None}
@@ -2,56 +2,186 @@
 """
 Database seeding script for the Digital Psychological Intervention System.
 This script populates the Firestore database with mock data for testing and development.
+
+Documents are generated lazily and written in WriteBatch commits (up to 500
+writes each) spread over a thread pool, so large datasets never sit in memory
+and seeding is bounded by Firestore throughput rather than round-trip latency.
+
+Usage:
+    python seed_database.py                              # default volumes
+    python seed_database.py --scale 100 --seed 7         # every volume x100, reproducible
+    python seed_database.py --students 100000 --mood-scores 10000000 --workers 32
+    python seed_database.py --scale 1000 --seed 7 --export data/ --format parquet
+    python seed_database.py --from-export data/
 """
 
+import argparse
 import json
 import random
+import string
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-import firebase_admin
-from firebase_admin import credentials, firestore
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import os
 from dotenv import load_dotenv
 
+from dataset_export import DEFAULT_CHUNK_ROWS, FORMATS, DatasetWriter, collections as export_collections, iter_documents
+
 # Load environment variables
 load_dotenv()
 
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+# Volumes written by seed_all() at --scale 1
+DEFAULT_COUNTS = {
+    'students': 50,
+    'counsellors': 10,
+    'appointments': 100,
+    'forum_posts': 50,
+    'journal_entries': 200,
+    'resources': 30,
+    'assessments': 100,
+    'mood_scores': 500,
+    'availability_days': 14,
+}
+
+
+class _Progress:
+    """Counts committed documents for one collection and reports throughput periodically."""
+
+    def __init__(self, label: str, enabled: bool, interval: float = 2.0):
+        self.label = label
+        self.enabled = enabled
+        self.interval = interval
+        self.count = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def add(self, n: int):
+        self.count += n
+        now = time.perf_counter()
+        if self.enabled and now - self._last_report >= self.interval:
+            self._last_report = now
+            rate = self.count / (now - self.started)
+            print(f"   … {self.label}: {self.count:,} written ({rate:,.0f}/s)", flush=True)
+
+    def finish(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        if self.enabled:
+            rate = self.count / elapsed if elapsed else 0.0
+            print(f"   ✅ {self.label}: {self.count:,} written in {elapsed:.1f}s ({rate:,.0f}/s)", flush=True)
+        return elapsed
+
+
 class DatabaseSeeder:
-    def __init__(self):
-        """Initialize the database seeder with Firebase connection."""
+    def __init__(self, db=None, verbose: bool = True, seed: Optional[int] = None,
+                 workers: int = 8, batch_size: int = MAX_BATCH_SIZE, connect: bool = True):
+        """
+        Initialize the database seeder with Firebase connection.
+        Pass db to seed another Firestore-compatible store (e.g. the backend's in-memory stand-in).
+        With the same seed, the generated documents and their ids are identical between runs.
+        connect=False skips Firebase entirely, for file exports.
+        """
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        # A fixed reference time keeps a seeded run's relative dates consistent
+        self.now = datetime.now()
+        self.counts: Dict[str, int] = {}
+        if db is not None or not connect:
+            self.db = db
+            return
         try:
+            # Imported here: google-cloud-firestore/gRPC dominate the script's startup time
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
             # Initialize Firebase
             if os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY'):
                 cred = credentials.Certificate(json.loads(os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY')))
             else:
                 cred = credentials.Certificate('firebase-service-account.json')
-            
+
             firebase_admin.initialize_app(cred)
             self.db = firestore.client()
             print("✅ Firebase initialized successfully")
         except Exception as e:
             print(f"❌ Firebase initialization failed: {e}")
             self.db = None
-    
-    def seed_users(self, count: int = 50) -> List[str]:
-        """Seed the database with mock users."""
-        if not self.db:
-            return []
-        
-        user_ids = []
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _auto_id(self) -> str:
+        """Firestore-style 20 character document id drawn from the seeded RNG."""
+        return ''.join(self.rng.choices(AUTO_ID_CHARS, k=20))
+
+    def _commit(self, chunk: List[Tuple[str, Dict[str, Any]]], attempts: int = 4) -> int:
+        for attempt in range(attempts):
+            try:
+                batch = self.db.batch()
+                for path, data in chunk:
+                    batch.set(self.db.document(path), data)
+                batch.commit()
+                return len(chunk)
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise
+                delay = 0.5 * 2 ** attempt
+                print(f"⚠️ Batch commit failed ({e}); retrying in {delay:.1f}s", file=sys.stderr)
+                time.sleep(delay)
+        return 0
+
+    def _write(self, label: str, docs: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Write (document path, data) pairs in batches across the thread pool.
+        At most two batches per worker are in flight, so memory stays flat however
+        many documents the generator yields.
+        """
+        progress = _Progress(label, self.verbose)
+        docs = iter(docs)
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='seeder') as pool:
+            while True:
+                chunk = list(islice(docs, self.batch_size))
+                if not chunk:
+                    break
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        progress.add(future.result())
+                pending.add(pool.submit(self._commit, chunk))
+            for future in wait(pending).done:
+                progress.add(future.result())
+        progress.finish()
+        self.counts[label] = self.counts.get(label, 0) + progress.count
+        return progress.count
+
+    # ---------------- generators ----------------
+
+    def generate_users(self, count: int, ids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for mock students; their ids are appended to ids."""
         first_names = ['John', 'Sarah', 'Mike', 'Emily', 'David', 'Lisa', 'Chris', 'Amy', 'Alex', 'Jordan']
         last_names = ['Doe', 'Smith', 'Johnson', 'Brown', 'Davis', 'Wilson', 'Miller', 'Garcia', 'Martinez', 'Anderson']
         colleges = ['University of Technology', 'State University', 'Community College', 'Technical Institute']
         years = ['1st Year', '2nd Year', '3rd Year', '4th Year', 'Graduate']
         interests = ['Computer Science', 'Psychology', 'Engineering', 'Art', 'Music', 'Sports', 'Reading', 'Gaming']
-        
+        rng = self.rng
+
         for i in range(count):
-            first_name = random.choice(first_names)
-            last_name = random.choice(last_names)
-            college = random.choice(colleges)
-            year = random.choice(years)
-            user_interests = random.sample(interests, random.randint(2, 4))
-            
+            first_name = rng.choice(first_names)
+            last_name = rng.choice(last_names)
+            college = rng.choice(colleges)
+            year = rng.choice(years)
+            user_interests = rng.sample(interests, rng.randint(2, 4))
+
             user_data = {
                 'email': f'{first_name.lower()}.{last_name.lower()}@university.edu',
                 'displayName': f'{first_name} {last_name}',
@@ -59,29 +189,23 @@ class DatabaseSeeder:
                 'collegeEmail': f'{first_name.lower()}.{last_name.lower()}@university.edu',
                 'collegeName': college,
                 'year': year,
-                'phone': f'555-{random.randint(1000, 9999)}',
+                'phone': f'555-{rng.randint(1000, 9999)}',
                 'profile': {
-                    'age': random.randint(18, 25),
-                    'gender': random.choice(['Male', 'Female', 'Other']),
+                    'age': rng.randint(18, 25),
+                    'gender': rng.choice(['Male', 'Female', 'Other']),
                     'interests': user_interests
                 },
-                'createdAt': datetime.now() - timedelta(days=random.randint(1, 365)),
+                'createdAt': self.now - timedelta(days=rng.randint(1, 365)),
                 'isVerified': True
             }
-            
-            # Add user to Firestore
-            doc_ref = self.db.collection('users').add(user_data)
-            user_ids.append(doc_ref[1].id)
-            print(f"✅ Created user: {first_name} {last_name}")
-        
-        return user_ids
-    
-    def seed_counsellors(self, count: int = 10) -> List[str]:
-        """Seed the database with mock counsellors."""
-        if not self.db:
-            return []
-        
-        counsellor_ids = []
+
+            doc_id = self._auto_id()
+            if ids is not None:
+                ids.append(doc_id)
+            yield f'users/{doc_id}', user_data
+
+    def generate_counsellors(self, count: int, ids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for mock counsellors; their ids are appended to ids."""
         first_names = ['Dr. Sarah', 'Dr. Michael', 'Dr. Emily', 'Dr. James', 'Dr. Lisa']
         last_names = ['Johnson', 'Chen', 'Rodriguez', 'Wilson', 'Brown']
         specializations = [
@@ -91,48 +215,47 @@ class DatabaseSeeder:
             'Relationship & Social Issues',
             'Trauma & PTSD'
         ]
-        
+        rng = self.rng
+
         for i in range(count):
-            first_name = random.choice(first_names)
-            last_name = random.choice(last_names)
-            specialization = random.choice(specializations)
-            
+            first_name = rng.choice(first_names)
+            last_name = rng.choice(last_names)
+            specialization = rng.choice(specializations)
+
             counsellor_data = {
                 'email': f'{first_name.lower()}.{last_name.lower()}@university.edu',
                 'displayName': f'{first_name} {last_name}',
                 'role': 'counsellor',
                 'specialization': specialization,
-                'experience': f'{random.randint(3, 15)} years',
-                'rating': round(random.uniform(4.0, 5.0), 1),
-                'availableSlots': random.sample([
+                'experience': f'{rng.randint(3, 15)} years',
+                'rating': round(rng.uniform(4.0, 5.0), 1),
+                'availableSlots': rng.sample([
                     '09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
                     '12:00', '12:30', '13:00', '13:30', '14:00', '14:30',
                     '15:00', '15:30', '16:00', '16:30', '17:00', '17:30'
-                ], random.randint(4, 8)),
-                'createdAt': datetime.now() - timedelta(days=random.randint(30, 365)),
+                ], rng.randint(4, 8)),
+                'createdAt': self.now - timedelta(days=rng.randint(30, 365)),
                 'isVerified': True
             }
-            
-            doc_ref = self.db.collection('users').add(counsellor_data)
-            counsellor_ids.append(doc_ref[1].id)
-            print(f"✅ Created counsellor: {first_name} {last_name}")
-        
-        return counsellor_ids
-    
-    def seed_appointments(self, user_ids: List[str], counsellor_ids: List[str], count: int = 100):
-        """Seed the database with mock appointments."""
-        if not self.db:
-            return
-        
+
+            doc_id = self._auto_id()
+            if ids is not None:
+                ids.append(doc_id)
+            yield f'users/{doc_id}', counsellor_data
+
+    def generate_appointments(self, user_ids: List[str], counsellor_ids: List[str], count: int,
+                              ids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for mock appointments; their ids are appended to ids."""
         reasons = ['anxiety', 'depression', 'academic', 'relationships', 'other']
         session_types = ['video', 'phone', 'in-person']
         statuses = ['pending', 'confirmed', 'completed', 'cancelled']
-        
+        rng = self.rng
+
         for i in range(count):
-            student_id = random.choice(user_ids)
-            counsellor_id = random.choice(counsellor_ids)
-            appointment_date = datetime.now() + timedelta(days=random.randint(1, 30))
-            
+            student_id = rng.choice(user_ids)
+            counsellor_id = rng.choice(counsellor_ids)
+            appointment_date = self.now + timedelta(days=rng.randint(1, 30))
+
             appointment_data = {
                 'studentId': student_id,
                 'studentName': f'Student {i+1}',
@@ -140,25 +263,24 @@ class DatabaseSeeder:
                 'counsellorId': counsellor_id,
                 'counsellorName': f'Dr. Counsellor {i+1}',
                 'appointmentDate': appointment_date.strftime('%Y-%m-%d'),
-                'appointmentTime': random.choice(['09:00', '10:00', '11:00', '14:00', '15:00', '16:00']),
-                'sessionType': random.choice(session_types),
+                'appointmentTime': rng.choice(['09:00', '10:00', '11:00', '14:00', '15:00', '16:00']),
+                'sessionType': rng.choice(session_types),
                 'duration': '50 minutes',
-                'status': random.choice(statuses),
-                'reason': random.choice(reasons),
-                'urgency': random.choice(['low', 'medium', 'high']),
-                'previousCounseling': random.choice(['yes', 'no']),
+                'status': rng.choice(statuses),
+                'reason': rng.choice(reasons),
+                'urgency': rng.choice(['low', 'medium', 'high']),
+                'previousCounseling': rng.choice(['yes', 'no']),
                 'notes': f'Mock appointment notes for appointment {i+1}',
-                'createdAt': datetime.now() - timedelta(days=random.randint(1, 30))
+                'createdAt': self.now - timedelta(days=rng.randint(1, 30))
             }
-            
-            self.db.collection('appointments').add(appointment_data)
-            print(f"✅ Created appointment {i+1}")
-    
-    def seed_forum_posts(self, user_ids: List[str], count: int = 50):
-        """Seed the database with mock forum posts."""
-        if not self.db:
-            return
-        
+
+            doc_id = self._auto_id()
+            if ids is not None:
+                ids.append(doc_id)
+            yield f'appointments/{doc_id}', appointment_data
+
+    def generate_forum_posts(self, user_ids: List[str], count: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for mock forum posts."""
         categories = ['academic_stress', 'anxiety', 'depression', 'sleep', 'relationships', 'general']
         titles = [
             'Feeling overwhelmed with finals',
@@ -170,32 +292,29 @@ class DatabaseSeeder:
             'Managing time effectively',
             'Dealing with peer pressure'
         ]
-        
+        rng = self.rng
+
         for i in range(count):
-            user_id = random.choice(user_ids)
-            title = random.choice(titles)
-            category = random.choice(categories)
-            
+            user_id = rng.choice(user_ids)
+            title = rng.choice(titles)
+            category = rng.choice(categories)
+
             post_data = {
                 'userId': user_id,
-                'username': f'AnonymousStudent{random.randint(1, 1000)}',
+                'username': f'AnonymousStudent{rng.randint(1, 1000)}',
                 'title': title,
                 'content': f'This is a mock forum post about {category}. Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.',
                 'category': category,
-                'likes': random.randint(0, 50),
-                'comments': random.randint(0, 20),
-                'createdAt': datetime.now() - timedelta(days=random.randint(1, 90)),
+                'likes': rng.randint(0, 50),
+                'comments': rng.randint(0, 20),
+                'createdAt': self.now - timedelta(days=rng.randint(1, 90)),
                 'tags': [category, 'support', 'community']
             }
-            
-            self.db.collection('forum_posts').add(post_data)
-            print(f"✅ Created forum post {i+1}")
-    
-    def seed_journal_entries(self, user_ids: List[str], count: int = 200):
-        """Seed the database with mock journal entries."""
-        if not self.db:
-            return
-        
+
+            yield f'forum_posts/{self._auto_id()}', post_data
+
+    def generate_journal_entries(self, user_ids: List[str], count: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for mock journal entries."""
         titles = [
             'Feeling better today',
             'Struggling with anxiety',
@@ -206,28 +325,25 @@ class DatabaseSeeder:
             'Need to talk to someone',
             'Feeling hopeful'
         ]
-        
+        rng = self.rng
+
         for i in range(count):
-            user_id = random.choice(user_ids)
-            title = random.choice(titles)
-            
+            user_id = rng.choice(user_ids)
+            title = rng.choice(titles)
+
             entry_data = {
                 'userId': user_id,
                 'title': title,
                 'content': f'This is a mock journal entry. Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.',
-                'mood': random.randint(1, 10),
-                'tags': random.sample(['positive', 'negative', 'neutral', 'anxiety', 'stress', 'happy', 'sad'], random.randint(1, 3)),
-                'createdAt': datetime.now() - timedelta(days=random.randint(1, 180))
+                'mood': rng.randint(1, 10),
+                'tags': rng.sample(['positive', 'negative', 'neutral', 'anxiety', 'stress', 'happy', 'sad'], rng.randint(1, 3)),
+                'createdAt': self.now - timedelta(days=rng.randint(1, 180))
             }
-            
-            self.db.collection('journal_entries').add(entry_data)
-            print(f"✅ Created journal entry {i+1}")
-    
-    def seed_resources(self, count: int = 30):
-        """Seed the database with mock resources."""
-        if not self.db:
-            return
-        
+
+            yield f'journal_entries/{self._auto_id()}', entry_data
+
+    def generate_resources(self, count: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for mock resources."""
         categories = ['academic_stress', 'anxiety', 'depression', 'sleep', 'relationships']
         types = ['article', 'video', 'audio', 'guide']
         titles = [
@@ -240,12 +356,13 @@ class DatabaseSeeder:
             'Mindfulness and Meditation',
             'Coping with Rejection'
         ]
-        
+        rng = self.rng
+
         for i in range(count):
-            title = random.choice(titles)
-            category = random.choice(categories)
-            resource_type = random.choice(types)
-            
+            title = rng.choice(titles)
+            category = rng.choice(categories)
+            resource_type = rng.choice(types)
+
             resource_data = {
                 'title': title,
                 'description': f'A comprehensive resource about {category}. This resource provides valuable information and strategies.',
@@ -254,32 +371,29 @@ class DatabaseSeeder:
                 'url': f'https://example.com/{category}-{i+1}',
                 'language': 'English',
                 'tags': [category, 'support', 'mental-health'],
-                'createdAt': datetime.now() - timedelta(days=random.randint(1, 365)),
-                'views': random.randint(10, 500)
+                'createdAt': self.now - timedelta(days=rng.randint(1, 365)),
+                'views': rng.randint(10, 500)
             }
-            
-            self.db.collection('resources').add(resource_data)
-            print(f"✅ Created resource {i+1}")
-    
-    def seed_assessments(self, user_ids: List[str], count: int = 100):
-        """Seed the database with mock assessments."""
-        if not self.db:
-            return
-        
+
+            yield f'resources/{self._auto_id()}', resource_data
+
+    def generate_assessments(self, user_ids: List[str], count: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for mock PHQ-9 / GAD-7 assessments."""
         assessment_types = ['PHQ-9', 'GAD-7']
-        
+        rng = self.rng
+
         for i in range(count):
-            user_id = random.choice(user_ids)
-            assessment_type = random.choice(assessment_types)
-            
+            user_id = rng.choice(user_ids)
+            assessment_type = rng.choice(assessment_types)
+
             # Generate random responses
             if assessment_type == 'PHQ-9':
-                responses = [random.randint(0, 3) for _ in range(9)]
+                responses = [rng.randint(0, 3) for _ in range(9)]
             else:  # GAD-7
-                responses = [random.randint(0, 3) for _ in range(7)]
-            
+                responses = [rng.randint(0, 3) for _ in range(7)]
+
             score = sum(responses)
-            
+
             # Determine severity
             if assessment_type == 'PHQ-9':
                 if score < 5:
@@ -301,7 +415,7 @@ class DatabaseSeeder:
                     severity = 'moderate'
                 else:
                     severity = 'severe'
-            
+
             assessment_data = {
                 'userId': user_id,
                 'type': assessment_type,
@@ -313,55 +427,219 @@ class DatabaseSeeder:
                     'Consider counseling',
                     'Learn coping techniques'
                 ],
-                'createdAt': datetime.now() - timedelta(days=random.randint(1, 90))
+                'createdAt': self.now - timedelta(days=rng.randint(1, 90)),
+                'updatedAt': self.now
             }
-            
-            self.db.collection('assessments').add(assessment_data)
-            print(f"✅ Created {assessment_type} assessment {i+1}")
-    
-    def seed_all(self):
-        """Seed the database with all mock data."""
-        print("🌱 Starting database seeding...")
-        
-        # Seed users and counsellors
-        print("\n👥 Seeding users...")
-        user_ids = self.seed_users(50)
-        
-        print("\n👨‍⚕️ Seeding counsellors...")
-        counsellor_ids = self.seed_counsellors(10)
-        
-        # Seed other data
-        print("\n📅 Seeding appointments...")
-        self.seed_appointments(user_ids, counsellor_ids, 100)
-        
-        print("\n💬 Seeding forum posts...")
-        self.seed_forum_posts(user_ids, 50)
-        
-        print("\n📝 Seeding journal entries...")
-        self.seed_journal_entries(user_ids, 200)
-        
-        print("\n📚 Seeding resources...")
-        self.seed_resources(30)
-        
-        print("\n📊 Seeding assessments...")
-        self.seed_assessments(user_ids, 100)
-        
-        print("\n✅ Database seeding completed successfully!")
+
+            yield f'assessments/{self._auto_id()}', assessment_data
+
+    def generate_mood_scores(self, user_ids: List[str], count: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, data) for daily mood scores (0-100, as written by the student UI)."""
+        rng = self.rng
+
+        for i in range(count):
+            user_id = rng.choice(user_ids)
+            recorded_at = self.now - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 1440))
+
+            mood_data = {
+                'userId': user_id,
+                'score': rng.randint(10, 100),
+                'recordedAt': recorded_at,
+                'createdAt': recorded_at,
+                'updatedAt': self.now
+            }
+
+            yield f'mood_scores/{self._auto_id()}', mood_data
+
+    def generate_availability(self, counsellor_ids: List[str], days: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield per-day availability slots (counsellors/{id}/availability/{date}/slots/{time})."""
+        times = ['09:00', '10:00', '11:00', '12:00', '14:00', '15:00', '16:00', '17:00']
+        rng = self.rng
+
+        for counsellor_id in counsellor_ids:
+            for d in range(days):
+                date_key = (self.now + timedelta(days=d)).strftime('%Y-%m-%d')
+                for time_str in sorted(rng.sample(times, rng.randint(3, 6))):
+                    yield f"counsellors/{counsellor_id}/availability/{date_key}/slots/{time_str}", {
+                        'time': time_str,
+                        'date': date_key,
+                        'booked': False,
+                        'active': True,
+                        'updatedAt': self.now
+                    }
+
+    # ---------------- seeding ----------------
+
+    def seed_users(self, count: int = 50) -> List[str]:
+        """Seed the database with mock users."""
+        if not self.db:
+            return []
+        user_ids = []
+        self._write('users', self.generate_users(count, user_ids))
+        return user_ids
+
+    def seed_counsellors(self, count: int = 10) -> List[str]:
+        """Seed the database with mock counsellors."""
+        if not self.db:
+            return []
+        counsellor_ids = []
+        self._write('counsellors', self.generate_counsellors(count, counsellor_ids))
+        return counsellor_ids
+
+    def seed_appointments(self, user_ids: List[str], counsellor_ids: List[str], count: int = 100) -> List[str]:
+        """Seed the database with mock appointments."""
+        if not self.db:
+            return []
+        appointment_ids = []
+        self._write('appointments', self.generate_appointments(user_ids, counsellor_ids, count, appointment_ids))
+        return appointment_ids
+
+    def seed_forum_posts(self, user_ids: List[str], count: int = 50):
+        """Seed the database with mock forum posts."""
+        if not self.db:
+            return
+        self._write('forum_posts', self.generate_forum_posts(user_ids, count))
+
+    def seed_journal_entries(self, user_ids: List[str], count: int = 200):
+        """Seed the database with mock journal entries."""
+        if not self.db:
+            return
+        self._write('journal_entries', self.generate_journal_entries(user_ids, count))
+
+    def seed_resources(self, count: int = 30):
+        """Seed the database with mock resources."""
+        if not self.db:
+            return
+        self._write('resources', self.generate_resources(count))
+
+    def seed_assessments(self, user_ids: List[str], count: int = 100):
+        """Seed the database with mock assessments."""
+        if not self.db:
+            return
+        self._write('assessments', self.generate_assessments(user_ids, count))
+
+    def seed_mood_scores(self, user_ids: List[str], count: int = 500):
+        """Seed the database with mock daily mood scores."""
+        if not self.db:
+            return
+        self._write('mood_scores', self.generate_mood_scores(user_ids, count))
+
+    def seed_availability(self, counsellor_ids: List[str], days: int = 14):
+        """Seed per-day availability slots for every counsellor."""
+        if not self.db:
+            return
+        self._write('availability_slots', self.generate_availability(counsellor_ids, days))
+
+    def dataset(self, counts: Optional[Dict[str, int]] = None) -> Iterator[Tuple[str, str, Iterator[Tuple[str, Dict[str, Any]]]]]:
+        """
+        Yield (collection, heading, documents) for the full mock dataset in dependency order.
+        Consume each document generator fully before advancing: later collections
+        reference the student and counsellor ids collected along the way.
+        """
+        counts = {**DEFAULT_COUNTS, **(counts or {})}
+        user_ids, counsellor_ids = [], []
+        yield 'users', '👥 Seeding users...', self.generate_users(counts['students'], user_ids)
+        yield 'counsellors', '👨‍⚕️ Seeding counsellors...', self.generate_counsellors(counts['counsellors'], counsellor_ids)
+        yield 'appointments', '📅 Seeding appointments...', self.generate_appointments(user_ids, counsellor_ids, counts['appointments'])
+        yield 'forum_posts', '💬 Seeding forum posts...', self.generate_forum_posts(user_ids, counts['forum_posts'])
+        yield 'journal_entries', '📝 Seeding journal entries...', self.generate_journal_entries(user_ids, counts['journal_entries'])
+        yield 'resources', '📚 Seeding resources...', self.generate_resources(counts['resources'])
+        yield 'assessments', '📊 Seeding assessments...', self.generate_assessments(user_ids, counts['assessments'])
+        yield 'mood_scores', '🙂 Seeding mood scores...', self.generate_mood_scores(user_ids, counts['mood_scores'])
+        yield 'availability_slots', '🗓️ Seeding availability...', self.generate_availability(counsellor_ids, counts['availability_days'])
+
+    def _summary(self, verb: str, started: float):
+        elapsed = time.perf_counter() - started
+        total = sum(self.counts.values())
+        print(f"\n✅ {verb} completed in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} docs/s)")
         print(f"📈 Created:")
-        print(f"   - {len(user_ids)} users")
-        print(f"   - {len(counsellor_ids)} counsellors")
-        print(f"   - 100 appointments")
-        print(f"   - 50 forum posts")
-        print(f"   - 200 journal entries")
-        print(f"   - 30 resources")
-        print(f"   - 100 assessments")
+        for label, n in self.counts.items():
+            print(f"   - {n:,} {label.replace('_', ' ')}")
+
+    def seed_all(self, counts: Optional[Dict[str, int]] = None):
+        """Seed the database with all mock data (volumes default to DEFAULT_COUNTS)."""
+        if not self.db:
+            return
+        started = time.perf_counter()
+        self._log("🌱 Starting database seeding...")
+        for label, heading, docs in self.dataset(counts):
+            self._log(f"\n{heading}")
+            self._write(label, docs)
+        self._summary('Database seeding', started)
+
+    def export_all(self, output_dir: str, fmt: str = 'ndjson', counts: Optional[Dict[str, int]] = None,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS, compress: bool = False) -> Dict[str, List[str]]:
+        """
+        Stream the same dataset seed_all() would write into chunked NDJSON or Parquet
+        files under output_dir instead of a database. Returns the files per collection.
+        """
+        writer = DatasetWriter(output_dir, fmt=fmt, chunk_rows=chunk_rows, compress=compress)
+        started = time.perf_counter()
+        files = {}
+        self._log(f"📦 Exporting {fmt} dataset to {output_dir}...")
+        for label, heading, docs in self.dataset(counts):
+            part_started = time.perf_counter()
+            rows, files[label] = writer.write(label, docs)
+            self.counts[label] = self.counts.get(label, 0) + rows
+            self._log(f"   ✅ {label}: {rows:,} rows in {len(files[label])} file(s), "
+                      f"{time.perf_counter() - part_started:.1f}s")
+        self._summary('Export', started)
+        return files
+
+    def seed_from_export(self, input_dir: str):
+        """Write a previous export_all() dataset into the database."""
+        if not self.db:
+            return
+        started = time.perf_counter()
+        self._log(f"🌱 Seeding database from {input_dir}...")
+        for label in export_collections(input_dir):
+            self._write(label, iter_documents(input_dir, label))
+        self._summary('Database seeding', started)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Seed Firestore with mock data.')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply every default volume (availability days excluded)')
+    parser.add_argument('--seed', type=int, help='RNG seed for a reproducible dataset')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent batch commits')
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE, help='writes per batch (max 500)')
+    parser.add_argument('--quiet', action='store_true', help='only print the final summary')
+    parser.add_argument('--export', metavar='DIR', help='write the dataset to files in DIR instead of Firestore')
+    parser.add_argument('--format', choices=FORMATS, default='ndjson', help='export file format')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='rows per export file')
+    parser.add_argument('--compress', action='store_true', help='gzip NDJSON / zstd Parquet exports')
+    parser.add_argument('--from-export', metavar='DIR', help='seed Firestore from a previous export')
+    for name in DEFAULT_COUNTS:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                            help=f'override the {name.replace("_", " ")} volume')
+    return parser.parse_args(argv)
+
 
 def main():
     """Main function to run the database seeder."""
-    seeder = DatabaseSeeder()
-    
-    if seeder.db:
-        seeder.seed_all()
+    args = parse_args()
+    counts = {}
+    for name, default in DEFAULT_COUNTS.items():
+        override = getattr(args, name)
+        if override is not None:
+            counts[name] = override
+        elif name == 'availability_days':
+            counts[name] = default
+        else:
+            counts[name] = max(1, int(default * args.scale))
+
+    seeder = DatabaseSeeder(verbose=not args.quiet, seed=args.seed, workers=args.workers,
+                            batch_size=args.batch_size, connect=not args.export)
+
+    if args.export:
+        seeder.export_all(args.export, fmt=args.format, counts=counts, chunk_rows=args.chunk_rows,
+                          compress=args.compress)
+    elif seeder.db:
+        if args.from_export:
+            seeder.seed_from_export(args.from_export)
+        else:
+            seeder.seed_all(counts)
     else:
         print("❌ Cannot seed database - Firebase not initialized")
 
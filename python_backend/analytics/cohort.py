@@ -0,0 +1,295 @@
+"""
+Cohort analytics over assessments, mood scores and chat sentiment.
+
+All three sources are held in memory as one columnar pandas frame (one row per
+document: user, timestamp, value, metric, label) plus a small user frame
+(college, year). The first request loads everything; afterwards each refresh
+only reads documents whose ``updatedAt`` is past the per-collection watermark
+(minus an overlap for clock skew) and upserts them by document id. A periodic
+full reload picks up documents written without ``updatedAt`` and user profile
+changes. Queries (group-by, percentiles, time buckets) run against the
+snapshot without touching Firestore.
+
+All timestamps, watermarks included, are naive UTC. Firestore stores every
+timestamp in UTC: the frontend writes ``updatedAt`` with ``serverTimestamp()``
+and the backend with naive ``datetime.now()``, which the client library stores
+as UTC, so the two only agree on a host running with TZ=UTC. A watermark never
+moves past the time its read started, so a stored ``updatedAt`` that looks
+ahead of real time cannot make later writes invisible to incremental refreshes.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.lazy_import import lazy_import
+from utils.metrics import span
+
+# Loaded on first use: only the analytics endpoint needs them
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('phq9', 'gad7', 'mood', 'sentiment')
+USER_DIMENSIONS = ('college', 'year')
+TIME_DIMENSIONS = ('day', 'week', 'month')
+DIMENSIONS = USER_DIMENSIONS + TIME_DIMENSIONS
+WATERMARK_FIELD = 'updatedAt'
+FACT_COLUMNS = ['key', 'user_id', 'ts', 'value', 'metric', 'label']
+
+
+def _to_utc_naive(value: Any) -> Optional[datetime]:
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _utc_now() -> datetime:
+    """Now on the clock of stored timestamps, in the naive UTC form _to_utc_naive returns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _assessment_row(d: Dict[str, Any]) -> Optional[Tuple]:
+    metric = {'PHQ-9': 'phq9', 'GAD-7': 'gad7'}.get(str(d.get('type') or '').upper())
+    score = _number(d.get('score'))
+    if metric is None or score is None:
+        return None
+    return (d.get('user_id') or d.get('userId'), _to_utc_naive(d.get('timestamp') or d.get('createdAt')),
+            score, metric, d.get('severity') or 'unknown')
+
+
+def _mood_row(d: Dict[str, Any]) -> Optional[Tuple]:
+    score = _number(d.get('score'))
+    if score is None:
+        return None
+    return (d.get('userId') or d.get('user_id'), _to_utc_naive(d.get('recordedAt') or d.get('createdAt')),
+            score, 'mood', d.get('mood'))
+
+
+def _sentiment_row(d: Dict[str, Any]) -> Optional[Tuple]:
+    sentiment = d.get('sentiment') or {}
+    score = _number(sentiment.get('score'))
+    if score is None:
+        return None
+    return (d.get('user_id'), _to_utc_naive(d.get('timestamp') or d.get('createdAt')),
+            score, 'sentiment', sentiment.get('label'))
+
+
+def _user_record(snap) -> Tuple:
+    d = snap.to_dict() or {}
+    return (snap.id, d.get('collegeName'), d.get('year'))
+
+
+# collection -> document to (user_id, ts, value, metric, label)
+SOURCES: Dict[str, Callable[[Dict[str, Any]], Optional[Tuple]]] = {
+    'assessments': _assessment_row,
+    'mood_scores': _mood_row,
+    'chat_conversations': _sentiment_row,
+}
+
+
+class CohortAnalytics:
+    """In-memory columnar snapshot with incremental refresh and cohort queries."""
+
+    def __init__(self, db_provider: Callable[[], Any], refresh_interval: float = 60,
+                 full_refresh_interval: float = 6 * 3600, overlap: float = 300):
+        self._db = db_provider
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._facts = None
+        self._users = None
+        self._watermarks: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._last_full = 0.0
+        # Bumped whenever the snapshot's contents change; used as the response version
+        self.generation = 0
+        self.as_of: Optional[datetime] = None
+
+    # ---------------- snapshot maintenance ----------------
+
+    def ensure_fresh(self) -> int:
+        """
+        Load the snapshot on first use, then refresh it at most every refresh_interval.
+        Concurrent callers keep using the current snapshot while one of them refreshes.
+        """
+        if self._facts is None:
+            with self._lock:
+                if self._facts is None:
+                    self.refresh(full=True)
+        elif time.monotonic() - self._last_refresh >= self.refresh_interval and self._lock.acquire(blocking=False):
+            try:
+                self.refresh(full=time.monotonic() - self._last_full >= self.full_refresh_interval)
+            except Exception as e:
+                logger.error(f"Cohort analytics refresh failed: {e}")
+            finally:
+                self._lock.release()
+        return self.generation
+
+    def refresh(self, full: bool = False):
+        db = self._db()
+        if not db:
+            raise RuntimeError('Database not available')
+        started = _utc_now()
+        full = full or self._facts is None
+        with span('analytics.cohort_refresh'):
+            rows = []
+            for collection, to_row in SOURCES.items():
+                rows.extend(self._read_source(db, collection, to_row, started, full))
+            new = self._frame(rows)
+            changed = full or self._merge_changed(new)
+            facts = new if full else pd.concat([self._facts[~self._facts.index.isin(new.index)], new])
+            users = self._load_users(db, facts, full)
+
+        # Swap whole frames so concurrent queries always see a consistent snapshot
+        self._facts, self._users = facts, users
+        now = time.monotonic()
+        self._last_refresh = now
+        if full:
+            self._last_full = now
+        self.as_of = started
+        if changed:
+            self.generation += 1
+        logger.info(f"Cohort analytics {'full' if full else 'incremental'} refresh: "
+                    f"{len(new)} documents read, {len(facts)} rows")
+
+    def _read_source(self, db, collection: str, to_row, started: datetime, full: bool) -> List[Tuple]:
+        query = db.collection(collection)
+        previous = self._watermarks.get(collection)
+        if not full and previous is not None:
+            query = query.where(WATERMARK_FIELD, '>=', previous - self.overlap)
+        newest = previous
+        rows = []
+        for doc in query.stream():
+            d = doc.to_dict() or {}
+            row = to_row(d)
+            if row is not None and row[0] and row[1] is not None:
+                rows.append((f"{collection}/{doc.id}",) + row)
+            updated = _to_utc_naive(d.get(WATERMARK_FIELD))
+            if updated is not None and (newest is None or updated > newest):
+                newest = updated
+        # A full load has seen everything written before it started. Nothing later than the read
+        # start is trusted: a future-looking updatedAt (local time stored as UTC) would skip real writes
+        self._watermarks[collection] = started if full or newest is None else min(newest, started)
+        return rows
+
+    @staticmethod
+    def _frame(rows: List[Tuple]):
+        frame = pd.DataFrame.from_records(rows, columns=FACT_COLUMNS).set_index('key')
+        frame['ts'] = pd.to_datetime(frame['ts'])
+        frame['value'] = frame['value'].astype('float64')
+        return frame
+
+    def _merge_changed(self, new) -> bool:
+        """Whether an incremental batch adds or alters rows (the overlap re-reads some)."""
+        if new.empty:
+            return False
+        existing = self._facts.reindex(new.index)
+        return bool(existing['value'].isna().any()
+                    or (existing['value'] != new['value']).any()
+                    or (existing['ts'] != new['ts']).any())
+
+    def _load_users(self, db, facts, full: bool):
+        if full:
+            records = [_user_record(doc) for doc in db.collection('users').stream()]
+        else:
+            known = self._users.index
+            missing = [uid for uid in facts['user_id'].unique() if uid not in known]
+            if not missing:
+                return self._users
+            refs = [db.collection('users').document(uid) for uid in missing]
+            records = [_user_record(snap) for snap in db.get_all(refs) if snap.exists]
+        users = pd.DataFrame.from_records(records, columns=['user_id', 'college', 'year']).set_index('user_id')
+        if not full:
+            users = pd.concat([self._users, users])
+        return users
+
+    # ---------------- queries ----------------
+
+    def query(self, metric: str, group_by: Sequence[str] = (), start: Optional[datetime] = None,
+              end: Optional[datetime] = None, percentiles: Iterable[float] = (50, 90),
+              min_group_size: int = 5) -> Dict[str, Any]:
+        """
+        Count, mean and percentiles of ``metric`` per group, plus the label mix
+        where the source has one (severity for PHQ-9/GAD-7, sentiment label, mood). Groups with
+        fewer than min_group_size distinct students are withheld so individuals cannot be singled
+        out, however many results each of them has.
+        """
+        facts, users = self._facts, self._users
+        group_by = list(group_by)
+        percentiles = sorted(set(float(p) for p in percentiles))
+        with span('analytics.cohort_query'):
+            df = facts[facts['metric'] == metric]
+            if start is not None:
+                df = df[df['ts'] >= start]
+            if end is not None:
+                df = df[df['ts'] < end]
+            df = df[['user_id', 'ts', 'value', 'label']]
+            if any(dim in USER_DIMENSIONS for dim in group_by):
+                df = df.join(users, on='user_id')
+            for dim in group_by:
+                if dim in USER_DIMENSIONS:
+                    df[dim] = df[dim].fillna('unknown').astype(str)
+                elif dim == 'day':
+                    df[dim] = df['ts'].dt.normalize()
+                elif dim == 'week':
+                    df[dim] = df['ts'].dt.normalize() - pd.to_timedelta(df['ts'].dt.weekday, unit='D')
+                elif dim == 'month':
+                    df[dim] = df['ts'].dt.to_period('M').dt.start_time
+            keys = group_by or ['_all']
+            if not group_by:
+                df = df.assign(_all='all')
+
+            grouped = df.groupby(keys, sort=True)['value']
+            stats = grouped.agg(['count', 'mean'])
+            students = df.groupby(keys, sort=True)['user_id'].nunique()
+            if percentiles and not df.empty:
+                quantiles = grouped.quantile([p / 100 for p in percentiles]).unstack()
+            else:
+                quantiles = None
+            labelled = df.dropna(subset=['label'])
+            labels = labelled.groupby(keys + ['label']).size().unstack(fill_value=0) if not labelled.empty else None
+
+        groups, suppressed = [], 0
+        for index, row in stats.iterrows():
+            count = int(row['count'])
+            if students.loc[index] < min_group_size:
+                suppressed += 1
+                continue
+            index = index if isinstance(index, tuple) else (index,)
+            group = {}
+            if group_by:
+                for dim, value in zip(group_by, index):
+                    group[dim] = value.strftime('%Y-%m-%d' if dim != 'month' else '%Y-%m') if dim in TIME_DIMENSIONS else value
+            group['count'] = count
+            group['mean'] = round(float(row['mean']), 2)
+            if quantiles is not None:
+                for p in percentiles:
+                    value = quantiles.loc[index if len(index) > 1 else index[0], p / 100]
+                    group[f"p{p:g}"] = None if np.isnan(value) else round(float(value), 2)
+            label_key = index if len(index) > 1 else index[0]
+            if labels is not None and label_key in labels.index:
+                group['labels'] = {str(label): int(n) for label, n in labels.loc[label_key].items() if n}
+            groups.append(group)
+
+        return {
+            'metric': metric,
+            'groupBy': group_by,
+            'groups': groups,
+            'suppressedGroups': suppressed,
+            'minGroupSize': min_group_size,
+            'rows': int(len(df)),
+            'asOf': self.as_of.isoformat() if self.as_of else None,
+        }
@@ -1,73 +1,190 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, url_for
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
 import json
-from datetime import datetime
+import base64
+import hmac
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
+import math
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 # Import custom modules
 from chatbot.mental_health_chatbot import MentalHealthChatbot
-from assessment.phq9_gad7 import PHQ9GAD7Assessment
+from assessment.phq9_gad7 import DEFAULT_LOCALE, INSTRUMENTS, PHQ9GAD7Assessment
+from assessment import assessment_index
+from analytics.cohort import DIMENSIONS, METRICS, TIME_DIMENSIONS, CohortAnalytics
+from notifications.escalation import EscalationDispatcher
+from notifications.hub import NotificationHub
+from web.response_versioning import ResponseVersioner
+from web.json_provider import FastJSONProvider
+from web.prebuilt_response import PrebuiltPayload
+from web.compression import ResponseCompressor
+from web.request_metrics import RequestMetrics
+from web.request_profiler import RequestProfiler
+from web.rate_limit import Admission
+from web.idempotency import IdempotencyKeys
+from storage.batch_writer import commit_groups
+from storage import errors as storage_errors
+from scheduling.slot_index import DATE_FIELD, OpenSlotIndex, normalize_slot_time, time_key
+from utils.lazy_import import LazyObject, lazy_import
+from utils.metrics import instrument_firestore, span
+
+# Firebase pulls in google-cloud-firestore/gRPC; only import it once the client is needed
+firebase_admin = lazy_import('firebase_admin')
+credentials = lazy_import('firebase_admin.credentials')
+firestore = lazy_import('firebase_admin.firestore')
+firebase_auth = lazy_import('firebase_admin.auth')
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app, backend=os.getenv('JSON_BACKEND', 'auto'))
 CORS(app)
+ResponseCompressor(app, min_size=int(os.getenv('COMPRESSION_MIN_SIZE', '1024')))
+RequestMetrics(app)
+RequestProfiler(app, output_dir=os.getenv('PROFILE_DIR', 'profiles'), keep=int(os.getenv('PROFILE_KEEP', '50')))
+# Registered after the compressor so stored responses are the uncompressed bodies; db is resolved per request
+IdempotencyKeys(app, lambda: db, ttl=float(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400')))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize Firebase
-try:
-    if os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY'):
-        cred = credentials.Certificate(json.loads(os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY')))
-    else:
-        cred = credentials.Certificate('firebase-service-account.json')
-    
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    logger.info("Firebase initialized successfully")
-except Exception as e:
-    logger.error(f"Firebase initialization failed: {e}")
-    db = None
+def init_firebase(reinitialize: bool = False):
+    """
+    Returns a Firestore client, or None when Firebase is not configured.
+    reinitialize=True drops the existing app first so a forked worker gets its own gRPC channel.
+    """
+    try:
+        if reinitialize:
+            try:
+                firebase_admin.delete_app(firebase_admin.get_app())
+            except ValueError:
+                pass
+        if os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY'):
+            cred = credentials.Certificate(json.loads(os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY')))
+        else:
+            cred = credentials.Certificate('firebase-service-account.json')
+
+        firebase_admin.initialize_app(cred)
+        client = firestore.client()
+        instrument_firestore()
+        logger.info("Firebase initialized successfully")
+        return client
+    except Exception as e:
+        logger.error(f"Firebase initialization failed: {e}")
+        return None
+
+def init_storage(reinitialize: bool = False):
+    """
+    Returns the document store selected by STORAGE_BACKEND:
+    'firestore' (default) or 'memory', an in-process stand-in for offline runs and benchmarks
+    with MEMORY_STORE_LATENCY_MS/MEMORY_STORE_JITTER_MS of simulated latency per call.
+    """
+    backend = os.getenv('STORAGE_BACKEND', 'firestore').lower()
+    if backend == 'memory':
+        from storage.memory_store import MemoryFirestore
+        logger.info("Using in-memory document store")
+        return MemoryFirestore(
+            latency_ms=float(os.getenv('MEMORY_STORE_LATENCY_MS', '0')),
+            jitter_ms=float(os.getenv('MEMORY_STORE_JITTER_MS', '0')),
+        )
+    return init_firebase(reinitialize=reinitialize)
+
+# Built on first use so importing this module (tests, tools) stays cheap
+db = LazyObject(init_storage)
 
 # Initialize AI components
-chatbot = MentalHealthChatbot()
+chatbot = LazyObject(MentalHealthChatbot)
 assessment = PHQ9GAD7Assessment()
 
+def warm_up():
+    """Run lazily-initialized model code once so its state is built before workers fork."""
+    chatbot.analyzer.analyze("Warming up: I feel calm and a little anxious today.")
+    assessment.calculate_phq9_score([0] * 9)
+    assessment.calculate_gad7_score([0] * 7)
+    assessment.score_bulk('phq9', [[0] * 9])
+    assessment.score_bulk('gad7', [[0] * 7])
+    for assessment_type in INSTRUMENTS:
+        for locale in assessment.available_locales():
+            get_question_payload(assessment_type, locale)
+
+# Conditional GET / short-lived response reuse for polled endpoints (seconds)
+response_versions = ResponseVersioner()
+# Cached entries and their invalidation are per worker: a write only invalidates the worker that
+# handled it, and the others revalidate against Firestore once their entry's max-age runs out.
+# Routes relying on invalidation are capped so that window stays short.
+MAX_STALE_SECONDS = int(os.getenv('MAX_STALE_SECONDS', '5'))
+ROUTE_MAX_AGE = {
+    'sentiment_trends': min(int(os.getenv('SENTIMENT_TRENDS_MAX_AGE', '15')), MAX_STALE_SECONDS),
+    'availability': min(int(os.getenv('AVAILABILITY_MAX_AGE', '5')), MAX_STALE_SECONDS),
+    'cohort': int(os.getenv('COHORT_ANALYTICS_MAX_AGE', '60')),
+}
+
+# Open slots across all counsellors; routes below keep it current, reconciliation catches client-side bookings
+slot_index = OpenSlotIndex(lambda: db, reconcile_interval=float(os.getenv('SLOT_INDEX_RECONCILE_SECONDS', '60')))
+
+def invalidate_availability(counsellor_id: str, date_key: str):
+    response_versions.invalidate(f"availability:{counsellor_id}:{date_key}")
+    # Cached ranges are few per counsellor; drop them all rather than tracking which cover date_key
+    response_versions.invalidate(f"availability_range:{counsellor_id}")
+
+# Live notification streams; each open stream holds a worker thread, so they are capped per process
+notification_hub = NotificationHub(
+    buffer_size=int(os.getenv('NOTIFICATION_BUFFER_SIZE', '50')),
+    max_streams=int(os.getenv('NOTIFICATION_STREAM_MAX', str(max(1, int(os.getenv('WORKER_THREADS', '4')) // 2)))))
+NOTIFICATION_STREAM_HEARTBEAT = float(os.getenv('NOTIFICATION_STREAM_HEARTBEAT', '15'))
+NOTIFICATION_STREAM_MAX_SECONDS = float(os.getenv('NOTIFICATION_STREAM_MAX_SECONDS', '300'))
+NOTIFICATIONS_LISTENER = os.getenv('NOTIFICATIONS_LISTENER', '').lower() in ('1', 'true', 'yes')
+MAX_NOTIFICATION_RESUME = 100
+
+def publish_notifications(notes):
+    """Push committed (ref, data) notification writes to open streams."""
+    for note_ref, note in notes:
+        notification_hub.publish(note.get('userId'), note_ref.id, note)
+
 # -------- Email helper --------
+def smtp_settings():
+    host = os.getenv('SMTP_HOST')
+    port = int(os.getenv('SMTP_PORT') or '0')
+    user = os.getenv('SMTP_USER')
+    password = os.getenv('SMTP_PASS')
+    from_email = os.getenv('SMTP_FROM', user or '')
+    return host, port, user, password, from_email
+
+def build_email(from_email: str, to_email: str, subject: str, html_body: str, text_body: str = None) -> MIMEMultipart:
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = from_email
+    msg['To'] = to_email
+    if text_body:
+        msg.attach(MIMEText(text_body, 'plain'))
+    msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
 def send_email(to_email: str, subject: str, html_body: str, text_body: str = None):
     """
     Sends an email via SMTP using env vars:
     SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, SMTP_FROM
     If env vars are not set, this function is a no-op.
     """
-    host = os.getenv('SMTP_HOST')
-    port = int(os.getenv('SMTP_PORT') or '0')
-    user = os.getenv('SMTP_USER')
-    password = os.getenv('SMTP_PASS')
-    from_email = os.getenv('SMTP_FROM', user or '')
+    host, port, user, password, from_email = smtp_settings()
     if not (host and port and from_email and to_email):
         logger.info('Email not sent: SMTP not configured or missing recipient')
         return False
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = from_email
-        msg['To'] = to_email
-        if text_body:
-            msg.attach(MIMEText(text_body, 'plain'))
-        msg.attach(MIMEText(html_body, 'html'))
-        with smtplib.SMTP(host, port, timeout=10) as server:
+        msg = build_email(from_email, to_email, subject, html_body, text_body)
+        with span('smtp.send'), smtplib.SMTP(host, port, timeout=10) as server:
             server.starttls()
             if user and password:
                 server.login(user, password)
@@ -78,39 +195,211 @@ def send_email(to_email: str, subject: str, html_body: str, text_body: str = Non
         logger.error(f"Failed to send email to {to_email}: {e}")
         return False
 
+def send_emails(messages) -> int:
+    """
+    Send (to_email, subject, html_body, text_body) messages over one SMTP connection.
+    Returns how many were accepted; a failed recipient does not stop the rest.
+    """
+    host, port, user, password, from_email = smtp_settings()
+    messages = [m for m in messages if m[0]]
+    if not (host and port and from_email and messages):
+        logger.info('Emails not sent: SMTP not configured or no recipients')
+        return 0
+    sent = 0
+    try:
+        with span('smtp.send_many'), smtplib.SMTP(host, port, timeout=10) as server:
+            server.starttls()
+            if user and password:
+                server.login(user, password)
+            for to_email, subject, html_body, text_body in messages:
+                try:
+                    server.sendmail(from_email, [to_email], build_email(
+                        from_email, to_email, subject, html_body, text_body).as_string())
+                    sent += 1
+                except smtplib.SMTPException as e:
+                    logger.error(f"Failed to send email to {to_email}: {e}")
+    except Exception as e:
+        logger.error(f"Bulk email failed after {sent} of {len(messages)}: {e}")
+    logger.info(f"Sent {sent} of {len(messages)} emails")
+    return sent
+
+# Bulk emails are sent off the request thread, one SMTP session per hand-off
+email_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email')
+# Crisis pages get their own sender so they never wait behind a bulk batch
+escalation_email_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='escalation-email')
+
+def queue_emails(messages, pool: ThreadPoolExecutor = email_pool) -> int:
+    messages = [m for m in messages if m[0]]
+    if messages:
+        pool.submit(send_emails, messages)
+    return len(messages)
+
+def status_email(student_name: str, counsellor_name: str, date_str: str, time_str: str, status_nice: str):
+    """(subject, html_body, text_body) telling a student their session's new status."""
+    subject = f"Your session on {date_str} {time_str} was {status_nice}"
+    html_body = f"""
+        <div>
+          <p>Hi {student_name or 'there'},</p>
+          <p>Your counselling session with <strong>{counsellor_name or 'your counsellor'}</strong> on <strong>{date_str}</strong> at <strong>{time_str}</strong> was <strong>{status_nice}</strong>.</p>
+          <p>Please check your bookings page for details.</p>
+          <p>— MINDLY</p>
+        </div>
+        """
+    text_body = f"Hi {student_name or 'there'},\nYour counselling session on {date_str} at {time_str} was {status_nice}.\nPlease check your bookings page for details.\n— MINDLY"
+    return subject, html_body, text_body
+
+# -------- Crisis escalation dispatch --------
+def page_counsellors(escalation: dict, notes, counsellors):
+    """Deliver one committed paging round: SSE push to open streams, then email."""
+    publish_notifications(notes)
+    level = escalation['severity']
+    subject = f"[{level.upper()}] Crisis escalation needs acknowledgement"
+    html_body = f"""
+        <div>
+          <p>A student needs urgent support (severity <strong>{level}</strong>).</p>
+          <p>Open the counsellor dashboard and acknowledge escalation <strong>{escalation['id']}</strong>; other counsellors are paged if nobody does.</p>
+          <p>— MINDLY</p>
+        </div>
+        """
+    text_body = (f"A student needs urgent support (severity {level}).\nOpen the counsellor dashboard and acknowledge "
+                 f"escalation {escalation['id']}; other counsellors are paged if nobody does.\n— MINDLY")
+    queue_emails([(c['email'], subject, html_body, text_body) for c in counsellors], pool=escalation_email_pool)
+
+escalation_dispatcher = EscalationDispatcher(
+    lambda: db, page_counsellors,
+    ack_timeout=float(os.getenv('ESCALATION_ACK_SECONDS', '300')),
+    max_rounds=int(os.getenv('ESCALATION_MAX_ROUNDS', '3')),
+    per_round=int(os.getenv('ESCALATION_PAGE_SIZE', '3')))
+
 # -------- Counsellor API (server-side with service account) --------
+APPOINTMENT_STATUSES = ('pending', 'approved', 'confirmed', 'in_progress', 'completed', 'cancelled', 'canceled')
+MAX_APPOINTMENT_PAGE = 500
+
+def encode_cursor(values):
+    """Encode cursor values (JSON-serializable list) as an opaque URL-safe token."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str):
+    """Decode a token produced by encode_cursor. Raises ValueError when malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
 @app.route('/api/counsellor/appointments', methods=['GET'])
 def list_counsellor_appointments():
     """
-    Returns appointments for a counsellor ordered by date/time.
-    Query params: counsellorId=<uid>, limit=<n>
+    Returns one page of appointments for a counsellor ordered by date/time (server-side).
+    Query params: counsellorId=<uid>, limit=<n>, cursor=<nextCursor from previous page>,
+    status=<s>[,<s>...], from=YYYY-MM-DD, to=YYYY-MM-DD (inclusive)
+    Response: { appointments: [...], nextCursor: <token>|null }
+    Backed by the counsellorId(+status)/appointmentDate/appointmentTime composite indexes.
     """
     try:
         counsellor_id = request.args.get('counsellorId', '')
-        limit_n = int(request.args.get('limit', '100'))
         if not counsellor_id:
             return jsonify({'error': 'counsellorId is required'}), 400
+        try:
+            limit_n = int(request.args.get('limit', '100'))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        limit_n = max(1, min(MAX_APPOINTMENT_PAGE, limit_n))
+        statuses = [s.strip().lower() for s in request.args.get('status', '').split(',') if s.strip()]
+        if any(s not in APPOINTMENT_STATUSES for s in statuses):
+            return jsonify({'error': 'Invalid status'}), 400
+        if len(statuses) > 10:
+            return jsonify({'error': 'At most 10 statuses may be combined'}), 400
+        date_from = request.args.get('from', '')
+        date_to = request.args.get('to', '')
+        cursor = None
+        if request.args.get('cursor'):
+            try:
+                cursor = decode_cursor(request.args['cursor'])
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            if len(cursor) != 3:
+                return jsonify({'error': 'Invalid cursor'}), 400
         if not db:
-            return jsonify({'appointments': []})
-
-        # Fetch with where only (no server-side order_by to avoid composite index), then sort in Python
-        stream = db.collection('appointments') \
-            .where('counsellorId', '==', counsellor_id) \
-            .limit(limit_n) \
-            .stream()
+            return jsonify({'appointments': [], 'nextCursor': None})
+
+        query = db.collection('appointments').where('counsellorId', '==', counsellor_id)
+        if len(statuses) == 1:
+            query = query.where('status', '==', statuses[0])
+        elif statuses:
+            query = query.where('status', 'in', statuses)
+        if date_from:
+            query = query.where('appointmentDate', '>=', date_from)
+        if date_to:
+            query = query.where('appointmentDate', '<=', date_to)
+        # Document id as final tie-break keeps cursors stable when date/time collide
+        query = query.order_by('appointmentDate').order_by('appointmentTime').order_by('__name__')
+        if cursor:
+            query = query.start_after({
+                'appointmentDate': cursor[0],
+                'appointmentTime': cursor[1],
+                '__name__': cursor[2],
+            })
+        # Read one extra document to learn whether another page exists
         items = []
-        for doc in stream:
+        for doc in query.limit(limit_n + 1).stream():
             d = doc.to_dict()
             d['id'] = doc.id
             items.append(d)
-        # Sort by date then time client-side
-        items.sort(key=lambda x: (str(x.get('appointmentDate') or ''), str(x.get('appointmentTime') or '')))
-        return jsonify({'appointments': items})
+
+        next_cursor = None
+        if len(items) > limit_n:
+            items = items[:limit_n]
+            last = items[-1]
+            next_cursor = encode_cursor([last.get('appointmentDate'), last.get('appointmentTime'), last['id']])
+        return jsonify({'appointments': items, 'nextCursor': next_cursor})
     except Exception as e:
         logger.error(f"list_counsellor_appointments error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 
+def read_owned_appointment(appointment_id: str, counsellor_id: str):
+    """
+    Read an appointment once for the ownership check.
+    Returns (ref, snapshot, error response or None when the counsellor owns it).
+    Writes that follow should carry unchanged_since(snapshot) so they commit only if
+    nothing modified the appointment in between, without a transaction round trip.
+    """
+    ref = db.collection('appointments').document(appointment_id)
+    snap = ref.get()
+    if not snap.exists:
+        return ref, snap, (jsonify({'error': 'Not found'}), 404)
+    if (snap.to_dict() or {}).get('counsellorId') != counsellor_id:
+        return ref, snap, (jsonify({'error': 'Not your appointment'}), 403)
+    return ref, snap, None
+
+def unchanged_since(snap):
+    return db.write_option(last_update_time=snap.update_time)
+
+APPOINTMENT_CONFLICT = {'error': 'Appointment was changed by another request, please retry'}
+
+def student_contact(appt: dict):
+    """(student id, email, name) for an appointment, reading the user doc only when the email is missing."""
+    student_id = appt.get('studentId') or appt.get('userId')
+    student_email = appt.get('studentEmail') or appt.get('email') or ''
+    student_name = appt.get('studentName') or ''
+    if not student_email and student_id:
+        try:
+            usnap = db.collection('users').document(student_id).get()
+            if usnap.exists:
+                u = usnap.to_dict() or {}
+                student_email = u.get('email', '')
+                if not student_name:
+                    student_name = u.get('name') or u.get('displayName') or ''
+        except Exception as e:
+            logger.warning(f"lookup user email failed: {e}")
+    return student_id, student_email, student_name
+
+
 @app.route('/api/counsellor/appointments/<appointment_id>/start', methods=['PATCH'])
 def counsellor_start_appointment(appointment_id):
     """
@@ -125,16 +414,13 @@ def counsellor_start_appointment(appointment_id):
         if not counsellor_id:
             return jsonify({'error': 'counsellorId is required'}), 400
 
-        ref = db.collection('appointments').document(appointment_id)
-        snap = ref.get()
-        if not snap.exists:
-            return jsonify({'error': 'Not found'}), 404
-        appt = snap.to_dict()
-        if appt.get('counsellorId') != counsellor_id:
-            return jsonify({'error': 'Not your appointment'}), 403
-
-        ref.update({'status': 'in_progress', 'updatedAt': datetime.now()})
+        ref, snap, error = read_owned_appointment(appointment_id, counsellor_id)
+        if error:
+            return error
+        ref.update({'status': 'in_progress', 'updatedAt': datetime.now()}, option=unchanged_since(snap))
         return jsonify({'success': True})
+    except storage_errors.FailedPrecondition:
+        return jsonify(APPOINTMENT_CONFLICT), 409
     except Exception as e:
         logger.error(f"counsellor_start_appointment error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -154,18 +440,32 @@ def counsellor_complete_appointment(appointment_id):
         if not counsellor_id:
             return jsonify({'error': 'counsellorId is required'}), 400
 
-        ref = db.collection('appointments').document(appointment_id)
-        snap = ref.get()
-        if not snap.exists:
-            return jsonify({'error': 'Not found'}), 404
+        ref, snap, error = read_owned_appointment(appointment_id, counsellor_id)
+        if error:
+            return error
         appt = snap.to_dict()
-        if appt.get('counsellorId') != counsellor_id:
-            return jsonify({'error': 'Not your appointment'}), 403
 
-        ref.update({'status': 'completed', 'updatedAt': datetime.now()})
+        # Status change and student notification commit together
+        student_id = appt.get('studentId') or appt.get('userId')
+        batch = db.batch()
+        batch.update(ref, {'status': 'completed', 'updatedAt': datetime.now()}, option=unchanged_since(snap))
+        notes = []
+        if student_id:
+            notes.append((db.collection('notifications').document(), {
+                'userId': student_id,
+                'type': 'appointment_completed',
+                'title': 'Session completed',
+                'body': 'Please leave quick feedback for your counsellor.',
+                'appointmentId': appointment_id,
+                'createdAt': datetime.now(),
+                'read': False
+            }))
+        for note_ref, note in notes:
+            batch.set(note_ref, note)
+        batch.commit()
+        publish_notifications(notes)
 
         # Notify student to leave feedback
-        student_id = appt.get('studentId') or appt.get('userId')
         student_email = appt.get('studentEmail') or appt.get('email') or ''
         student_name = appt.get('studentName') or ''
         counsellor_name = appt.get('counsellorName') or ''
@@ -185,21 +485,9 @@ def counsellor_complete_appointment(appointment_id):
         if student_email:
             send_email(student_email, subject, html_body, text_body)
 
-        if student_id:
-            try:
-                db.collection('notifications').add({
-                    'userId': student_id,
-                    'type': 'appointment_completed',
-                    'title': 'Session completed',
-                    'body': 'Please leave quick feedback for your counsellor.',
-                    'appointmentId': appointment_id,
-                    'createdAt': datetime.now(),
-                    'read': False
-                })
-            except Exception as e:
-                logger.warning(f"notify write failed: {e}")
-
         return jsonify({'success': True})
+    except storage_errors.FailedPrecondition:
+        return jsonify(APPOINTMENT_CONFLICT), 409
     except Exception as e:
         logger.error(f"counsellor_complete_appointment error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -209,7 +497,8 @@ def counsellor_complete_appointment(appointment_id):
 def counsellor_delete_appointment(appointment_id):
     """
     Body JSON: { counsellorId: '<uid>' }
-    Hard-cancel: verify ownership, free slot, delete appointment, email + notify student.
+    Hard-cancel: verify ownership, then free the slot, delete the appointment and
+    notify the student in one batch; email the student.
     """
     try:
         if not db:
@@ -219,51 +508,63 @@ def counsellor_delete_appointment(appointment_id):
         if not counsellor_id:
             return jsonify({'error': 'counsellorId is required'}), 400
 
-        ref = db.collection('appointments').document(appointment_id)
-        snap = ref.get()
+        ref, snap, error = read_owned_appointment(appointment_id, counsellor_id)
         if not snap.exists:
             return jsonify({'success': True})
+        if error:
+            return error
         appt = snap.to_dict()
-        if appt.get('counsellorId') != counsellor_id:
-            return jsonify({'error': 'Not your appointment'}), 403
 
-        # Free the availability slot if exists
         date_key = appt.get('appointmentDate')
         time_str = appt.get('appointmentTime')
         owner_id = appt.get('counsellorId')
-        if date_key and time_str and owner_id:
-            try:
-                slot_ref = db.document(f"counsellors/{owner_id}/availability/{date_key}/slots/{time_str}")
-                if slot_ref.get().exists:
-                    slot_ref.update({
-                        'booked': False,
-                        'bookedBy': None,
-                        'sessionId': None,
-                        'updatedAt': datetime.now()
-                    })
-            except Exception as e:
-                logger.warning(f"free slot failed: {e}")
-
-        # Compose student email + notify
         student_id = appt.get('studentId') or appt.get('userId')
-        student_email = appt.get('studentEmail') or appt.get('email') or ''
-        student_name = appt.get('studentName') or ''
-        counsellor_name = appt.get('counsellorName') or ''
         date_str = date_key or ''
         time_disp = time_str or ''
+        slot_ref = (db.document(f"counsellors/{owner_id}/availability/{date_key}/slots/{time_str}")
+                    if date_key and time_str and owner_id else None)
+        notes = []
+        if student_id:
+            notes.append((db.collection('notifications').document(), {
+                'userId': student_id,
+                'type': 'appointment_deleted',
+                'title': 'Appointment cancelled',
+                'body': f'Your session on {date_str} at {time_disp} was cancelled.',
+                'appointmentId': appointment_id,
+                'createdAt': datetime.now(),
+                'read': False
+            }))
+
+        def commit(free_slot: bool):
+            batch = db.batch()
+            if free_slot:
+                # update() requires the slot to exist, so a deleted slot is not recreated
+                batch.update(slot_ref, {
+                    'booked': False,
+                    'bookedBy': None,
+                    'sessionId': None,
+                    'updatedAt': datetime.now()
+                })
+            for note_ref, note in notes:
+                batch.set(note_ref, note)
+            batch.delete(ref, option=unchanged_since(snap))
+            batch.commit()
 
-        if not student_email and db and student_id:
-            try:
-                uref = db.collection('users').document(student_id)
-                usnap = uref.get()
-                if usnap.exists:
-                    u = usnap.to_dict() or {}
-                    student_email = u.get('email', '')
-                    if not student_name:
-                        student_name = u.get('name') or u.get('displayName') or ''
-            except Exception as e:
-                logger.warning(f"lookup user email failed: {e}")
-
+        slot_freed = slot_ref is not None
+        try:
+            commit(free_slot=slot_freed)
+        except storage_errors.NotFound:
+            # Only the slot update can raise NotFound: the slot was removed, delete without it
+            slot_freed = False
+            commit(free_slot=False)
+        publish_notifications(notes)
+        if slot_freed:
+            invalidate_availability(owner_id, date_key)
+            slot_index.update(owner_id, date_key, time_str, booked=False)
+
+        # Email the student
+        _, student_email, student_name = student_contact(appt)
+        counsellor_name = appt.get('counsellorName') or ''
         subject = f"Your session on {date_str} {time_disp} was cancelled"
         html_body = f"""
         <div>
@@ -277,27 +578,14 @@ def counsellor_delete_appointment(appointment_id):
         if student_email:
             send_email(student_email, subject, html_body, text_body)
 
-        if student_id:
-            try:
-                db.collection('notifications').add({
-                    'userId': student_id,
-                    'type': 'appointment_deleted',
-                    'title': 'Appointment cancelled',
-                    'body': f'Your session on {date_str} at {time_disp} was cancelled.',
-                    'appointmentId': appointment_id,
-                    'createdAt': datetime.now(),
-                    'read': False
-                })
-            except Exception as e:
-                logger.warning(f"notify write failed: {e}")
-
-        # Delete the appointment
-        ref.delete()
         return jsonify({'success': True})
+    except storage_errors.FailedPrecondition:
+        return jsonify(APPOINTMENT_CONFLICT), 409
     except Exception as e:
         logger.error(f"counsellor_delete_appointment error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+
 @app.route('/api/counsellor/appointments/<appointment_id>/insights', methods=['GET'])
 def counsellor_appointment_insights(appointment_id):
     """
@@ -420,33 +708,28 @@ def counsellor_appointment_insights(appointment_id):
                 avg = None
             days.append({'date': day, 'avg': avg})
 
-        # Latest assessments (PHQ-9 and GAD-7) from 'assessments' (avoid order_by; filter and pick latest in Python)
-        latest = {'PHQ-9': None, 'GAD-7': None}
-        latest_ts = {'PHQ-9': None, 'GAD-7': None}
-        # Query both possible user id field shapes
-        for field in ('user_id', 'userId'):
-            stream = db.collection('assessments').where(field, '==', student_id).stream()
-            for doc in stream:
-                a = doc.to_dict() or {}
-                t = str(a.get('type') or '').upper()
-                if t not in ('PHQ-9', 'GAD-7'):
-                    continue
-                ts = a.get('timestamp') or a.get('createdAt')
-                dt = to_naive_utc(ts)
-                key = t
-                prev = latest_ts.get(key)
-                if prev is None or (dt and prev and dt > prev) or (dt and prev is None):
-                    latest_ts[key] = dt
-                    latest[key] = {
-                        'score': a.get('score'),
-                        'severity': a.get('severity') or '',
-                    }
+        # Latest PHQ-9/GAD-7 with change flags from the student's assessment summary
+        summary_ref = db.collection(assessment_index.SUMMARY_COLLECTION).document(student_id)
+        summary_snap = summary_ref.get()
+        if summary_snap.exists:
+            summary = summary_snap.to_dict() or {}
+        else:
+            # No summary yet (history predates it): build one from the stored assessments and keep it
+            history = assessment_index.load_history(db, [student_id])[student_id]
+            summary = assessment_index.build_summary(student_id, history.items())
+            try:
+                # create, not set: a summary written meanwhile by an assessment save is newer than this one
+                summary_ref.create(summary)
+            except storage_errors.AlreadyExists:
+                pass
+            except Exception as e:
+                logger.warning(f"insights: failed to store assessment summary: {e}")
 
         return jsonify({
             'moodTrend': days,
             'assessments': {
-                'phq9': latest['PHQ-9'],
-                'gad7': latest['GAD-7']
+                'phq9': assessment_index.insight_view(summary.get('phq9')),
+                'gad7': assessment_index.insight_view(summary.get('gad7'))
             }
         })
     except Exception as e:
@@ -469,13 +752,60 @@ def counsellor_upsert_availability_slot():
         if not counsellor_id or not date_key or not time:
             return jsonify({'error': 'counsellorId, dateKey and time are required'}), 400
         ref = db.document(f"counsellors/{counsellor_id}/availability/{date_key}/slots/{time}")
-        ref.set({'time': time, 'booked': False, 'updatedAt': datetime.now()}, merge=True)
+        ref.set({'time': time, DATE_FIELD: date_key, 'booked': False, 'updatedAt': datetime.now()}, merge=True)
+        invalidate_availability(counsellor_id, date_key)
+        slot_index.update(counsellor_id, date_key, time, time=time, booked=False)
         return jsonify({'success': True})
     except Exception as e:
         logger.error(f"upsert_availability_slot error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 
+def reschedule_notification(student_id: str, appointment_id: str, old_date: str, old_time: str,
+                            new_date: str, new_time: str) -> dict:
+    return {
+        'userId': student_id,
+        'type': 'appointment_rescheduled',
+        'title': 'Appointment rescheduled',
+        'body': f'Your session on {old_date} at {old_time} was moved to {new_date} at {new_time}.',
+        'appointmentId': appointment_id,
+        'appointmentDate': new_date,
+        'appointmentTime': new_time,
+        'createdAt': datetime.now(),
+        'read': False
+    }
+
+def reschedule_email(student_name: str, counsellor_name: str, old_date: str, old_time: str,
+                     new_date: str, new_time: str):
+    """(subject, html_body, text_body) telling a student their session was moved."""
+    subject = f"Your session was moved to {new_date} {new_time}"
+    html_body = f"""
+        <div>
+          <p>Hi {student_name or 'there'},</p>
+          <p>Your counselling session with <strong>{counsellor_name or 'your counsellor'}</strong> on {old_date} at {old_time} was moved to <strong>{new_date}</strong> at <strong>{new_time}</strong>.</p>
+          <p>Please check your bookings page for details.</p>
+          <p>— MINDLY</p>
+        </div>
+        """
+    text_body = f"Hi {student_name or 'there'},\nYour counselling session on {old_date} at {old_time} was moved to {new_date} at {new_time}.\nPlease check your bookings page for details.\n— MINDLY"
+    return subject, html_body, text_body
+
+def status_label(status: str) -> str:
+    return 'confirmed' if status in ('approved','confirmed') else ('cancelled' if status in ('cancelled','canceled') else status)
+
+def status_notification(student_id: str, appointment_id: str, status: str, date_str: str, time_str: str) -> dict:
+    status_nice = status_label(status)
+    return {
+        'userId': student_id,
+        'type': 'appointment_status',
+        'title': f'Appointment {status_nice}',
+        'body': f'Your session on {date_str} at {time_str} is {status_nice}.',
+        'appointmentId': appointment_id,
+        'status': status,
+        'createdAt': datetime.now(),
+        'read': False
+    }
+
 @app.route('/api/counsellor/appointments/<appointment_id>/status', methods=['PATCH'])
 def counsellor_update_status(appointment_id):
     """
@@ -492,76 +822,168 @@ def counsellor_update_status(appointment_id):
         if not counsellor_id:
             return jsonify({'error': 'counsellorId is required'}), 400
 
-        ref = db.collection('appointments').document(appointment_id)
-        snap = ref.get()
-        if not snap.exists:
-            return jsonify({'error': 'Not found'}), 404
+        ref, snap, error = read_owned_appointment(appointment_id, counsellor_id)
+        if error:
+            return error
         appt = snap.to_dict()
-        if appt.get('counsellorId') != counsellor_id:
-            return jsonify({'error': 'Not your appointment'}), 403
-        # Update status
-        ref.update({'status': status, 'updatedAt': datetime.now()})
 
-        # Prepare student notification/email
-        student_id = appt.get('studentId') or appt.get('userId')
-        student_email = appt.get('studentEmail') or appt.get('email') or ''
-        student_name = appt.get('studentName') or ''
-        counsellor_name = appt.get('counsellorName') or ''
+        status_nice = status_label(status)
         date_str = appt.get('appointmentDate') or ''
         time_str = appt.get('appointmentTime') or ''
 
-        # If email not on appointment, try users collection
-        if not student_email and db and student_id:
-            try:
-                uref = db.collection('users').document(student_id)
-                usnap = uref.get()
-                if usnap.exists:
-                    u = usnap.to_dict() or {}
-                    student_email = u.get('email', '')
-                    if not student_name:
-                        student_name = u.get('name') or u.get('displayName') or ''
-            except Exception as e:
-                logger.warning(f"lookup user email failed: {e}")
+        # Status change and student notification commit together
+        student_id = appt.get('studentId') or appt.get('userId')
+        batch = db.batch()
+        batch.update(ref, {'status': status, 'updatedAt': datetime.now()}, option=unchanged_since(snap))
+        notes = []
+        if student_id:
+            notes.append((db.collection('notifications').document(),
+                          status_notification(student_id, appointment_id, status, date_str, time_str)))
+        for note_ref, note in notes:
+            batch.set(note_ref, note)
+        batch.commit()
+        publish_notifications(notes)
 
         # Compose email content
-        status_nice = 'confirmed' if status in ('approved','confirmed') else ('cancelled' if status in ('cancelled','canceled') else status)
-        subject = f"Your session on {date_str} {time_str} was {status_nice}"
-        html_body = f"""
-        <div>
-          <p>Hi {student_name or 'there'},</p>
-          <p>Your counselling session with <strong>{counsellor_name or 'your counsellor'}</strong> on <strong>{date_str}</strong> at <strong>{time_str}</strong> was <strong>{status_nice}</strong>.</p>
-          <p>Please check your bookings page for details.</p>
-          <p>— MINDLY</p>
-        </div>
-        """
-        text_body = f"Hi {student_name or 'there'},\nYour counselling session on {date_str} at {time_str} was {status_nice}.\nPlease check your bookings page for details.\n— MINDLY"
+        _, student_email, student_name = student_contact(appt)
+        subject, html_body, text_body = status_email(
+            student_name, appt.get('counsellorName') or '', date_str, time_str, status_nice)
 
         # Send email if possible
         if student_email:
             send_email(student_email, subject, html_body, text_body)
 
-        # Write notification doc for student
-        try:
-            if db and student_id:
-                db.collection('notifications').add({
-                    'userId': student_id,
-                    'type': 'appointment_status',
-                    'title': f'Appointment {status_nice}',
-                    'body': f'Your session on {date_str} at {time_str} is {status_nice}.',
-                    'appointmentId': appointment_id,
-                    'status': status,
-                    'createdAt': datetime.now(),
-                    'read': False
-                })
-        except Exception as e:
-            logger.error(f"Failed to write notification: {e}")
-
         return jsonify({'success': True})
+    except storage_errors.FailedPrecondition:
+        return jsonify(APPOINTMENT_CONFLICT), 409
     except Exception as e:
         logger.error(f"counsellor_update_status error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 
+MAX_BULK_APPOINTMENT_ACTIONS = int(os.getenv('MAX_BULK_APPOINTMENT_ACTIONS', '200'))
+BULK_ACTION_STATUS = {'approve': 'approved', 'confirm': 'confirmed', 'cancel': 'cancelled', 'pending': 'pending'}
+
+@app.route('/api/counsellor/appointments/bulk', methods=['POST'])
+def counsellor_bulk_actions():
+    """
+    Body: { counsellorId: '<uid>', actions: [{ appointmentId, action: 'approve'|'confirm'|'cancel'|'pending'|'reschedule',
+            appointmentDate, appointmentTime (reschedule only) }] }
+    Ownership of every appointment is checked with one get_all, updates and student notifications
+    commit in packed batches, and status and reschedule emails are handed to a background sender together.
+    Returns one result per action: ok | not_found | forbidden | conflict | error.
+    """
+    try:
+        if not db:
+            return jsonify({'error': 'Database not available'}), 500
+        data = request.get_json() or {}
+        counsellor_id = data.get('counsellorId')
+        actions = data.get('actions')
+        if not counsellor_id:
+            return jsonify({'error': 'counsellorId is required'}), 400
+        if not isinstance(actions, list) or not actions:
+            return jsonify({'error': 'actions must be a non-empty list'}), 400
+        if len(actions) > MAX_BULK_APPOINTMENT_ACTIONS:
+            return jsonify({'error': f'At most {MAX_BULK_APPOINTMENT_ACTIONS} actions per request'}), 400
+
+        seen = set()
+        for i, item in enumerate(actions):
+            appointment_id = item.get('appointmentId') if isinstance(item, dict) else None
+            action = str(item.get('action') or '').lower() if isinstance(item, dict) else ''
+            if not appointment_id or not isinstance(appointment_id, str):
+                return jsonify({'error': f'actions[{i}].appointmentId is required'}), 400
+            if appointment_id in seen:
+                return jsonify({'error': f'actions[{i}]: appointment {appointment_id} appears more than once'}), 400
+            seen.add(appointment_id)
+            if action == 'reschedule':
+                if not item.get('appointmentDate') or not item.get('appointmentTime'):
+                    return jsonify({'error': f'actions[{i}]: appointmentDate and appointmentTime required'}), 400
+            elif action not in BULK_ACTION_STATUS:
+                return jsonify({'error': f'actions[{i}].action must be one of {", ".join(BULK_ACTION_STATUS)}, reschedule'}), 400
+
+        refs = [db.collection('appointments').document(item['appointmentId']) for item in actions]
+        snaps = {snap.id: snap for snap in db.get_all(refs)}
+
+        results = {}
+        groups, applied = [], []
+        now = datetime.now()
+        for item, ref in zip(actions, refs):
+            appointment_id = item['appointmentId']
+            snap = snaps.get(appointment_id)
+            if snap is None or not snap.exists:
+                results[appointment_id] = 'not_found'
+                continue
+            appt = snap.to_dict() or {}
+            if appt.get('counsellorId') != counsellor_id:
+                results[appointment_id] = 'forbidden'
+                continue
+            action = item['action'].lower()
+            student_id = appt.get('studentId') or appt.get('userId')
+            date_str = appt.get('appointmentDate') or ''
+            time_str = appt.get('appointmentTime') or ''
+            if action == 'reschedule':
+                status = None
+                moved = (item['appointmentDate'], item['appointmentTime'])
+                group = [('update', ref, {'appointmentDate': moved[0], 'appointmentTime': moved[1],
+                                          'updatedAt': now}, unchanged_since(snap))]
+                note = reschedule_notification(student_id, appointment_id, date_str, time_str, *moved)
+            else:
+                status = BULK_ACTION_STATUS[action]
+                moved = None
+                group = [('update', ref, {'status': status, 'updatedAt': now}, unchanged_since(snap))]
+                note = status_notification(student_id, appointment_id, status, date_str, time_str)
+            if student_id:
+                group.append(('set', db.collection('notifications').document(), note, None))
+            groups.append(group)
+            applied.append((appointment_id, appt, status, moved))
+
+        notify = []
+        for (appointment_id, appt, status, moved), group, error in zip(applied, groups, commit_groups(db, groups)):
+            if error is None:
+                results[appointment_id] = 'ok'
+                publish_notifications([(ref, data) for op, ref, data, _ in group if op == 'set'])
+                notify.append((appt, status, moved))
+            elif isinstance(error, storage_errors.FailedPrecondition):
+                results[appointment_id] = 'conflict'
+            else:
+                logger.error(f"bulk action on {appointment_id} failed: {error}")
+                results[appointment_id] = 'error'
+
+        # Students without an email on the appointment are looked up in one read
+        missing = {appt.get('studentId') or appt.get('userId') for appt, _, _ in notify
+                   if not (appt.get('studentEmail') or appt.get('email'))} - {None, ''}
+        users = {}
+        if missing:
+            try:
+                users = {snap.id: snap.to_dict() or {} for snap in
+                         db.get_all([db.collection('users').document(uid) for uid in missing]) if snap.exists}
+            except Exception as e:
+                logger.warning(f"bulk lookup of student emails failed: {e}")
+        messages = []
+        for appt, status, moved in notify:
+            user = users.get(appt.get('studentId') or appt.get('userId'), {})
+            student_email = appt.get('studentEmail') or appt.get('email') or user.get('email', '')
+            student_name = appt.get('studentName') or user.get('name') or user.get('displayName') or ''
+            date_str = appt.get('appointmentDate') or ''
+            time_str = appt.get('appointmentTime') or ''
+            if moved:
+                email = reschedule_email(student_name, appt.get('counsellorName') or '', date_str, time_str, *moved)
+            else:
+                email = status_email(student_name, appt.get('counsellorName') or '', date_str, time_str,
+                                     status_label(status))
+            messages.append((student_email,) + email)
+
+        return jsonify({
+            'results': [{'appointmentId': item['appointmentId'], 'result': results[item['appointmentId']]}
+                        for item in actions],
+            'updated': sum(1 for result in results.values() if result == 'ok'),
+            'emailsQueued': queue_emails(messages)
+        })
+    except Exception as e:
+        logger.error(f"counsellor_bulk_actions error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @app.route('/api/counsellor/appointments/<appointment_id>/reschedule', methods=['PATCH'])
 def counsellor_reschedule(appointment_id):
     """
@@ -578,15 +1000,34 @@ def counsellor_reschedule(appointment_id):
             return jsonify({'error': 'appointmentDate and appointmentTime required'}), 400
         if not counsellor_id:
             return jsonify({'error': 'counsellorId is required'}), 400
-        ref = db.collection('appointments').document(appointment_id)
-        snap = ref.get()
-        if not snap.exists:
-            return jsonify({'error': 'Not found'}), 404
+        ref, snap, error = read_owned_appointment(appointment_id, counsellor_id)
+        if error:
+            return error
         appt = snap.to_dict()
-        if appt.get('counsellorId') != counsellor_id:
-            return jsonify({'error': 'Not your appointment'}), 403
-        ref.update({'appointmentDate': new_date, 'appointmentTime': new_time, 'updatedAt': datetime.now()})
+        old_date = appt.get('appointmentDate') or ''
+        old_time = appt.get('appointmentTime') or ''
+
+        # Move and student notification commit together
+        student_id = appt.get('studentId') or appt.get('userId')
+        batch = db.batch()
+        batch.update(ref, {'appointmentDate': new_date, 'appointmentTime': new_time, 'updatedAt': datetime.now()},
+                     option=unchanged_since(snap))
+        notes = []
+        if student_id:
+            notes.append((db.collection('notifications').document(), reschedule_notification(
+                student_id, appointment_id, old_date, old_time, new_date, new_time)))
+        for note_ref, note in notes:
+            batch.set(note_ref, note)
+        batch.commit()
+        publish_notifications(notes)
+
+        _, student_email, student_name = student_contact(appt)
+        if student_email:
+            send_email(student_email, *reschedule_email(
+                student_name, appt.get('counsellorName') or '', old_date, old_time, new_date, new_time))
         return jsonify({'success': True})
+    except storage_errors.FailedPrecondition:
+        return jsonify(APPOINTMENT_CONFLICT), 409
     except Exception as e:
         logger.error(f"counsellor_reschedule error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -608,15 +1049,31 @@ def counsellor_toggle_availability():
         if not counsellor_id or not date_key or not time:
             return jsonify({'error': 'counsellorId, dateKey and time are required'}), 400
         ref = db.document(f"counsellors/{counsellor_id}/availability/{date_key}/slots/{time}")
-        # Ensure doc exists
-        if not ref.get().exists:
-            ref.set({'time': time, 'booked': False})
-        ref.update({'active': active, 'updatedAt': datetime.now()})
+        # One merge write creates the slot if needed; a missing 'booked' reads as not booked
+        ref.set({'time': time, DATE_FIELD: date_key, 'active': active, 'updatedAt': datetime.now()}, merge=True)
+        invalidate_availability(counsellor_id, date_key)
+        slot_index.update(counsellor_id, date_key, time, active=active)
         return jsonify({'success': True})
     except Exception as e:
         logger.error(f"toggle_availability error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def read_day_slots(counsellor_id: str, date_key: str):
+    """All slot docs for one counsellor day, sorted by time, plus their (id, update_time) version."""
+    col = db.collection(f"counsellors/{counsellor_id}/availability/{date_key}/slots")
+    items = []
+    version = []
+    for d in col.stream():
+        data = d.to_dict() or {}
+        data['id'] = d.id
+        data['time'] = normalize_slot_time(data.get('time') or d.id)
+        items.append(data)
+        version.append([d.id, d.update_time])
+    # Sorted as zero-padded times; the stored spelling is kept since it is also the slot's id
+    items.sort(key=lambda x: time_key(x['time']))
+    version.sort()
+    return items, version
+
 @app.route('/api/counsellor/availability', methods=['GET'])
 def counsellor_get_availability():
     """
@@ -630,25 +1087,92 @@ def counsellor_get_availability():
         date_key = request.args.get('dateKey', '')
         if not counsellor_id or not date_key:
             return jsonify({'error': 'counsellorId and dateKey are required'}), 400
-        col = db.collection(f"counsellors/{counsellor_id}/availability/{date_key}/slots")
-        snap = col.stream()
-        items = []
-        for d in snap:
-            data = d.to_dict() or {}
-            data['id'] = d.id
-            items.append(data)
-        # normalize and sort by time
-        def norm_time(t):
-            t = str(t or '').strip().replace('.', ':')
-            return t
-        for it in items:
-            it['time'] = norm_time(it.get('time') or it['id'])
-        items.sort(key=lambda x: str(x.get('time') or ''))
-        return jsonify({'slots': items})
+
+        def build():
+            items, version = read_day_slots(counsellor_id, date_key)
+            return {'slots': items}, version
+
+        return response_versions.respond(
+            f"availability:{counsellor_id}:{date_key}", ROUTE_MAX_AGE['availability'], build)
     except Exception as e:
         logger.error(f"get_availability error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+MAX_AVAILABILITY_RANGE_DAYS = int(os.getenv('MAX_AVAILABILITY_RANGE_DAYS', '31'))
+# Day subcollections of a range are read in parallel; shared so concurrent requests stay bounded
+availability_pool = ThreadPoolExecutor(max_workers=int(os.getenv('AVAILABILITY_RANGE_WORKERS', '8')),
+                                       thread_name_prefix='availability')
+
+@app.route('/api/counsellor/availability/range', methods=['GET'])
+def counsellor_get_availability_range():
+    """
+    Query params: counsellorId=<uid>, from=YYYY-MM-DD, to=YYYY-MM-DD (inclusive)
+    Returns every day in the range with its slots sorted by time, read in one request.
+    """
+    try:
+        if not db:
+            return jsonify({'error': 'Database not available'}), 500
+        counsellor_id = request.args.get('counsellorId', '')
+        from_key = request.args.get('from', '')
+        to_key = request.args.get('to', '')
+        if not counsellor_id or not from_key or not to_key:
+            return jsonify({'error': 'counsellorId, from and to are required'}), 400
+        try:
+            start = datetime.strptime(from_key, '%Y-%m-%d').date()
+            end = datetime.strptime(to_key, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'from and to must be YYYY-MM-DD'}), 400
+        num_days = (end - start).days + 1
+        if num_days < 1:
+            return jsonify({'error': 'to must not be before from'}), 400
+        if num_days > MAX_AVAILABILITY_RANGE_DAYS:
+            return jsonify({'error': f'Range is limited to {MAX_AVAILABILITY_RANGE_DAYS} days'}), 400
+        date_keys = [(start + timedelta(days=i)).isoformat() for i in range(num_days)]
+
+        def build():
+            results = list(availability_pool.map(lambda key: read_day_slots(counsellor_id, key), date_keys))
+            days = [{'dateKey': key, 'slots': items} for key, (items, _) in zip(date_keys, results)]
+            return {'counsellorId': counsellor_id, 'from': from_key, 'to': to_key, 'days': days}, \
+                [[key, version] for key, (_, version) in zip(date_keys, results)]
+
+        return response_versions.respond(
+            f"availability_range:{counsellor_id}:{from_key}:{to_key}", ROUTE_MAX_AGE['availability'], build)
+    except Exception as e:
+        logger.error(f"get_availability_range error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+MAX_SLOT_SEARCH_RESULTS = 100
+
+@app.route('/api/counsellor/availability/search', methods=['GET'])
+def counsellor_search_availability():
+    """
+    Query params (all optional): from/to (ISO datetime, default from now), counsellorId,
+    timeFrom/timeTo (HH:mm, daily window), limit (default 10, max 100)
+    Returns open slots across counsellors, earliest first.
+    """
+    try:
+        if not db:
+            return jsonify({'error': 'Database not available'}), 500
+        try:
+            start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+            end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+            limit = int(request.args.get('limit', '10'))
+        except ValueError:
+            return jsonify({'error': 'from/to must be ISO datetimes and limit a number'}), 400
+        time_from = request.args.get('timeFrom') or None
+        time_to = request.args.get('timeTo') or None
+        for t in (time_from, time_to):
+            if t is not None and not re.fullmatch(r'\d{1,2}[:.]\d{2}', t):
+                return jsonify({'error': 'timeFrom/timeTo must be HH:mm'}), 400
+        limit = max(1, min(limit, MAX_SLOT_SEARCH_RESULTS))
+
+        slot_index.ensure_fresh()
+        slots = slot_index.search(start, end, request.args.get('counsellorId') or None, time_from, time_to, limit)
+        return jsonify({'slots': slots, 'index': slot_index.stats()})
+    except Exception as e:
+        logger.error(f"search_availability error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/counsellor/appointments/<appointment_id>/notes/<counsellor_id>', methods=['GET'])
 def counsellor_get_note(appointment_id, counsellor_id):
     try:
@@ -679,17 +1203,111 @@ def counsellor_put_note(appointment_id, counsellor_id):
         logger.error(f"put_note error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def notifications_since(user_id: str, last_id: str):
+    """Notifications for user_id created after last_id, from the hub buffer or else Firestore."""
+    buffered = notification_hub.replay(user_id, last_id)
+    if buffered is not None:
+        return buffered
+    snap = db.collection('notifications').document(last_id).get()
+    last = snap.to_dict() or {} if snap.exists else {}
+    if last.get('userId') != user_id or not last.get('createdAt'):
+        return []
+    query = (db.collection('notifications')
+             .where('userId', '==', user_id)
+             .where('createdAt', '>', last['createdAt'])
+             .order_by('createdAt')
+             .limit(MAX_NOTIFICATION_RESUME))
+    return [(doc.id, doc.to_dict() or {}) for doc in query.stream()]
+
+
+def request_uid():
+    """
+    uid from the Firebase ID token sent as `Authorization: Bearer <token>` or, for
+    EventSource (which cannot set headers), a `token` query parameter. None when the
+    token is missing or does not verify, including when Firebase is not configured.
+    """
+    header = request.headers.get('Authorization', '')
+    token = header[7:].strip() if header[:7].lower() == 'bearer ' else request.args.get('token', '')
+    if not token:
+        return None
+    try:
+        return firebase_auth.verify_id_token(token)['uid']
+    except Exception as e:
+        logger.info(f"Rejected Firebase ID token: {e}")
+        return None
+
+
+@app.route('/api/notifications/stream', methods=['GET'])
+def notifications_stream():
+    """
+    Query params: userId=<uid>, token=<Firebase ID token> (or an Authorization: Bearer
+    header), lastEventId=<notification id> (optional; EventSource sends the Last-Event-ID
+    header itself when reconnecting)
+    Server-Sent Events: one `notification` event per new notification, with the
+    notification id as the event id. Missed notifications since lastEventId are sent first.
+    """
+    try:
+        user_id = request.args.get('userId', '')
+        if not user_id:
+            return jsonify({'error': 'userId is required'}), 400
+        uid = request_uid()
+        if uid is None:
+            return jsonify({'error': 'Unauthorized'}), 401
+        if uid != user_id:
+            return jsonify({'error': 'Forbidden'}), 403
+        if not db:
+            return jsonify({'error': 'Database not available'}), 500
+        if NOTIFICATIONS_LISTENER:
+            notification_hub.start_listener(db)
+
+        # Subscribe before reading the backlog so nothing published in between is missed
+        q = notification_hub.subscribe(user_id)
+        if q is None:
+            response = jsonify({'error': 'Too many open notification streams, fall back to polling'})
+            response.headers['Retry-After'] = str(int(NOTIFICATION_STREAM_MAX_SECONDS // 10) or 1)
+            return response, 503
+        try:
+            last_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+            backlog = notifications_since(user_id, last_id) if last_id else []
+        except Exception:
+            notification_hub.unsubscribe(user_id, q)
+            raise
+
+        body = notification_hub.stream(user_id, q, backlog, app.json.dumps,
+                                       heartbeat=NOTIFICATION_STREAM_HEARTBEAT,
+                                       max_seconds=NOTIFICATION_STREAM_MAX_SECONDS)
+        response = Response(stream_with_context(body), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        # Also release the slot if the client goes away before the body is ever iterated
+        response.call_on_close(lambda: notification_hub.unsubscribe(user_id, q))
+        return response
+    except Exception as e:
+        logger.error(f"notifications_stream error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'services': {
-            'firebase': db is not None,
+            'firebase': bool(db),
+            'storage': os.getenv('STORAGE_BACKEND', 'firestore').lower(),
             'chatbot': True
         }
     })
 
+# Chat admission: per-caller and global token buckets (rates per minute) and a cap on concurrent LLM calls
+chat_admission = Admission(
+    'chat',
+    user_rate=float(os.getenv('CHAT_USER_RATE_PER_MIN', '10')) / 60,
+    user_burst=float(os.getenv('CHAT_USER_BURST', '5')),
+    global_rate=float(os.getenv('CHAT_GLOBAL_RATE_PER_MIN', '300')) / 60,
+    global_burst=float(os.getenv('CHAT_GLOBAL_BURST', '30')),
+    max_in_flight=int(os.getenv('CHAT_MAX_IN_FLIGHT', str(max(1, int(os.getenv('WORKER_THREADS', '4')) // 2)))))
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
@@ -701,7 +1319,23 @@ def chat():
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
 
-        ai_response = chatbot.generate_response(user_message)
+        # Crisis messages are never throttled. Body ids are not trusted for the per-caller bucket:
+        # a flooder could rotate them, so callers are the verified token uid or else the client address
+        crisis = chatbot.analyzer.is_crisis(user_message)
+        uid = request_uid()
+        refused = chat_admission.enter(f"user:{uid}" if uid else f"ip:{request.remote_addr}", bypass=crisis)
+        if refused:
+            reason, wait = refused
+            retry_after = max(1, math.ceil(wait))
+            response = jsonify({'error': 'Too many requests, please try again shortly',
+                                'reason': reason, 'retryAfter': retry_after})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+        started = time.perf_counter()
+        try:
+            ai_response = chatbot.generate_response(user_message)
+        finally:
+            chat_admission.leave(time.perf_counter() - started)
 
         if db and session_id:
             try:
@@ -712,9 +1346,11 @@ def chat():
                     'ai_response': ai_response.get('ai_reply', ai_response.get('response', '')),
                     'sentiment': ai_response.get('sentiment', {}),
                     'timestamp': datetime.now(),
+                    'updatedAt': datetime.now(),
                     'escalation_level': ai_response.get('escalation_level', 'low')
                 }
                 db.collection('chat_conversations').add(conversation_data)
+                response_versions.invalidate(f"sentiment_trends:{user_id}")
             except Exception as e:
                 logger.error(f"Failed to save conversation: {e}")
 
@@ -724,6 +1360,63 @@ def chat():
         logger.error(f"Chat error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def save_assessments(assessment_writes, extra_writes=()):
+    """
+    Write assessment documents, any extra documents and the updated per-student
+    assessment summaries in a single batched commit. Summary writes are conditional
+    on the version read, so if another save for the same student commits in between
+    the whole commit fails and is recomputed from the fresh summary.
+    """
+    writes = [('set', ref, data, None) for ref, data in list(assessment_writes) + list(extra_writes)]
+    new = [(ref.id, data) for ref, data in assessment_writes]
+    for attempt in range(assessment_index.SUMMARY_ATTEMPTS):
+        error = commit_groups(db, [writes + assessment_index.summary_writes(db, new)])[0]
+        if error is None:
+            return
+        if not assessment_index.is_conflict(error) or attempt + 1 == assessment_index.SUMMARY_ATTEMPTS:
+            raise error
+
+# Questionnaires only change with a deploy, so each (type, locale) is serialized and compressed once
+question_payloads = {}
+QUESTIONS_MAX_AGE = int(os.getenv('ASSESSMENT_QUESTIONS_MAX_AGE', '3600'))
+
+def get_question_payload(assessment_type: str, locale: str) -> PrebuiltPayload:
+    key = (assessment_type, locale)
+    payload = question_payloads.get(key)
+    if payload is None:
+        payload = PrebuiltPayload(assessment.get_assessment_questions(assessment_type, locale), app.json.dumps)
+        question_payloads[key] = payload
+    return payload
+
+@app.route('/api/assessment/questions/<assessment_type>', methods=['GET'])
+def assessment_questions(assessment_type):
+    """
+    PHQ-9/GAD-7 questionnaire. Locale comes from ?locale= or Accept-Language (English fallback).
+    Fetch the Content-Location URL (which pins ?v=<version>) to get an immutable, year-long cacheable copy.
+    """
+    try:
+        assessment_type = assessment_type.lower()
+        if assessment_type not in INSTRUMENTS:
+            return jsonify({'error': 'Invalid assessment type. Use "phq9" or "gad7".'}), 400
+
+        locales = assessment.available_locales()
+        requested = request.args.get('locale')
+        if requested:
+            locale = requested.lower() if requested.lower() in locales else DEFAULT_LOCALE
+        else:
+            locale = request.accept_languages.best_match(locales, default=DEFAULT_LOCALE)
+
+        payload = get_question_payload(assessment_type, locale)
+        return payload.respond(
+            QUESTIONS_MAX_AGE,
+            location=url_for('assessment_questions', assessment_type=assessment_type, locale=locale, v=payload.version),
+            vary=() if requested else ('Accept-Language',),
+        )
+
+    except Exception as e:
+        logger.error(f"Assessment questions error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/assessment/phq9', methods=['POST'])
 def phq9_assessment():
     try:
@@ -745,9 +1438,11 @@ def phq9_assessment():
                     'score': result['score'],
                     'severity': result['severity'],
                     'recommendations': result['recommendations'],
-                    'timestamp': datetime.now()
+                    'suicide_risk': result['suicide_risk'],
+                    'timestamp': datetime.now(),
+                    'updatedAt': datetime.now()
                 }
-                db.collection('assessments').add(assessment_data)
+                save_assessments([(db.collection('assessments').document(), assessment_data)])
             except Exception as e:
                 logger.error(f"Failed to save PHQ-9 assessment: {e}")
 
@@ -778,9 +1473,10 @@ def gad7_assessment():
                     'score': result['score'],
                     'severity': result['severity'],
                     'recommendations': result['recommendations'],
-                    'timestamp': datetime.now()
+                    'timestamp': datetime.now(),
+                    'updatedAt': datetime.now()
                 }
-                db.collection('assessments').add(assessment_data)
+                save_assessments([(db.collection('assessments').document(), assessment_data)])
             except Exception as e:
                 logger.error(f"Failed to save GAD-7 assessment: {e}")
 
@@ -790,6 +1486,166 @@ def gad7_assessment():
         logger.error(f"GAD-7 assessment error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/assessment/combined', methods=['POST'])
+def combined_assessment():
+    """
+    Score PHQ-9 and GAD-7 together and save both plus a combined summary in one batched commit.
+    Body: {"phq9_responses": [9 x 0-3], "gad7_responses": [7 x 0-3], "user_id": "..."}
+    """
+    try:
+        data = request.get_json()
+        phq9_responses = data.get('phq9_responses', [])
+        gad7_responses = data.get('gad7_responses', [])
+        user_id = data.get('user_id', '')
+
+        if len(phq9_responses) != 9:
+            return jsonify({'error': 'PHQ-9 requires exactly 9 responses'}), 400
+        if len(gad7_responses) != 7:
+            return jsonify({'error': 'GAD-7 requires exactly 7 responses'}), 400
+
+        result = assessment.get_combined_assessment(phq9_responses, gad7_responses)
+        for key in ('phq9', 'gad7'):
+            if 'error' in result.get(key, {}):
+                return jsonify({'error': result[key]['error']}), 400
+        if 'error' in result:
+            return jsonify({'error': result['error']}), 400
+
+        if db and user_id:
+            try:
+                now = datetime.now()
+                phq9, gad7 = result['phq9'], result['gad7']
+                phq9_ref = db.collection('assessments').document()
+                gad7_ref = db.collection('assessments').document()
+                combined_ref = db.collection('combined_assessments').document()
+                phq9_data = {
+                    'user_id': user_id,
+                    'type': 'PHQ-9',
+                    'responses': phq9_responses,
+                    'score': phq9['score'],
+                    'severity': phq9['severity'],
+                    'recommendations': phq9['recommendations'],
+                    'suicide_risk': phq9['suicide_risk'],
+                    'timestamp': now,
+                    'updatedAt': now
+                }
+                gad7_data = {
+                    'user_id': user_id,
+                    'type': 'GAD-7',
+                    'responses': gad7_responses,
+                    'score': gad7['score'],
+                    'severity': gad7['severity'],
+                    'recommendations': gad7['recommendations'],
+                    'timestamp': now,
+                    'updatedAt': now
+                }
+                combined_data = {
+                    'user_id': user_id,
+                    'phq9_assessment_id': phq9_ref.id,
+                    'gad7_assessment_id': gad7_ref.id,
+                    'phq9_score': phq9['score'],
+                    'phq9_severity': phq9['severity'],
+                    'gad7_score': gad7['score'],
+                    'gad7_severity': gad7['severity'],
+                    'suicide_risk': phq9['suicide_risk'],
+                    'overall_risk': result['overall_risk'],
+                    'recommendations': result['combined_recommendations'],
+                    'timestamp': now
+                }
+                save_assessments([(phq9_ref, phq9_data), (gad7_ref, gad7_data)],
+                                 extra_writes=[(combined_ref, combined_data)])
+                result['assessment_ids'] = {'phq9': phq9_ref.id, 'gad7': gad7_ref.id, 'combined': combined_ref.id}
+            except Exception as e:
+                logger.error(f"Failed to save combined assessment: {e}")
+
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"Combined assessment error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+MAX_BULK_ASSESSMENTS = int(os.getenv('MAX_BULK_ASSESSMENTS', '20000'))
+
+@app.route('/api/assessment/bulk', methods=['POST'])
+def bulk_assessment():
+    """
+    Score a batch of PHQ-9 or GAD-7 forms, e.g. from a screening day.
+    Body: {"type": "phq9"|"gad7", "responses": [[0-3, ...], ...], "user_ids": [...] (optional)}
+    Rows with a user id are saved to assessments in batched writes.
+    """
+    try:
+        data = request.get_json()
+        assessment_type = data.get('type', '')
+        responses = data.get('responses', [])
+        user_ids = data.get('user_ids')
+
+        if not isinstance(responses, list) or not responses:
+            return jsonify({'error': 'responses must be a non-empty list of forms'}), 400
+        if len(responses) > MAX_BULK_ASSESSMENTS:
+            return jsonify({'error': f'At most {MAX_BULK_ASSESSMENTS} forms per request'}), 400
+        if user_ids is not None and (not isinstance(user_ids, list) or len(user_ids) != len(responses)):
+            return jsonify({'error': 'user_ids must match responses in length'}), 400
+
+        try:
+            with span('assessment.bulk_score'):
+                result = assessment.score_bulk(assessment_type, responses)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        valid = result['valid'].tolist()
+        scores = result['scores'].tolist()
+        codes = result['severity_codes'].tolist()
+        levels = result['levels']
+        suicide_risk = result['suicide_risk'].tolist() if 'suicide_risk' in result else None
+
+        saved = 0
+        if db and user_ids:
+            rows = result['matrix'].tolist()
+            now = datetime.now()
+            collection = db.collection('assessments')
+
+            def writes():
+                for i, user_id in enumerate(user_ids):
+                    if not (user_id and valid[i]):
+                        continue
+                    level = levels[codes[i]]
+                    assessment_data = {
+                        'user_id': user_id,
+                        'type': result['type'],
+                        'responses': rows[i],
+                        'score': scores[i],
+                        'severity': level['severity'],
+                        'recommendations': level['recommendations'],
+                        'timestamp': now,
+                        'updatedAt': now
+                    }
+                    if suicide_risk is not None:
+                        assessment_data['suicide_risk'] = suicide_risk[i]
+                    yield collection.document(), assessment_data
+
+            try:
+                saved = assessment_index.save_with_summaries(db, list(writes()))
+            except Exception as e:
+                logger.error(f"Failed to save bulk {result['type']} assessments: {e}")
+
+        response = {
+            'type': result['type'],
+            'count': len(scores),
+            'scores': [score if ok else None for score, ok in zip(scores, valid)],
+            'severity': [levels[code]['severity'] if code >= 0 else None for code in codes],
+            'invalid_rows': [i for i, ok in enumerate(valid) if not ok],
+            'severity_levels': {level['severity']: {'description': level['description'],
+                                                    'recommendations': level['recommendations']}
+                                for level in levels},
+            'saved': saved
+        }
+        if suicide_risk is not None:
+            response['suicide_risk_rows'] = [i for i, risk in enumerate(suicide_risk) if risk]
+        return jsonify(response)
+
+    except Exception as e:
+        logger.error(f"Bulk assessment error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/escalation', methods=['POST'])
 def handle_escalation():
     try:
@@ -798,6 +1654,7 @@ def handle_escalation():
         escalation_level = data.get('escalation_level', 'high')
         message = data.get('message', '')
 
+        escalation_id = None
         if db and user_id:
             try:
                 escalation_data = {
@@ -805,9 +1662,14 @@ def handle_escalation():
                     'escalation_level': escalation_level,
                     'message': message,
                     'timestamp': datetime.now(),
+                    'updatedAt': datetime.now(),
                     'status': 'pending'
                 }
-                db.collection('escalations').add(escalation_data)
+                escalation_ref = db.collection('escalations').document()
+                escalation_ref.set(escalation_data)
+                escalation_id = escalation_ref.id
+                # Counsellors are paged from the dispatcher thread; the student gets resources right away
+                escalation_dispatcher.submit(escalation_id, escalation_level)
             except Exception as e:
                 logger.error(f"Failed to save escalation: {e}")
 
@@ -827,6 +1689,7 @@ def handle_escalation():
 
         return jsonify({
             'escalation_logged': True,
+            'escalation_id': escalation_id,
             'crisis_resources': crisis_resources
         })
 
@@ -834,6 +1697,47 @@ def handle_escalation():
         logger.error(f"Escalation error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/escalation/<escalation_id>/ack', methods=['POST'])
+def acknowledge_escalation(escalation_id):
+    """
+    Body JSON: { counsellorId: '<uid>' }
+    Take an escalation; stops further paging. Only paged or on-call counsellors may acknowledge.
+    """
+    try:
+        if not db:
+            return jsonify({'error': 'Database not available'}), 500
+        data = request.get_json() or {}
+        counsellor_id = data.get('counsellorId')
+        if not counsellor_id:
+            return jsonify({'error': 'counsellorId is required'}), 400
+
+        result, escalation = escalation_dispatcher.acknowledge(escalation_id, counsellor_id)
+        if result == 'not_found':
+            return jsonify({'error': 'Escalation not found'}), 404
+        if result == 'forbidden':
+            return jsonify({'error': 'Forbidden: counsellor is not on call for this escalation'}), 403
+        if result == 'conflict':
+            return jsonify({'error': 'Escalation already acknowledged or closed',
+                            'status': escalation.get('status'),
+                            'acknowledgedBy': escalation.get('acknowledgedBy')}), 409
+        return jsonify({'success': True, 'status': 'acknowledged',
+                        'acknowledgedBy': escalation.get('acknowledgedBy'),
+                        'acknowledgedAt': escalation.get('acknowledgedAt')})
+    except Exception as e:
+        logger.error(f"acknowledge_escalation error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/escalation/stats', methods=['GET'])
+def escalation_stats():
+    """
+    Dispatcher queue depth and time-to-notify / time-to-ack percentiles for this worker.
+    Admin only: X-Admin-Token must match ANALYTICS_TOKEN, and the route is closed while it is unset.
+    """
+    error = admin_token_error()
+    if error:
+        return error
+    return jsonify(escalation_dispatcher.stats())
+
 @app.route('/api/analytics/sentiment-trends', methods=['GET'])
 def get_sentiment_trends():
     try:
@@ -841,27 +1745,101 @@ def get_sentiment_trends():
         if not db:
             return jsonify({'error': 'Database not available'}), 500
 
-        conversations = db.collection('chat_conversations')\
+        base = db.collection('chat_conversations')\
             .where('user_id', '==', user_id)\
-            .order_by('timestamp', direction=firestore.Query.DESCENDING)\
-            .limit(50)\
-            .stream()
-
-        sentiment_data = []
-        for conv in conversations:
-            conv_data = conv.to_dict()
-            sentiment_data.append({
-                'timestamp': conv_data['timestamp'].isoformat(),
-                'sentiment': conv_data.get('sentiment', {}).get('label', 'neutral'),
-                'score': conv_data.get('sentiment', {}).get('score', 0)
-            })
+            .order_by('timestamp', direction='DESCENDING')
+
+        def probe():
+            # Newest conversation identifies the window: one read instead of 50
+            return [[doc.id, doc.update_time] for doc in base.limit(1).stream()]
+
+        def build():
+            sentiment_data = []
+            version = []
+            for conv in base.limit(50).stream():
+                conv_data = conv.to_dict()
+                if not version:
+                    version = [[conv.id, conv.update_time]]
+                sentiment_data.append({
+                    'timestamp': conv_data['timestamp'].isoformat(),
+                    'sentiment': conv_data.get('sentiment', {}).get('label', 'neutral'),
+                    'score': conv_data.get('sentiment', {}).get('score', 0)
+                })
+            return {'sentiment_trends': sentiment_data}, version
 
-        return jsonify({'sentiment_trends': sentiment_data})
+        return response_versions.respond(
+            f"sentiment_trends:{user_id}", ROUTE_MAX_AGE['sentiment_trends'], build, probe)
 
     except Exception as e:
         logger.error(f"Analytics error: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+# Columnar snapshot of assessments, mood scores and chat sentiment for cohort queries
+cohort_analytics = CohortAnalytics(
+    lambda: db,
+    refresh_interval=float(os.getenv('ANALYTICS_REFRESH_SECONDS', '60')),
+    full_refresh_interval=float(os.getenv('ANALYTICS_FULL_REFRESH_SECONDS', '21600')),
+)
+ANALYTICS_MIN_GROUP = int(os.getenv('ANALYTICS_MIN_GROUP', '5'))
+
+def admin_token_error():
+    """401 response unless X-Admin-Token matches ANALYTICS_TOKEN; admin routes stay closed while it is unset."""
+    token = os.getenv('ANALYTICS_TOKEN', '')
+    supplied = request.headers.get('X-Admin-Token', '')
+    if not token or not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
+
+@app.route('/api/analytics/cohort', methods=['GET'])
+def get_cohort_analytics():
+    """
+    Aggregate one metric across students.
+    Query: metric=phq9|gad7|mood|sentiment, groupBy=college,year,day|week|month,
+    from/to (ISO dates), percentiles=50,90
+    """
+    try:
+        error = admin_token_error()
+        if error:
+            return error
+        if not db:
+            return jsonify({'error': 'Database not available'}), 500
+
+        metric = request.args.get('metric', 'phq9').lower()
+        if metric not in METRICS:
+            return jsonify({'error': f"metric must be one of {', '.join(METRICS)}"}), 400
+        group_by = [dim.strip().lower() for dim in request.args.get('groupBy', '').split(',') if dim.strip()]
+        if any(dim not in DIMENSIONS for dim in group_by) or len(set(group_by)) != len(group_by):
+            return jsonify({'error': f"groupBy must be a list of {', '.join(DIMENSIONS)}"}), 400
+        if sum(dim in TIME_DIMENSIONS for dim in group_by) > 1:
+            return jsonify({'error': 'groupBy accepts at most one of day, week, month'}), 400
+        try:
+            start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+            end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+            percentiles = [float(p) for p in request.args.get('percentiles', '50,90').split(',') if p.strip()]
+        except ValueError:
+            return jsonify({'error': 'from/to must be ISO dates and percentiles numbers'}), 400
+        if any(not 0 <= p <= 100 for p in percentiles):
+            return jsonify({'error': 'percentiles must be between 0 and 100'}), 400
+        for bound in (start, end):
+            if bound is not None and bound.tzinfo is not None:
+                return jsonify({'error': 'from/to must not carry a timezone (UTC is assumed)'}), 400
+
+        key = f"cohort:{metric}:{','.join(group_by)}:{start}:{end}:{','.join(f'{p:g}' for p in percentiles)}"
+
+        def probe():
+            # Snapshot generation: bumped only when a refresh changed the underlying rows
+            return [key, cohort_analytics.ensure_fresh()]
+
+        def build():
+            version = probe()
+            return cohort_analytics.query(metric, group_by, start, end, percentiles, ANALYTICS_MIN_GROUP), version
+
+        return response_versions.respond(key, ROUTE_MAX_AGE['cohort'], build, probe)
+
+    except Exception as e:
+        logger.error(f"Cohort analytics error: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
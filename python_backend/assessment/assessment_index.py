@@ -0,0 +1,232 @@
+"""
+Per-student longitudinal assessment summary.
+
+``assessment_summaries/{userId}`` holds, per instrument, the latest result, a
+fixed-size ring of recent scores, the baseline (first) score and precomputed
+change flags, so counsellor views and risk dashboards read one small document
+instead of scanning a student's whole assessment history. Summaries are folded
+forward on every assessment write; a student who has none yet (history written
+before summaries existed) gets one built from their stored assessments first.
+``build_summary`` rebuilds one from history.
+
+Change criteria follow common stepped-care conventions:
+    reliable change   |latest - baseline| >= 6 (PHQ-9) / 4 (GAD-7)
+    response          baseline at caseness and latest <= 50% of baseline
+    remission         baseline at caseness and latest below 5
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from storage import errors as storage_errors
+from storage.batch_writer import Write, commit_groups
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLLECTION = 'assessment_summaries'
+HISTORY_SIZE = 12
+# Times a summary write is recomputed after another write for the same student got there first
+SUMMARY_ATTEMPTS = 5
+# Firestore accepts at most 30 values in an 'in' filter
+IN_QUERY_LIMIT = 30
+
+INSTRUMENT_RULES = {
+    'PHQ-9': {'key': 'phq9', 'reliable_change': 6, 'caseness': 10, 'remission_below': 5},
+    'GAD-7': {'key': 'gad7', 'reliable_change': 4, 'caseness': 8, 'remission_below': 5},
+}
+
+
+def _sort_key(timestamp: Any) -> datetime:
+    if not isinstance(timestamp, datetime):
+        return datetime.min
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _derive(entry: Dict[str, Any], rules: Dict[str, Any]):
+    """Recompute the change fields of one instrument entry from its baseline, history and latest."""
+    latest = entry['latest']['score']
+    baseline = entry['baseline']['score']
+    history = entry['history']
+    previous = history[-2]['score'] if len(history) >= 2 else None
+
+    entry['previousScore'] = previous
+    entry['delta'] = latest - previous if previous is not None else None
+    entry['changeFromBaseline'] = latest - baseline
+    if entry['count'] < 2:
+        entry['reliableChange'] = None
+    elif baseline - latest >= rules['reliable_change']:
+        entry['reliableChange'] = 'improved'
+    elif latest - baseline >= rules['reliable_change']:
+        entry['reliableChange'] = 'deteriorated'
+    else:
+        entry['reliableChange'] = 'no_change'
+    at_caseness = entry['count'] >= 2 and baseline >= rules['caseness']
+    entry['response'] = at_caseness and latest <= baseline * 0.5
+    entry['remission'] = at_caseness and latest < rules['remission_below']
+
+
+def add_result(summary: Dict[str, Any], assessment_id: str, data: Dict[str, Any]) -> bool:
+    """
+    Fold one assessment document into a summary (in place). Results must arrive
+    oldest first. Returns False for documents that are not PHQ-9/GAD-7.
+    """
+    assessment_type = str(data.get('type') or '').upper()
+    rules = INSTRUMENT_RULES.get(assessment_type)
+    if rules is None or not isinstance(data.get('score'), (int, float)):
+        return False
+    timestamp = data.get('timestamp') or data.get('createdAt')
+    point = {'score': data['score'], 'severity': data.get('severity') or '', 'timestamp': timestamp}
+
+    entry = summary.get(rules['key'])
+    if entry is None:
+        entry = summary[rules['key']] = {'baseline': dict(point), 'history': [], 'count': 0}
+    latest = dict(point, assessmentId=assessment_id)
+    if 'suicide_risk' in data:
+        latest['suicideRisk'] = bool(data['suicide_risk'])
+    entry['latest'] = latest
+    entry['history'] = (entry['history'] + [point])[-HISTORY_SIZE:]
+    entry['count'] += 1
+    _derive(entry, rules)
+    return True
+
+
+def empty_summary(user_id: str) -> Dict[str, Any]:
+    return {'userId': user_id, 'phq9': None, 'gad7': None}
+
+
+def build_summary(user_id: str, assessments: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Build a summary from (assessment id, document) pairs in any order."""
+    summary = empty_summary(user_id)
+    ordered = sorted(assessments, key=lambda item: _sort_key(item[1].get('timestamp') or item[1].get('createdAt')))
+    for assessment_id, data in ordered:
+        add_result(summary, assessment_id, data)
+    summary['updatedAt'] = datetime.now()
+    return summary
+
+
+def load_history(db, user_ids: Iterable[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Stored assessments per student as {user id: {assessment id: document}},
+    matching both user id field shapes, 30 students per query.
+    """
+    history: Dict[str, Dict[str, Dict[str, Any]]] = {user_id: {} for user_id in user_ids}
+    ids = list(history)
+    collection = db.collection('assessments')
+    for start in range(0, len(ids), IN_QUERY_LIMIT):
+        chunk = ids[start:start + IN_QUERY_LIMIT]
+        for field in ('user_id', 'userId'):
+            for doc in collection.where(field, 'in', chunk).stream():
+                data = doc.to_dict() or {}
+                if data.get(field) in history:
+                    history[data[field]][doc.id] = data
+    return history
+
+
+def _user_id(data: Dict[str, Any]) -> Optional[str]:
+    return data.get('user_id') or data.get('userId')
+
+
+def summary_writes(db, assessments: List[Tuple[str, Dict[str, Any]]]) -> List[Write]:
+    """
+    Writes (batch_writer ``Write`` tuples) that fold new (assessment id, document)
+    pairs into their students' summaries, reading all affected summaries in one
+    get_all. Students without a summary get one built from their stored
+    assessments before the new ones are applied, so earlier history is not lost.
+
+    Existing summaries are updated only if unchanged since this read and missing
+    ones are created, so when another write for the same student lands in
+    between, the commit fails (see ``is_conflict``) instead of overwriting it.
+    """
+    by_user: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+    for assessment_id, data in assessments:
+        user_id = _user_id(data)
+        if user_id and str(data.get('type') or '').upper() in INSTRUMENT_RULES:
+            by_user.setdefault(user_id, []).append((assessment_id, data))
+    if not by_user:
+        return []
+
+    collection = db.collection(SUMMARY_COLLECTION)
+    refs = {user_id: collection.document(user_id) for user_id in by_user}
+    snaps = {snap.id: snap for snap in db.get_all(list(refs.values())) if snap.exists}
+
+    missing = [user_id for user_id in by_user if user_id not in snaps]
+    stored = load_history(db, missing) if missing else {}
+
+    writes = []
+    now = datetime.now()
+    for user_id, items in by_user.items():
+        snap = snaps.get(user_id)
+        if snap is not None:
+            summary = snap.to_dict() or empty_summary(user_id)
+        else:
+            history = stored.get(user_id, {})
+            for assessment_id, _ in items:
+                history.pop(assessment_id, None)
+            summary = build_summary(user_id, history.items())
+        for assessment_id, data in items:
+            add_result(summary, assessment_id, data)
+        summary['updatedAt'] = now
+        if snap is not None:
+            writes.append(('update', refs[user_id], summary, db.write_option(last_update_time=snap.update_time)))
+        else:
+            writes.append(('create', refs[user_id], summary, None))
+    return writes
+
+
+def is_conflict(error: Exception) -> bool:
+    """Whether a commit failed because a summary changed (or appeared) after it was read."""
+    return isinstance(error, (storage_errors.FailedPrecondition, storage_errors.AlreadyExists))
+
+
+def save_with_summaries(db, assessment_writes: List[Tuple[Any, Dict[str, Any]]],
+                        attempts: int = SUMMARY_ATTEMPTS) -> int:
+    """
+    Write (reference, data) assessment documents with their students' summaries,
+    each student's assessments and summary in one batch so a summary never lags
+    its stored history. Students whose summary changed meanwhile are re-read and
+    retried; any other failure is logged and that student's rows are not saved.
+    Returns the number of assessments written.
+    """
+    by_user: Dict[str, List[Tuple[Any, Dict[str, Any]]]] = {}
+    for ref, data in assessment_writes:
+        by_user.setdefault(_user_id(data), []).append((ref, data))
+    saved = 0
+    for attempt in range(attempts):
+        users = list(by_user)
+        summaries = {write[1].id: write for write in
+                     summary_writes(db, [(ref.id, data) for user_id in users for ref, data in by_user[user_id]])}
+        groups = [[('set', ref, data, None) for ref, data in by_user[user_id]]
+                  + ([summaries[user_id]] if user_id in summaries else []) for user_id in users]
+        retry = {}
+        for user_id, group, error in zip(users, groups, commit_groups(db, groups)):
+            if error is None:
+                saved += len(by_user[user_id])
+            elif is_conflict(error) and attempt + 1 < attempts:
+                retry[user_id] = by_user[user_id]
+            else:
+                logger.error(f"Failed to save {len(by_user[user_id])} assessments for {user_id}: {error}")
+        if not retry:
+            break
+        by_user = retry
+    return saved
+
+
+def insight_view(entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The counsellor-facing slice of one instrument entry."""
+    if not entry:
+        return None
+    return {
+        'score': entry['latest']['score'],
+        'severity': entry['latest'].get('severity') or '',
+        'previousScore': entry.get('previousScore'),
+        'delta': entry.get('delta'),
+        'baselineScore': entry['baseline']['score'],
+        'reliableChange': entry.get('reliableChange'),
+        'response': entry.get('response', False),
+        'remission': entry.get('remission', False),
+        'count': entry.get('count', 0),
+        'history': [point['score'] for point in entry.get('history', [])],
+    }
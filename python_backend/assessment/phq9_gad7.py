@@ -1,16 +1,33 @@
+import glob
+import json
 import logging
-from typing import Dict, List, Any
+import os
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from datetime import datetime
 
+from utils.lazy_import import lazy_import
+
+# Only the bulk scoring path needs NumPy
+np = lazy_import('numpy')
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_LOCALE = 'en'
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+
+# Instrument key -> (label, number of items)
+INSTRUMENTS = {
+    'phq9': ('PHQ-9', 9),
+    'gad7': ('GAD-7', 7),
+}
+
 class PHQ9GAD7Assessment:
     """
     PHQ-9 (Patient Health Questionnaire-9) and GAD-7 (Generalized Anxiety Disorder-7) 
     assessment tools for mental health screening.
     """
     
-    def __init__(self):
+    def __init__(self, locales_dir: Optional[str] = None):
         # PHQ-9 questions for depression screening
         self.phq9_questions = [
             "Little interest or pleasure in doing things",
@@ -50,6 +67,66 @@ class PHQ9GAD7Assessment:
             (10, 14): {'severity': 'moderate', 'description': 'Moderate anxiety'},
             (15, 21): {'severity': 'severe', 'description': 'Severe anxiety'}
         }
+
+        # Every result depends only on the score (or the pair of severities), so it is
+        # computed once here into immutable tables indexed by score
+        self._phq9_severity_table = self._build_severity_table(self.phq9_interpretation)
+        self._gad7_severity_table = self._build_severity_table(self.gad7_interpretation)
+        self._phq9_recommendation_table = tuple(
+            self._build_phq9_recommendations(score) for score in range(len(self._phq9_severity_table)))
+        self._gad7_recommendation_table = tuple(
+            self._build_gad7_recommendations(score) for score in range(len(self._gad7_severity_table)))
+        self._combined_table = self._build_combined_table()
+
+        # Built on first bulk request so importing this module does not load NumPy
+        self._bulk_tables: Dict[str, Dict[str, Any]] = {}
+
+        # Translated question text, one <locale>.json per language; English is built in
+        self.translations = self._load_translations(locales_dir or LOCALES_DIR)
+
+    @staticmethod
+    def _load_translations(locales_dir: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Read <locale>.json files shaped like
+        {"phq9": {"title": ..., "description": ..., "scale": {"0": ...}, "questions": [...]}, "gad7": {...}}.
+        Any key may be omitted to fall back to English.
+        """
+        translations = {}
+        for path in sorted(glob.glob(os.path.join(locales_dir, '*.json'))):
+            locale = os.path.splitext(os.path.basename(path))[0].lower()
+            try:
+                with open(path, encoding='utf-8') as f:
+                    translations[locale] = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load assessment locale {path}: {e}")
+        return translations
+
+    def available_locales(self) -> List[str]:
+        return [DEFAULT_LOCALE] + sorted(locale for locale in self.translations if locale != DEFAULT_LOCALE)
+
+    @staticmethod
+    def _build_severity_table(interpretation: Dict[Tuple[int, int], Dict[str, str]]) -> Tuple[Dict[str, str], ...]:
+        """Expand {(min, max): info} into a tuple indexed by score."""
+        max_score = max(max_score for _, max_score in interpretation)
+        table = [None] * (max_score + 1)
+        for (min_score, max_score), info in interpretation.items():
+            for score in range(min_score, max_score + 1):
+                table[score] = info
+        return tuple(table)
+
+    def _build_combined_table(self) -> Dict[Tuple[str, str], Tuple[str, Tuple[str, ...]]]:
+        """(PHQ-9 severity, GAD-7 severity) -> (overall risk, combined recommendations)."""
+        table = {}
+        for phq9_min, _ in sorted(self.phq9_interpretation):
+            for gad7_min, _ in sorted(self.gad7_interpretation):
+                phq9_result = {'severity': self._phq9_severity_table[phq9_min]['severity'],
+                               'recommendations': self._phq9_recommendation_table[phq9_min]}
+                gad7_result = {'severity': self._gad7_severity_table[gad7_min]['severity'],
+                               'recommendations': self._gad7_recommendation_table[gad7_min]}
+                table[(phq9_result['severity'], gad7_result['severity'])] = (
+                    self._compute_overall_risk(phq9_result['severity'], gad7_result['severity']),
+                    self._merge_recommendations(phq9_result['recommendations'], gad7_result['recommendations']))
+        return table
     
     def calculate_phq9_score(self, responses: List[int]) -> Dict[str, Any]:
         """
@@ -153,19 +230,25 @@ class PHQ9GAD7Assessment:
     
     def _get_phq9_severity(self, score: int) -> Dict[str, str]:
         """Get PHQ-9 severity level based on score."""
-        for (min_score, max_score), info in self.phq9_interpretation.items():
-            if min_score <= score <= max_score:
-                return info
+        if 0 <= score < len(self._phq9_severity_table):
+            return self._phq9_severity_table[score]
         return {'severity': 'unknown', 'description': 'Score out of range'}
     
     def _get_gad7_severity(self, score: int) -> Dict[str, str]:
         """Get GAD-7 severity level based on score."""
-        for (min_score, max_score), info in self.gad7_interpretation.items():
-            if min_score <= score <= max_score:
-                return info
+        if 0 <= score < len(self._gad7_severity_table):
+            return self._gad7_severity_table[score]
         return {'severity': 'unknown', 'description': 'Score out of range'}
     
-    def _generate_phq9_recommendations(self, score: int, severity_info: Dict[str, str]) -> List[str]:
+    def _generate_phq9_recommendations(self, score: int, severity_info: Dict[str, str]) -> Sequence[str]:
+        """Get the (shared, immutable) recommendations for a PHQ-9 score."""
+        return self._phq9_recommendation_table[score]
+    
+    def _generate_gad7_recommendations(self, score: int, severity_info: Dict[str, str]) -> Sequence[str]:
+        """Get the (shared, immutable) recommendations for a GAD-7 score."""
+        return self._gad7_recommendation_table[score]
+    
+    def _build_phq9_recommendations(self, score: int) -> Tuple[str, ...]:
         """Generate recommendations based on PHQ-9 score."""
         recommendations = []
         
@@ -210,9 +293,9 @@ class PHQ9GAD7Assessment:
                 'Maintain healthy lifestyle habits'
             ])
         
-        return recommendations
+        return tuple(recommendations)
     
-    def _generate_gad7_recommendations(self, score: int, severity_info: Dict[str, str]) -> List[str]:
+    def _build_gad7_recommendations(self, score: int) -> Tuple[str, ...]:
         """Generate recommendations based on GAD-7 score."""
         recommendations = []
         
@@ -249,10 +332,112 @@ class PHQ9GAD7Assessment:
                 'Maintain healthy lifestyle habits'
             ])
         
-        return recommendations
+        return tuple(recommendations)
     
-    def get_assessment_questions(self, assessment_type: str) -> Dict[str, Any]:
-        """Get assessment questions for frontend."""
+    def _bulk_lookup(self, key: str) -> Dict[str, Any]:
+        """Severity lookup array (score -> level index) and per-level results for one instrument."""
+        tables = self._bulk_tables
+        if key not in tables:
+            if key == 'phq9':
+                interpretation, recommend = self.phq9_interpretation, self._generate_phq9_recommendations
+            else:
+                interpretation, recommend = self.gad7_interpretation, self._generate_gad7_recommendations
+            ranges = sorted(interpretation.items())
+            codes = np.zeros(ranges[-1][0][1] + 1, dtype=np.int8)
+            levels = []
+            for code, ((min_score, max_score), info) in enumerate(ranges):
+                codes[min_score:max_score + 1] = code
+                levels.append({
+                    'severity': info['severity'],
+                    'description': info['description'],
+                    'recommendations': recommend(min_score, info),
+                })
+            tables[key] = {'codes': codes, 'levels': levels}
+        return tables[key]
+
+    def score_bulk(self, assessment_type: str, responses: Any) -> Dict[str, Any]:
+        """
+        Score many PHQ-9 or GAD-7 forms at once.
+
+        Args:
+            assessment_type: 'phq9' or 'gad7'
+            responses: N x 9 (PHQ-9) or N x 7 (GAD-7) matrix of 0-3 item responses, or a list
+                of forms in which malformed rows are allowed
+
+        Returns:
+            Dictionary of NumPy arrays: 'scores', 'severity_codes' (index into 'levels'),
+            'valid' (rows with 9 or 7 integer items all in 0-3; other rows score -1) and,
+            for PHQ-9, 'suicide_risk' (item 9 above zero)
+
+        Raises:
+            ValueError: unknown type, or an array that is not an integer matrix of the right width
+        """
+        key = assessment_type.lower().replace('-', '')
+        if key not in INSTRUMENTS:
+            raise ValueError('Invalid assessment type. Use "phq9" or "gad7".')
+        label, n_items = INSTRUMENTS[key]
+
+        if isinstance(responses, (list, tuple)):
+            # Blank out malformed forms so one bad row does not reject the whole batch
+            matrix = self._bulk_matrix(responses, n_items)
+        else:
+            try:
+                matrix = np.asarray(responses)
+            except ValueError:
+                raise ValueError(f"{label} responses must be an N x {n_items} matrix")
+        if matrix.size == 0:
+            matrix = np.zeros((0, n_items), dtype=np.int8)
+        if matrix.ndim != 2 or matrix.shape[1] != n_items:
+            raise ValueError(f"{label} responses must be an N x {n_items} matrix")
+        if matrix.dtype.kind not in 'iub':
+            raise ValueError(f"{label} responses must be integers 0-3")
+
+        lookup = self._bulk_lookup(key)
+        valid = ((matrix >= 0) & (matrix <= 3)).all(axis=1)
+        scores = np.where(valid, matrix.sum(axis=1), -1)
+        severity_codes = np.where(valid, lookup['codes'][np.clip(scores, 0, None)], -1)
+
+        result = {
+            'type': label,
+            'matrix': matrix,
+            'scores': scores,
+            'severity_codes': severity_codes,
+            'levels': lookup['levels'],
+            'valid': valid,
+        }
+        if key == 'phq9':
+            # Question 9 is about suicidal thoughts
+            result['suicide_risk'] = valid & (matrix[:, 8] > 0)
+        return result
+
+    @staticmethod
+    def _bulk_matrix(forms: Sequence[Any], n_items: int) -> Any:
+        """Integer matrix of the forms, with a row of -1 for each malformed form (wrong length, non-integer or out-of-range item)."""
+        blank = [-1] * n_items
+        rows = [form if isinstance(form, (list, tuple)) and len(form) == n_items
+                and all(type(v) is int and 0 <= v <= 3 for v in form) else blank
+                for form in forms]
+        if not rows:
+            return np.zeros((0, n_items), dtype=np.int8)
+        return np.array(rows, dtype=np.int8)
+
+    def get_assessment_questions(self, assessment_type: str, locale: str = DEFAULT_LOCALE) -> Dict[str, Any]:
+        """Get assessment questions for frontend, translated when a locale file provides them."""
+        questions = self._get_english_questions(assessment_type)
+        translation = self.translations.get(locale.lower(), {}).get(assessment_type.lower())
+        if 'error' in questions or not translation:
+            if 'error' not in questions:
+                questions['locale'] = DEFAULT_LOCALE
+            return questions
+        for key in ('title', 'description', 'scale'):
+            if key in translation:
+                questions[key] = translation[key]
+        for question, text in zip(questions['questions'], translation.get('questions', [])):
+            question['text'] = text
+        questions['locale'] = locale.lower()
+        return questions
+
+    def _get_english_questions(self, assessment_type: str) -> Dict[str, Any]:
         if assessment_type.lower() == 'phq9':
             return {
                 'type': 'PHQ-9',
@@ -325,7 +510,13 @@ class PHQ9GAD7Assessment:
         """Determine overall risk level based on both assessments."""
         phq9_severity = phq9_result.get('severity', 'minimal')
         gad7_severity = gad7_result.get('severity', 'minimal')
-        
+        combined = self._combined_table.get((phq9_severity, gad7_severity))
+        if combined is not None:
+            return combined[0]
+        return self._compute_overall_risk(phq9_severity, gad7_severity)
+    
+    @staticmethod
+    def _compute_overall_risk(phq9_severity: str, gad7_severity: str) -> str:
         # High risk if either assessment is severe or if both are moderate+
         if (phq9_severity in ['severe', 'moderately_severe'] or 
             gad7_severity == 'severe' or
@@ -337,18 +528,18 @@ class PHQ9GAD7Assessment:
         else:
             return 'low'
     
-    def _generate_combined_recommendations(self, phq9_result: Dict[str, Any], gad7_result: Dict[str, Any]) -> List[str]:
+    def _generate_combined_recommendations(self, phq9_result: Dict[str, Any], gad7_result: Dict[str, Any]) -> Sequence[str]:
         """Generate combined recommendations based on both assessments."""
-        recommendations = []
-        
-        # Add PHQ-9 specific recommendations
-        recommendations.extend(phq9_result.get('recommendations', []))
-        
-        # Add GAD-7 specific recommendations
-        recommendations.extend(gad7_result.get('recommendations', []))
-        
-        # Remove duplicates and prioritize
-        unique_recommendations = list(set(recommendations))
+        combined = self._combined_table.get((phq9_result.get('severity'), gad7_result.get('severity')))
+        if combined is not None:
+            return combined[1]
+        return self._merge_recommendations(phq9_result.get('recommendations', []),
+                                           gad7_result.get('recommendations', []))
+    
+    @staticmethod
+    def _merge_recommendations(phq9_recommendations: Sequence[str], gad7_recommendations: Sequence[str]) -> Tuple[str, ...]:
+        # Remove duplicates (keeping first-seen order) and prioritize
+        unique_recommendations = dict.fromkeys(list(phq9_recommendations) + list(gad7_recommendations))
         
         # Prioritize crisis and professional intervention
         priority_keywords = ['immediate', 'professional', 'crisis', 'psychiatric']
@@ -361,4 +552,4 @@ class PHQ9GAD7Assessment:
             else:
                 others.append(rec)
         
-        return prioritized + others
+        return tuple(prioritized + others)
@@ -1,12 +1,14 @@
 # chatbot/mental_health_chatbot.py
 import os
-import requests
-from textblob import TextBlob
 from sentiment.sentiment_analyzer import SentimentAnalyzer  # import your analyzer
+from utils.lazy_import import lazy_import
+from utils.metrics import span
+
+requests = lazy_import('requests')
 
 # # OpenRouter API info
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")  # replace with your key
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
 
 class MentalHealthChatbot:
     def __init__(self, model="openai/gpt-3.5-turbo"):
@@ -46,8 +48,9 @@ class MentalHealthChatbot:
             }
 
             # Step 4: Call OpenRouter API
-            response = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data)
-            response_json = response.json()
+            with span('openrouter.chat'):
+                response = requests.post(OPENROUTER_URL, headers=headers, json=data)
+                response_json = response.json()
             ai_reply = response_json["choices"][0]["message"]["content"].strip()
 
             return {
@@ -0,0 +1,73 @@
+"""
+Gunicorn configuration for production.
+
+The app (chatbot, sentiment analyzer, assessment tables, NLTK/TextBlob data) is
+imported and warmed up once in the master, then workers are forked and share
+those pages copy-on-write. Each worker opens its own Firestore connection after
+the fork, since gRPC channels must not cross a fork.
+
+Signals sent to the master (pid in GUNICORN_PIDFILE):
+    HUP   re-read this config and gracefully replace the workers
+    USR2  start a new master with fresh code; then WINCH + QUIT the old one
+    TERM  graceful shutdown
+"""
+
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+# Most request time is spent waiting on Firestore/OpenRouter/SMTP, so threads keep workers busy
+worker_class = 'gthread'
+threads = int(os.getenv('WORKER_THREADS', '4'))
+preload_app = True
+timeout = int(os.getenv('WORKER_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+max_requests = int(os.getenv('MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', '0'))
+pidfile = os.getenv('GUNICORN_PIDFILE', 'gunicorn.pid')
+accesslog = os.getenv('ACCESS_LOG') or None
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+wsgi_app = 'app:app'
+
+# Workers write metrics to shared files so /metrics aggregates across processes.
+# Must be set before the app (and prometheus_client) is imported.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'mindly-metrics'))
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def on_starting(server):
+    # Discard files left behind by a previous run
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(path)
+
+
+def when_ready(server):
+    import app as backend
+
+    backend.warm_up()
+    # Move everything allocated so far out of the GC's reach so collections in
+    # the workers do not touch (and therefore copy) the shared pages
+    gc.collect()
+    gc.freeze()
+    server.log.info("Models preloaded; forking %s workers", server.num_workers)
+
+
+def post_fork(server, worker):
+    import app as backend
+
+    backend.db = backend.init_storage(reinitialize=True)
+    # Threads do not survive the fork; each worker runs its own dispatcher and re-arms open escalations
+    backend.escalation_dispatcher.start()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
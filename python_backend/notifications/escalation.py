@@ -0,0 +1,321 @@
+"""
+Crisis escalation dispatch.
+
+``/api/escalation`` records an escalation and hands its id to the dispatcher,
+which pages on-call counsellors straight away instead of waiting for someone to
+look at the ``escalations`` collection. Work is taken from a priority queue
+ordered by severity, so a critical escalation never waits behind lower ones.
+Each round pages the next few counsellors on the roster and arms an
+acknowledgement deadline; when it passes without an acknowledgement the
+escalation is queued again for another round, up to max_rounds.
+
+Every state change is a write conditional on the document's update time. When
+several workers (or a restarted one re-arming open escalations) race for the
+same escalation, exactly one of them performs each round.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from storage import errors as storage_errors
+from utils.metrics import observe_escalation, span
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_PRIORITY = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+OPEN_STATUSES = ('pending', 'notified')
+ACKNOWLEDGEABLE = OPEN_STATUSES + ('unacknowledged',)
+# Latency samples kept for the percentiles in stats()
+SAMPLE_SIZE = 1000
+RETRY_SECONDS = 5
+
+Note = Tuple[Any, Dict[str, Any]]
+
+
+def severity(level: Any) -> str:
+    """Normalized severity; unknown levels are treated as high."""
+    level = str(level or '').lower()
+    return level if level in SEVERITY_PRIORITY else 'high'
+
+
+def _wall(value: Any) -> Optional[datetime]:
+    # Timestamps are written with datetime.now(); compare them as naive wall-clock times
+    return value.replace(tzinfo=None) if isinstance(value, datetime) else None
+
+
+def _percentiles(samples, points=(50, 90, 99)) -> Dict[str, Optional[float]]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{p}": None for p in points}
+    return {f"p{p}": round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)], 3) for p in points}
+
+
+class EscalationDispatcher:
+    """Severity-ordered paging of on-call counsellors with acknowledgement deadlines."""
+
+    def __init__(self, db_provider: Callable[[], Any],
+                 on_notified: Callable[[Dict[str, Any], List[Note], List[Dict[str, Any]]], None],
+                 ack_timeout: float = 300, max_rounds: int = 3, per_round: int = 3, roster_ttl: float = 60):
+        self._db = db_provider
+        self._on_notified = on_notified
+        self.ack_timeout = ack_timeout
+        self.max_rounds = max_rounds
+        self.per_round = per_round
+        self.roster_ttl = roster_ttl
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        # (priority, seq, escalation id, round)
+        self._queue: List[Tuple[int, int, str, int]] = []
+        # (due monotonic, seq, escalation id, round, priority)
+        self._deadlines: List[Tuple[float, int, str, int, int]] = []
+        self._thread: Optional[threading.Thread] = None
+        # Escalations received by this process -> monotonic receipt time, for exact latencies
+        self._received: 'OrderedDict[str, float]' = OrderedDict()
+        self._roster: List[Dict[str, Any]] = []
+        self._roster_at = 0.0
+        self._offset = 0
+        self._notify_samples: deque = deque(maxlen=SAMPLE_SIZE)
+        self._ack_samples: deque = deque(maxlen=SAMPLE_SIZE)
+        self.counts: Counter = Counter()
+
+    # ---------------- queueing ----------------
+
+    def start(self):
+        """Start the dispatch thread; it first re-arms open escalations left by earlier processes."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='escalation-dispatcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, escalation_id: str, level: Any):
+        """Queue the first round for a just-recorded escalation."""
+        with self._cond:
+            self._received[escalation_id] = time.monotonic()
+            if len(self._received) > 10000:
+                self._received.popitem(last=False)
+            heapq.heappush(self._queue, (SEVERITY_PRIORITY[severity(level)], next(self._seq), escalation_id, 0))
+            self._cond.notify()
+        self.start()
+
+    def _schedule(self, escalation_id: str, round_no: int, priority: int, delay: float):
+        with self._cond:
+            heapq.heappush(self._deadlines,
+                           (time.monotonic() + delay, next(self._seq), escalation_id, round_no, priority))
+            self._cond.notify()
+
+    def _run(self):
+        try:
+            self.recover()
+        except Exception as e:
+            logger.error(f"Escalation recovery failed: {e}")
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._deadlines and self._deadlines[0][0] <= now:
+                        _, _, escalation_id, round_no, priority = heapq.heappop(self._deadlines)
+                        heapq.heappush(self._queue, (priority, next(self._seq), escalation_id, round_no))
+                    if self._queue:
+                        break
+                    self._cond.wait(self._deadlines[0][0] - now if self._deadlines else None)
+                priority, _, escalation_id, round_no = heapq.heappop(self._queue)
+            try:
+                self._dispatch(escalation_id, round_no, priority)
+            except Exception as e:
+                logger.error(f"Escalation {escalation_id} round {round_no} failed, retrying: {e}")
+                self.counts['errors'] += 1
+                self._schedule(escalation_id, round_no, priority, RETRY_SECONDS)
+
+    def recover(self):
+        """Re-arm pending and notified escalations recent enough to still be within their rounds."""
+        db = self._db()
+        if not db:
+            return
+        horizon = datetime.now() - timedelta(seconds=self.ack_timeout * (self.max_rounds + 1))
+        recovered = 0
+        for status in OPEN_STATUSES:
+            for snap in db.collection('escalations').where('status', '==', status).stream():
+                if snap.id in self._received:
+                    continue  # submitted to this process already
+                esc = snap.to_dict() or {}
+                received = _wall(esc.get('timestamp'))
+                if received is None or received < horizon:
+                    continue
+                priority = SEVERITY_PRIORITY[severity(esc.get('escalation_level'))]
+                if status == 'pending':
+                    self._schedule(snap.id, 0, priority, 0)
+                else:
+                    deadline = _wall(esc.get('ackDeadline')) or datetime.now()
+                    remaining = max(0.0, (deadline - datetime.now()).total_seconds())
+                    self._schedule(snap.id, int(esc.get('round', 0)) + 1, priority, remaining)
+                recovered += 1
+        if recovered:
+            logger.info(f"Re-armed {recovered} open escalations")
+
+    # ---------------- paging ----------------
+
+    def roster(self, db) -> List[Dict[str, Any]]:
+        """
+        On-call counsellors: those flagged ``onCall: true``, or when nobody is
+        flagged, every counsellor not flagged ``onCall: false``.
+        """
+        if self._roster and time.monotonic() - self._roster_at < self.roster_ttl:
+            return self._roster
+        counsellors = []
+        for snap in db.collection('users').where('role', '==', 'counsellor').stream():
+            d = snap.to_dict() or {}
+            counsellors.append({'id': snap.id, 'email': d.get('email') or '',
+                                'name': d.get('displayName') or d.get('name') or '', 'onCall': d.get('onCall')})
+        on_call = [c for c in counsellors if c['onCall'] is True] or [c for c in counsellors if c['onCall'] is not False]
+        self._roster = sorted(on_call, key=lambda c: c['id'])
+        self._roster_at = time.monotonic()
+        return self._roster
+
+    def _pick(self, db, already: set, round_no: int) -> List[Dict[str, Any]]:
+        roster = self.roster(db)
+        fresh = [c for c in roster if c['id'] not in already]
+        if round_no == 0 and fresh:
+            # Spread first pages across the roster rather than always waking the same people
+            start = self._offset % len(fresh)
+            self._offset += self.per_round
+            fresh = fresh[start:] + fresh[:start]
+        # Once everyone has been paged, later rounds page the whole roster again
+        return fresh[:self.per_round] or roster
+
+    def _dispatch(self, escalation_id: str, round_no: int, priority: int):
+        db = self._db()
+        if not db:
+            raise RuntimeError('Database not available')
+        ref = db.collection('escalations').document(escalation_id)
+        snap = ref.get()
+        if not snap.exists:
+            return
+        esc = snap.to_dict() or {}
+        # Acknowledged, or this round was already done by another worker
+        if esc.get('status', 'pending') not in OPEN_STATUSES or esc.get('round', -1) >= round_no:
+            return
+        level = severity(esc.get('escalation_level'))
+        now = datetime.now()
+
+        if round_no >= self.max_rounds:
+            try:
+                ref.update({'status': 'unacknowledged', 'updatedAt': now},
+                           option=db.write_option(last_update_time=snap.update_time))
+            except storage_errors.FailedPrecondition:
+                return
+            self.counts['unacknowledged'] += 1
+            logger.error(f"Escalation {escalation_id} ({level}) unacknowledged after {round_no} rounds")
+            return
+
+        already = set(esc.get('notifiedCounsellors') or [])
+        chosen = self._pick(db, already, round_no)
+        if not chosen:
+            logger.error(f"Escalation {escalation_id} ({level}): no counsellors on call")
+
+        batch = db.batch()
+        notes = [(db.collection('notifications').document(), {
+            'userId': c['id'],
+            'type': 'escalation',
+            'title': f"Crisis escalation ({level})" if round_no == 0 else f"Crisis escalation ({level}) still unacknowledged",
+            'body': 'A student needs urgent support. Open the dashboard to acknowledge.',
+            'escalationId': escalation_id,
+            'severity': level,
+            'createdAt': now,
+            'read': False
+        }) for c in chosen]
+        for note_ref, note in notes:
+            batch.set(note_ref, note)
+        batch.update(ref, {
+            'status': 'notified',
+            'round': round_no,
+            'notifiedCounsellors': sorted(already | {c['id'] for c in chosen}),
+            'notifiedAt': esc.get('notifiedAt') or now,
+            'ackDeadline': now + timedelta(seconds=self.ack_timeout),
+            'updatedAt': now
+        }, option=db.write_option(last_update_time=snap.update_time))
+        try:
+            with span('escalation.notify'):
+                batch.commit()
+        except storage_errors.FailedPrecondition:
+            # Changed since the read (acknowledged, or another worker paged): decide again on fresh state
+            with self._cond:
+                heapq.heappush(self._queue, (priority, next(self._seq), escalation_id, round_no))
+            return
+
+        self.counts['rounds'] += 1
+        if round_no == 0:
+            self._observe('notify', escalation_id, esc, level, self._notify_samples)
+        try:
+            self._on_notified(dict(esc, id=escalation_id, severity=level), notes, chosen)
+        except Exception as e:
+            logger.error(f"Escalation {escalation_id}: delivery after commit failed: {e}")
+        self._schedule(escalation_id, round_no + 1, priority, self.ack_timeout)
+
+    # ---------------- acknowledgement ----------------
+
+    def acknowledge(self, escalation_id: str, counsellor_id: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Record that counsellor_id has taken the escalation, which stops re-escalation.
+        Returns (result, escalation) with result ok, not_found, forbidden or conflict
+        (already acknowledged by someone else, or no longer open).
+        """
+        db = self._db()
+        ref = db.collection('escalations').document(escalation_id)
+        for _ in range(3):
+            snap = ref.get()
+            if not snap.exists:
+                return 'not_found', {}
+            esc = snap.to_dict() or {}
+            if esc.get('status') == 'acknowledged':
+                return ('ok' if esc.get('acknowledgedBy') == counsellor_id else 'conflict'), esc
+            if esc.get('status', 'pending') not in ACKNOWLEDGEABLE:
+                return 'conflict', esc
+            if (counsellor_id not in (esc.get('notifiedCounsellors') or [])
+                    and all(c['id'] != counsellor_id for c in self.roster(db))):
+                return 'forbidden', esc
+            now = datetime.now()
+            update = {'status': 'acknowledged', 'acknowledgedBy': counsellor_id, 'acknowledgedAt': now,
+                      'updatedAt': now}
+            try:
+                ref.update(update, option=db.write_option(last_update_time=snap.update_time))
+            except storage_errors.FailedPrecondition:
+                continue
+            self.counts['acknowledged'] += 1
+            self._observe('ack', escalation_id, esc, severity(esc.get('escalation_level')), self._ack_samples)
+            with self._cond:
+                self._received.pop(escalation_id, None)
+            return 'ok', dict(esc, **update)
+        return 'conflict', {}
+
+    # ---------------- latency ----------------
+
+    def _observe(self, stage: str, escalation_id: str, esc: Dict[str, Any], level: str, samples: deque):
+        received = self._received.get(escalation_id)
+        if received is not None:
+            seconds = time.monotonic() - received
+        else:
+            received_at = _wall(esc.get('timestamp'))
+            if received_at is None:
+                return
+            seconds = max(0.0, (datetime.now() - received_at).total_seconds())
+        samples.append(seconds)
+        observe_escalation(stage, level, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued, scheduled = len(self._queue), len(self._deadlines)
+        return {
+            'queued': queued,
+            'scheduled': scheduled,
+            'counts': dict(self.counts),
+            'timeToNotifySeconds': dict(_percentiles(self._notify_samples), samples=len(self._notify_samples)),
+            'timeToAckSeconds': dict(_percentiles(self._ack_samples), samples=len(self._ack_samples)),
+        }
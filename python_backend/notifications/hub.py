@@ -0,0 +1,157 @@
+"""
+In-process pub/sub for student notifications, served over Server-Sent Events.
+
+Routes publish every notification document they commit; each open
+``/api/notifications/stream`` connection holds a queue subscribed to its user.
+A short per-user buffer of recent notifications lets a reconnecting client
+resume from its ``Last-Event-ID`` without a Firestore read; older ids fall back
+to a query on the ``notifications`` collection.
+
+Publishing only reaches streams in the same process. With several gunicorn
+workers, start the optional Firestore listener so notifications written by
+other workers (or by other services) are fanned out too; ids already seen are
+dropped, so a notification is never delivered twice.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class NotificationHub:
+    def __init__(self, buffer_size: int = 50, max_users: int = 10000, max_streams: int = 2):
+        self.buffer_size = buffer_size
+        self.max_users = max_users
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        # user id -> recent (notification id, data), least recently published user first
+        self._recent: 'OrderedDict[str, deque]' = OrderedDict()
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+        self._streams = 0
+        self._listener = None
+
+    # ---------------- publishing ----------------
+
+    def publish(self, user_id: str, notification_id: str, data: Dict[str, Any]) -> bool:
+        """Buffer a notification and push it to the user's open streams. False if already published."""
+        if not user_id or not notification_id:
+            return False
+        with self._lock:
+            recent = self._recent.get(user_id)
+            if recent is None:
+                recent = self._recent[user_id] = deque(maxlen=self.buffer_size)
+                if len(self._recent) > self.max_users:
+                    self._recent.popitem(last=False)
+            else:
+                self._recent.move_to_end(user_id)
+            if any(seen_id == notification_id for seen_id, _ in recent):
+                return False
+            recent.append((notification_id, data))
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for q in subscribers:
+            q.put((notification_id, data))
+        return True
+
+    def replay(self, user_id: str, last_id: str) -> Optional[List[Event]]:
+        """Buffered notifications after ``last_id``, or None when it is no longer buffered."""
+        with self._lock:
+            recent = list(self._recent.get(user_id, ()))
+        for i, (notification_id, _) in enumerate(recent):
+            if notification_id == last_id:
+                return recent[i + 1:]
+        return None
+
+    # ---------------- subscribing ----------------
+
+    def subscribe(self, user_id: str) -> Optional[queue.Queue]:
+        """A queue receiving the user's new notifications, or None when the stream limit is reached."""
+        with self._lock:
+            if self._streams >= self.max_streams:
+                return None
+            self._streams += 1
+            q: queue.Queue = queue.Queue()
+            self._subscribers.setdefault(user_id, []).append(q)
+            return q
+
+    def unsubscribe(self, user_id: str, q: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, [])
+            if q in subscribers:
+                subscribers.remove(q)
+                self._streams -= 1
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    @property
+    def open_streams(self) -> int:
+        return self._streams
+
+    def stream(self, user_id: str, q: queue.Queue, backlog: List[Event], dumps: Callable[[Any], str],
+               heartbeat: float = 15, max_seconds: float = 300, retry_ms: int = 3000) -> Iterator[str]:
+        """
+        SSE body: the backlog, then live notifications, with comment heartbeats so
+        proxies keep the connection open. Ends after max_seconds; EventSource then
+        reconnects with Last-Event-ID and resumes where it left off.
+        """
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            sent = set()
+            for notification_id, data in backlog:
+                sent.add(notification_id)
+                yield _event(notification_id, data, dumps)
+            deadline = time.monotonic() + max_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    notification_id, data = q.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if notification_id in sent:
+                    continue
+                sent.add(notification_id)
+                yield _event(notification_id, data, dumps)
+        finally:
+            self.unsubscribe(user_id, q)
+
+    # ---------------- cross-process feed ----------------
+
+    def start_listener(self, db) -> bool:
+        """
+        Publish notifications created from now on by anyone, via a Firestore
+        snapshot listener. Returns False when the store cannot listen.
+        """
+        with self._lock:
+            if self._listener is not None:
+                return bool(self._listener)
+            query = db.collection('notifications').where('createdAt', '>=', datetime.now())
+            if not hasattr(query, 'on_snapshot'):
+                logger.warning('Notification listener not started: storage backend has no snapshot listeners')
+                self._listener = False
+                return False
+
+            def on_snapshot(_docs, changes, _read_time):
+                for change in changes:
+                    if getattr(change.type, 'name', '') == 'ADDED':
+                        data = change.document.to_dict() or {}
+                        self.publish(data.get('userId'), change.document.id, data)
+
+            self._listener = query.on_snapshot(on_snapshot)
+            logger.info('Notification listener started')
+            return True
+
+
+def _event(notification_id: str, data: Dict[str, Any], dumps: Callable[[Any], str]) -> str:
+    # Multi-line (pretty-printed) JSON becomes several data lines, which clients rejoin with newlines
+    lines = dumps(dict(data, id=notification_id)).split('\n')
+    return f"id: {notification_id}\nevent: notification\n" + ''.join(f"data: {line}\n" for line in lines) + "\n"
@@ -0,0 +1,208 @@
+"""
+In-memory index of open counsellor slots.
+
+Slots live at ``counsellors/{id}/availability/{dateKey}/slots/{time}``, so
+"the next free slot with anyone" would otherwise mean probing every
+counsellor's day subcollections. The index keeps every open (active, unbooked,
+not in the past) slot as a ``(dateKey, 'HH:MM', counsellorId, slotId)`` tuple in
+one sorted list plus one sorted list per counsellor, so earliest-free, time
+window and per-counsellor queries are a bisect and a short forward scan.
+
+It is rebuilt from a ``slots`` collection-group query for today onwards (slot
+documents carry their ``date`` key so past days are filtered server-side and
+never read), updated in place by the backend routes that change slots, and
+reconciled periodically in a background thread to pick up bookings written
+directly by the client. Slots written before the ``date`` field existed need
+``tools/backfill_slot_dates.py``.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Slot document field holding its dateKey ('YYYY-MM-DD'), for the upcoming-slots query
+DATE_FIELD = 'date'
+
+# (dateKey, 'HH:MM', counsellorId, slotId)
+Entry = Tuple[str, str, str, str]
+SlotKey = Tuple[str, str, str]
+
+
+def normalize_slot_time(t: Any) -> str:
+    return str(t or '').strip().replace('.', ':')
+
+
+def time_key(t: str) -> str:
+    """Zero-padded 'HH:MM' so '9:00' and '09:00' sort together."""
+    hours, _, minutes = normalize_slot_time(t).partition(':')
+    return f"{hours.zfill(2)}:{minutes.zfill(2)}"
+
+
+def is_open(data: Dict[str, Any]) -> bool:
+    return data.get('active') is not False and not data.get('booked')
+
+
+class OpenSlotIndex:
+    """Sorted arrays of open slots, overall and per counsellor."""
+
+    def __init__(self, db_provider: Callable[[], Any], reconcile_interval: float = 60):
+        self._db = db_provider
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._all: List[Entry] = []
+        self._by_counsellor: Dict[str, List[Entry]] = {}
+        # Last known flags of every slot seen, open or not, so partial updates can be applied
+        self._flags: Dict[SlotKey, Dict[str, Any]] = {}
+        self._built = False
+        self._rebuilding = False
+        self._replay: List[Tuple[SlotKey, Dict[str, Any], bool]] = []
+        self._last_reconcile = 0.0
+        self.last_reconcile_at: Optional[datetime] = None
+
+    # ---------------- maintenance ----------------
+
+    def ensure_fresh(self):
+        """Build on first use (blocking); afterwards reconcile in the background when due."""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.rebuild()
+            return
+        if time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+            with self._lock:
+                if self._rebuilding or time.monotonic() - self._last_reconcile < self.reconcile_interval:
+                    return
+                self._rebuilding = True
+            threading.Thread(target=self._reconcile, name='slot-index-reconcile', daemon=True).start()
+
+    def _reconcile(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"Slot index reconciliation failed: {e}")
+            with self._lock:
+                self._rebuilding = False
+                self._replay = []
+                self._last_reconcile = time.monotonic()
+
+    def rebuild(self):
+        """Replace the index with a fresh collection-group query of every slot from today on."""
+        db = self._db()
+        if not db:
+            raise RuntimeError('Database not available')
+        with self._lock:
+            self._rebuilding = True
+            self._replay = []
+        today = date.today().isoformat()
+        flags: Dict[SlotKey, Dict[str, Any]] = {}
+        with span('scheduling.slot_index_rebuild'):
+            for snap in db.collection_group('slots').where(DATE_FIELD, '>=', today).stream():
+                parts = snap.reference.path.split('/')
+                # counsellors/{id}/availability/{dateKey}/slots/{slotId}
+                if len(parts) != 6 or parts[0] != 'counsellors' or parts[2] != 'availability':
+                    continue
+                if parts[3] < today:
+                    continue
+                data = snap.to_dict() or {}
+                flags[(parts[1], parts[3], parts[5])] = {
+                    'time': time_key(data.get('time') or parts[5]),
+                    'active': data.get('active', True),
+                    'booked': bool(data.get('booked')),
+                }
+
+        entries = sorted((date_key, f['time'], counsellor_id, slot_id)
+                         for (counsellor_id, date_key, slot_id), f in flags.items() if is_open(f))
+        by_counsellor: Dict[str, List[Entry]] = {}
+        for entry in entries:
+            by_counsellor.setdefault(entry[2], []).append(entry)
+
+        with self._lock:
+            self._all, self._by_counsellor, self._flags = entries, by_counsellor, flags
+            # Route updates that raced with the scan win over what it read
+            for key, fields, deleted in self._replay:
+                self._apply(key, fields, deleted)
+            self._replay = []
+            self._rebuilding = False
+            self._built = True
+            self._last_reconcile = time.monotonic()
+            self.last_reconcile_at = datetime.now()
+        logger.info(f"Slot index rebuilt: {len(entries)} open of {len(flags)} upcoming slots")
+
+    def update(self, counsellor_id: str, date_key: str, slot_id: str, **fields):
+        """Apply a partial slot write (e.g. booked=False, active=True) made by a route."""
+        self._record((counsellor_id, date_key, slot_id), fields, deleted=False)
+
+    def remove(self, counsellor_id: str, date_key: str, slot_id: str):
+        self._record((counsellor_id, date_key, slot_id), {}, deleted=True)
+
+    def _record(self, key: SlotKey, fields: Dict[str, Any], deleted: bool):
+        with self._lock:
+            if self._rebuilding:
+                self._replay.append((key, fields, deleted))
+            self._apply(key, fields, deleted)
+
+    def _apply(self, key: SlotKey, fields: Dict[str, Any], deleted: bool):
+        counsellor_id, date_key, slot_id = key
+        old = self._flags.get(key)
+        if old is not None and is_open(old):
+            entry = (date_key, old['time'], counsellor_id, slot_id)
+            for entries in (self._all, self._by_counsellor.get(counsellor_id, [])):
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    entries.pop(i)
+        if deleted:
+            self._flags.pop(key, None)
+            return
+        new = dict(old or {'time': time_key(slot_id), 'active': True, 'booked': False})
+        new.update({k: v for k, v in fields.items() if k in ('active', 'booked')})
+        if 'time' in fields:
+            new['time'] = time_key(fields['time'])
+        self._flags[key] = new
+        if is_open(new) and date_key >= date.today().isoformat():
+            entry = (date_key, new['time'], counsellor_id, slot_id)
+            insort(self._all, entry)
+            insort(self._by_counsellor.setdefault(counsellor_id, []), entry)
+
+    # ---------------- queries ----------------
+
+    def search(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               counsellor_id: Optional[str] = None, time_from: Optional[str] = None,
+               time_to: Optional[str] = None, limit: int = 10) -> List[Dict[str, str]]:
+        """
+        Open slots in chronological order from ``start`` (default now) up to
+        ``end`` (exclusive), optionally for one counsellor and only between
+        ``time_from`` and ``time_to`` (inclusive, 'HH:MM') on each day.
+        """
+        start = start or datetime.now()
+        lower = (start.date().isoformat(), start.strftime('%H:%M'))
+        upper = (end.date().isoformat(), end.strftime('%H:%M')) if end else None
+        time_from = time_key(time_from) if time_from else None
+        time_to = time_key(time_to) if time_to else None
+        results = []
+        with self._lock:
+            entries = self._by_counsellor.get(counsellor_id, []) if counsellor_id else self._all
+            for i in range(bisect_left(entries, lower), len(entries)):
+                date_key, slot_time, cid, slot_id = entries[i]
+                if upper is not None and (date_key, slot_time) >= upper:
+                    break
+                if (time_from and slot_time < time_from) or (time_to and slot_time > time_to):
+                    continue
+                results.append({'counsellorId': cid, 'dateKey': date_key, 'time': slot_time, 'slotId': slot_id})
+                if len(results) >= limit:
+                    break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'openSlots': len(self._all),
+                'counsellors': sum(1 for entries in self._by_counsellor.values() if entries),
+                'lastReconcile': self.last_reconcile_at.isoformat() if self.last_reconcile_at else None,
+            }
@@ -1,23 +1,38 @@
 import re
 import logging
+import threading
 from typing import Dict, Any, List
-from textblob import TextBlob
-import nltk
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
 import pickle
 import os
 
-# Download required NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('vader_lexicon', quiet=True)
-    nltk.download('stopwords', quiet=True)
-except:
-    pass
+from utils.lazy_import import lazy_import
+from utils.metrics import span
+
+# Heavy NLP stacks are only imported once an analysis actually runs
+textblob = lazy_import('textblob')
+nltk = lazy_import('nltk')
 
 logger = logging.getLogger(__name__)
 
+_nltk_lock = threading.Lock()
+_nltk_ready = False
+
+def ensure_nltk_data():
+    """Download required NLTK data once per process."""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+        try:
+            nltk.download('punkt', quiet=True)
+            nltk.download('vader_lexicon', quiet=True)
+            nltk.download('stopwords', quiet=True)
+        except:
+            pass
+        _nltk_ready = True
+
 class SentimentAnalyzer:
     """
     Advanced sentiment analysis for mental health context using multiple approaches.
@@ -78,18 +93,23 @@ class SentimentAnalyzer:
         """
         try:
             # Clean and preprocess text
-            cleaned_text = self._preprocess_text(text)
+            with span('sentiment.preprocess'):
+                cleaned_text = self._preprocess_text(text)
             
             # Multiple analysis approaches
-            textblob_result = self._analyze_textblob(cleaned_text)
-            keyword_result = self._analyze_keywords(cleaned_text)
-            crisis_result = self._detect_crisis_indicators(cleaned_text)
+            with span('sentiment.textblob'):
+                textblob_result = self._analyze_textblob(cleaned_text)
+            with span('sentiment.keywords'):
+                keyword_result = self._analyze_keywords(cleaned_text)
+            with span('sentiment.crisis'):
+                crisis_result = self._detect_crisis_indicators(cleaned_text)
             
             # Combine results
-            combined_score = self._combine_scores(textblob_result, keyword_result)
-            
-            # Determine final sentiment
-            final_sentiment = self._determine_sentiment(combined_score, crisis_result)
+            with span('sentiment.combine'):
+                combined_score = self._combine_scores(textblob_result, keyword_result)
+                
+                # Determine final sentiment
+                final_sentiment = self._determine_sentiment(combined_score, crisis_result)
             
             return {
                 'text': text,
@@ -108,6 +128,10 @@ class SentimentAnalyzer:
             logger.error(f"Error in sentiment analysis: {e}")
             return self._get_default_result(text)
     
+    def is_crisis(self, text: str) -> bool:
+        """Keyword/phrase crisis check only; cheap enough to run before admission control."""
+        return self._detect_crisis_indicators(self._preprocess_text(text or ''))['detected']
+    
     def _preprocess_text(self, text: str) -> str:
         """Clean and preprocess text for analysis."""
         # Convert to lowercase
@@ -124,7 +148,8 @@ class SentimentAnalyzer:
     def _analyze_textblob(self, text: str) -> Dict[str, Any]:
         """Analyze sentiment using TextBlob."""
         try:
-            blob = TextBlob(text)
+            ensure_nltk_data()
+            blob = textblob.TextBlob(text)
             polarity = blob.sentiment.polarity  # -1 to 1
             subjectivity = blob.sentiment.subjectivity  # 0 to 1
             
@@ -0,0 +1,89 @@
+"""
+Storage interface used by the backend.
+
+The app talks to its document store through the subset of the Firestore client
+API described here. ``google.cloud.firestore.Client`` satisfies it as-is, and
+``storage.memory_store.MemoryFirestore`` implements it in process so the API can
+run offline for tests, benchmarks and load tests.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple, Union
+
+
+class DocumentSnapshot(Protocol):
+    id: str
+    exists: bool
+    reference: 'DocumentReference'
+    create_time: Any
+    update_time: Any
+
+    def to_dict(self) -> Optional[Dict[str, Any]]: ...
+
+    def get(self, field_path: str) -> Any: ...
+
+
+class DocumentReference(Protocol):
+    id: str
+    path: str
+
+    def collection(self, collection_id: str) -> 'CollectionReference': ...
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction: Any = None) -> DocumentSnapshot: ...
+
+    def create(self, document_data: Dict[str, Any]) -> Any: ...
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False) -> Any: ...
+
+    def update(self, field_updates: Dict[str, Any], option: Any = None) -> Any: ...
+
+    def delete(self, option: Any = None) -> Any: ...
+
+
+class Query(Protocol):
+    def where(self, field_path: str, op_string: str, value: Any) -> 'Query': ...
+
+    def order_by(self, field_path: str, direction: str = 'ASCENDING') -> 'Query': ...
+
+    def limit(self, count: int) -> 'Query': ...
+
+    def start_after(self, document_fields_or_snapshot: Union[Dict[str, Any], DocumentSnapshot, List[Any]]) -> 'Query': ...
+
+    def stream(self, transaction: Any = None) -> Iterator[DocumentSnapshot]: ...
+
+    def get(self, transaction: Any = None) -> List[DocumentSnapshot]: ...
+
+
+class CollectionReference(Query, Protocol):
+    id: str
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference: ...
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None) -> Tuple[Any, DocumentReference]: ...
+
+
+class WriteBatch(Protocol):
+    def create(self, reference: DocumentReference, document_data: Dict[str, Any]) -> None: ...
+
+    def set(self, reference: DocumentReference, document_data: Dict[str, Any], merge: bool = False) -> None: ...
+
+    def update(self, reference: DocumentReference, field_updates: Dict[str, Any], option: Any = None) -> None: ...
+
+    def delete(self, reference: DocumentReference, option: Any = None) -> None: ...
+
+    def commit(self) -> List[Any]: ...
+
+
+class DocumentStore(Protocol):
+    def collection(self, *collection_path: str) -> CollectionReference: ...
+
+    def document(self, *document_path: str) -> DocumentReference: ...
+
+    def collection_group(self, collection_id: str) -> Query: ...
+
+    def get_all(self, references: Iterable[DocumentReference], field_paths: Optional[Iterable[str]] = None,
+                transaction: Any = None) -> Iterator[DocumentSnapshot]: ...
+
+    def batch(self) -> WriteBatch: ...
+
+    def write_option(self, **kwargs) -> Any:
+        """Precondition for update/delete: ``last_update_time=`` or ``exists=`` (FailedPrecondition on mismatch)."""
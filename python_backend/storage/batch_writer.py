@@ -0,0 +1,116 @@
+"""
+Batched writes for bulk endpoints.
+
+Firestore caps a WriteBatch at 500 writes; larger write sets are split into
+batches that commit concurrently on a small thread pool. Each batch is atomic
+on its own, the write set as a whole is not.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_WRITES = 500
+
+
+def _commit(db, chunk: List[Tuple[Any, Dict[str, Any]]]) -> int:
+    batch = db.batch()
+    for ref, data in chunk:
+        batch.set(ref, data)
+    batch.commit()
+    return len(chunk)
+
+
+def commit_batched(db, writes: Iterable[Tuple[Any, Dict[str, Any]]], max_workers: int = 4,
+                   batch_size: int = MAX_BATCH_WRITES) -> int:
+    """
+    Set every (document reference, data) pair using as few batch commits as possible.
+    Returns the number of documents written; raises the first commit error.
+    """
+    writes = iter(writes)
+    batch_size = max(1, min(batch_size, MAX_BATCH_WRITES))
+    chunks = []
+    while True:
+        chunk = list(islice(writes, batch_size))
+        if not chunk:
+            break
+        chunks.append(chunk)
+    if not chunks:
+        return 0
+    if len(chunks) == 1:
+        return _commit(db, chunks[0])
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        return sum(pool.map(lambda chunk: _commit(db, chunk), chunks))
+
+
+# ('create' | 'set' | 'update' | 'delete', reference, data, write option)
+Write = Tuple[str, Any, Optional[Dict[str, Any]], Any]
+
+
+def _commit_writes(db, writes: List[Write]):
+    batch = db.batch()
+    for op, ref, data, option in writes:
+        if op == 'create':
+            batch.create(ref, data)
+        elif op == 'set':
+            batch.set(ref, data)
+        elif op == 'update':
+            batch.update(ref, data, option=option)
+        elif op == 'delete':
+            batch.delete(ref, option=option)
+        else:
+            raise ValueError(f"Unknown write: {op}")
+    batch.commit()
+
+
+def _commit_packed(db, groups: List[List[Write]]) -> List[Optional[Exception]]:
+    try:
+        _commit_writes(db, [write for group in groups for write in group])
+        return [None] * len(groups)
+    except Exception as e:
+        if len(groups) == 1:
+            return [e]
+        logger.info(f"Batch of {len(groups)} groups failed ({e}); retrying groups one by one")
+    outcomes = []
+    for group in groups:
+        try:
+            _commit_writes(db, group)
+            outcomes.append(None)
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
+
+def commit_groups(db, groups: List[List[Write]], max_workers: int = 4,
+                  batch_size: int = MAX_BATCH_WRITES) -> List[Optional[Exception]]:
+    """
+    Commit groups of writes that must land together (e.g. an update guarded by a
+    precondition and its notification), packing whole groups into as few batches
+    as possible. When a packed batch fails, its groups are retried one batch each
+    so only the offending groups fail. Returns, per group, None on success or the
+    exception that group raised.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_WRITES))
+    chunks: List[List[List[Write]]] = []
+    current: List[List[Write]] = []
+    size = 0
+    for group in groups:
+        if len(group) > batch_size:
+            raise ValueError(f"A group of {len(group)} writes does not fit in one batch")
+        if current and size + len(group) > batch_size:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(group)
+        size += len(group)
+    if current:
+        chunks.append(current)
+    if not chunks:
+        return []
+    if len(chunks) == 1:
+        return _commit_packed(db, chunks[0])
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        return [outcome for outcomes in pool.map(lambda chunk: _commit_packed(db, chunk), chunks)
+                for outcome in outcomes]
@@ -0,0 +1,43 @@
+"""
+Errors raised by the document store.
+
+Both ``google.cloud.firestore`` and ``storage.memory_store`` raise these, so
+callers can handle failed writes without importing the Firebase SDK.
+
+The classes are resolved on first attribute access, not at import:
+``google.api_core.exceptions`` pulls in gRPC, which is exactly what deferred
+imports keep off the startup path. Refer to them through the module
+(``storage_errors.NotFound``) rather than ``from storage.errors import ...``,
+since an ``except`` expression is only evaluated when an exception reaches it.
+"""
+
+import threading
+
+__all__ = ['AlreadyExists', 'FailedPrecondition', 'NotFound']
+
+_lock = threading.Lock()
+
+
+def _resolve():
+    try:
+        from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+    except ImportError:  # keep the stand-in usable without the Firebase SDK installed
+        class NotFound(Exception):
+            pass
+
+        class AlreadyExists(Exception):
+            pass
+
+        class FailedPrecondition(Exception):
+            pass
+    return {'AlreadyExists': AlreadyExists, 'FailedPrecondition': FailedPrecondition, 'NotFound': NotFound}
+
+
+def __getattr__(name: str):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lock:
+        # Cached as module globals, so later lookups do not come back here
+        if name not in globals():
+            globals().update(_resolve())
+    return globals()[name]
@@ -0,0 +1,745 @@
+import copy
+import functools
+import logging
+import random
+import string
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from storage import errors as storage_errors
+
+logger = logging.getLogger(__name__)
+
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+DOCUMENT_ID = '__name__'
+_MISSING = object()
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _auto_id() -> str:
+    return ''.join(random.choice(_AUTO_ID_CHARS) for _ in range(20))
+
+
+def _split_path(path: Tuple[str, ...]) -> List[str]:
+    parts = []
+    for p in path:
+        parts.extend(seg for seg in str(p).split('/') if seg)
+    return parts
+
+
+# ---- value handling (mirrors Firestore's type ordering and normalization) ----
+
+def _normalize(value: Any) -> Any:
+    """Deep-copy a value the way Firestore stores it (naive datetimes are taken as UTC)."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _type_rank(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, (datetime, date)):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, MemoryDocumentReference):
+        return 6
+    if isinstance(value, list):
+        return 8
+    if isinstance(value, dict):
+        return 9
+    return 10
+
+
+def _compare_values(a: Any, b: Any) -> int:
+    ra, rb = _type_rank(a), _type_rank(b)
+    if ra != rb:
+        return -1 if ra < rb else 1
+    if ra == 0:
+        return 0
+    if ra == 6:
+        a, b = a.path, b.path
+    elif ra == 8:
+        for x, y in zip(a, b):
+            c = _compare_values(x, y)
+            if c:
+                return c
+        return (len(a) > len(b)) - (len(a) < len(b))
+    elif ra == 9:
+        return _compare_values([[k, a[k]] for k in sorted(a)], [[k, b[k]] for k in sorted(b)])
+    elif ra == 10:
+        a, b = repr(a), repr(b)
+    return (a > b) - (a < b)
+
+
+def _get_field(data: Dict[str, Any], field_path: str) -> Any:
+    value: Any = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set_field(data: Dict[str, Any], field_path: str, value: Any):
+    parts = field_path.split('.')
+    target = data
+    for part in parts[:-1]:
+        nxt = target.get(part)
+        if not isinstance(nxt, dict):
+            nxt = {}
+            target[part] = nxt
+        target = nxt
+    target[parts[-1]] = value
+
+
+def _delete_field(data: Dict[str, Any], field_path: str):
+    parts = field_path.split('.')
+    target = data
+    for part in parts[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(parts[-1], None)
+
+
+def _apply_transform(current: Any, value: Any) -> Any:
+    """Resolve Firestore sentinels/transforms (SERVER_TIMESTAMP, Increment, ArrayUnion, ...)."""
+    kind = type(value).__name__
+    if kind == 'Sentinel':
+        description = getattr(value, 'description', '')
+        if 'timestamp' in description.lower():
+            return _now()
+        return _MISSING  # DELETE_FIELD
+    if kind in ('Increment', 'Maximum', 'Minimum'):
+        operand = value.value
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        if kind == 'Increment':
+            return base + operand
+        if current is _MISSING or current is None:
+            return operand
+        return max(base, operand) if kind == 'Maximum' else min(base, operand)
+    if kind == 'ArrayUnion':
+        result = list(current) if isinstance(current, list) else []
+        for v in value.values:
+            if v not in result:
+                result.append(_normalize(v))
+        return result
+    if kind == 'ArrayRemove':
+        result = list(current) if isinstance(current, list) else []
+        return [v for v in result if v not in value.values]
+    return _normalize(value)
+
+
+def _is_transform(value: Any) -> bool:
+    return type(value).__name__ in ('Sentinel', 'Increment', 'Maximum', 'Minimum', 'ArrayUnion', 'ArrayRemove')
+
+
+def _write_fields(target: Dict[str, Any], updates: Dict[str, Any], dotted: bool):
+    for key, value in updates.items():
+        if not dotted and isinstance(value, dict) and not _is_transform(value):
+            existing = target.get(key)
+            if not isinstance(existing, dict):
+                existing = {}
+                target[key] = existing
+            _write_fields(existing, value, dotted=False)
+            continue
+        current = _get_field(target, key) if dotted else target.get(key, _MISSING)
+        resolved = _apply_transform(current, value) if _is_transform(value) else _normalize(value)
+        if resolved is _MISSING:
+            if dotted:
+                _delete_field(target, key)
+            else:
+                target.pop(key, None)
+        elif dotted:
+            _set_field(target, key, resolved)
+        else:
+            target[key] = resolved
+
+
+def _strip_transforms(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain set() payload: resolve transforms against an empty document."""
+    result: Dict[str, Any] = {}
+    _write_fields(result, data, dotted=False)
+    return result
+
+
+# ---- documents ----
+
+class _Record:
+    __slots__ = ('data', 'create_time', 'update_time')
+
+    def __init__(self, data: Dict[str, Any], create_time: datetime, update_time: datetime):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+
+class MemoryDocumentSnapshot:
+    def __init__(self, reference: 'MemoryDocumentReference', record: Optional[_Record], read_time: datetime):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = record is not None
+        # Stored records are replaced, never mutated, so sharing is safe until to_dict()
+        self._data = record.data if record is not None else None
+        self.create_time = record.create_time if record is not None else None
+        self.update_time = record.update_time if record is not None else None
+        self.read_time = read_time
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        if self._data is None:
+            raise KeyError(field_path)
+        value = _get_field(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+    def __repr__(self):
+        return f"<MemoryDocumentSnapshot {self.reference.path} exists={self.exists}>"
+
+
+class MemoryDocumentReference:
+    def __init__(self, store: 'MemoryFirestore', path: List[str]):
+        if len(path) % 2 != 0 or not path:
+            raise ValueError(f"A document path needs an even number of segments: {'/'.join(path)}")
+        self._store = store
+        self._path = path
+        self.id = path[-1]
+        self.path = '/'.join(path)
+
+    @property
+    def parent(self) -> 'MemoryCollectionReference':
+        return MemoryCollectionReference(self._store, self._path[:-1])
+
+    def collection(self, collection_id: str) -> 'MemoryCollectionReference':
+        return MemoryCollectionReference(self._store, self._path + _split_path((collection_id,)))
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction: Any = None) -> MemoryDocumentSnapshot:
+        self._store._rpc('get')
+        with self._store._lock:
+            snap = self._store._snapshot(self)
+        self._store._count_reads(1)
+        return snap
+
+    def create(self, document_data: Dict[str, Any]):
+        batch = self._store.batch()
+        batch.create(self, document_data)
+        return batch.commit()[0]
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False):
+        batch = self._store.batch()
+        batch.set(self, document_data, merge=merge)
+        return batch.commit()[0]
+
+    def update(self, field_updates: Dict[str, Any], option: Optional['MemoryWriteOption'] = None):
+        batch = self._store.batch()
+        batch.update(self, field_updates, option=option)
+        return batch.commit()[0]
+
+    def delete(self, option: Optional['MemoryWriteOption'] = None):
+        batch = self._store.batch()
+        batch.delete(self, option=option)
+        return batch.commit()[0]
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return f"<MemoryDocumentReference {self.path}>"
+
+
+class WriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+
+class MemoryWriteOption:
+    """Write precondition, as returned by ``Client.write_option``."""
+
+    def __init__(self, last_update_time: Optional[datetime] = None, exists: Optional[bool] = None):
+        self.last_update_time = last_update_time
+        self.exists = exists
+
+    def check(self, ref: 'MemoryDocumentReference', existing: Optional['_Record']):
+        if self.last_update_time is not None:
+            if existing is None or existing.update_time != self.last_update_time:
+                raise storage_errors.FailedPrecondition(f"Document changed since it was read: {ref.path}")
+        elif self.exists and existing is None:
+            raise storage_errors.NotFound(f"No document to update: {ref.path}")
+        elif self.exists is False and existing is not None:
+            raise storage_errors.FailedPrecondition(f"Document already exists: {ref.path}")
+
+
+# ---- queries ----
+
+_RANGE_OPS = ('<', '<=', '>', '>=')
+
+
+def _matches(data: Dict[str, Any], doc_id: str, field_path: str, op: str, value: Any) -> bool:
+    actual = doc_id if field_path == DOCUMENT_ID else _get_field(data, field_path)
+    if actual is _MISSING:
+        return False
+    if field_path == DOCUMENT_ID and isinstance(value, MemoryDocumentReference):
+        value = value.id
+    if op == '==':
+        return _type_rank(actual) == _type_rank(value) and _compare_values(actual, value) == 0
+    if op == '!=':
+        return actual is not None and not (_type_rank(actual) == _type_rank(value) and _compare_values(actual, value) == 0)
+    if op in _RANGE_OPS:
+        if _type_rank(actual) != _type_rank(value):
+            return False
+        c = _compare_values(actual, value)
+        return {'<': c < 0, '<=': c <= 0, '>': c > 0, '>=': c >= 0}[op]
+    if op == 'in':
+        return any(_matches(data, doc_id, field_path, '==', v) for v in value)
+    if op == 'not-in':
+        return actual is not None and not any(_matches(data, doc_id, field_path, '==', v) for v in value)
+    if op == 'array-contains':
+        return isinstance(actual, list) and any(_compare_values(a, value) == 0 and _type_rank(a) == _type_rank(value) for a in actual)
+    if op == 'array-contains-any':
+        return isinstance(actual, list) and any(
+            _compare_values(a, v) == 0 and _type_rank(a) == _type_rank(v) for a in actual for v in value)
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class MemoryQuery:
+    def __init__(self, store: 'MemoryFirestore', collection_path: Optional[List[str]] = None,
+                 collection_group: Optional[str] = None):
+        self._store = store
+        self._collection_path = collection_path
+        self._collection_group = collection_group
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._orders: List[Tuple[str, str]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._cursor: Optional[Tuple[List[Any], bool]] = None  # (values, inclusive)
+
+    def _copy(self) -> 'MemoryQuery':
+        q = MemoryQuery(self._store, self._collection_path, self._collection_group)
+        q._filters = list(self._filters)
+        q._orders = list(self._orders)
+        q._limit = self._limit
+        q._offset = self._offset
+        q._cursor = self._cursor
+        return q
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None,
+              filter: Any = None) -> 'MemoryQuery':
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        q = self._copy()
+        q._filters.append((field_path, op_string, _normalize(value)))
+        return q
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> 'MemoryQuery':
+        direction = str(direction).upper()
+        if direction not in (ASCENDING, DESCENDING):
+            raise ValueError(f"Invalid direction: {direction}")
+        q = self._copy()
+        q._orders.append((field_path, direction))
+        return q
+
+    def limit(self, count: int) -> 'MemoryQuery':
+        q = self._copy()
+        q._limit = count
+        return q
+
+    def offset(self, num_to_skip: int) -> 'MemoryQuery':
+        q = self._copy()
+        q._offset = num_to_skip
+        return q
+
+    def _set_cursor(self, cursor: Any, inclusive: bool) -> 'MemoryQuery':
+        if not self._orders:
+            raise ValueError('Cursors require order_by()')
+        if isinstance(cursor, MemoryDocumentSnapshot):
+            values = [cursor.id if f == DOCUMENT_ID else _get_field(cursor._data or {}, f) for f, _ in self._orders]
+            if all(f != DOCUMENT_ID for f, _ in self._orders):
+                values.append(cursor.id)
+        elif isinstance(cursor, dict):
+            values = []
+            for f, _ in self._orders[:len(cursor)]:
+                v = cursor[f] if f in cursor else _get_field(cursor, f)
+                if v is _MISSING:
+                    raise ValueError(f"Cursor is missing order_by field {f}")
+                values.append(v)
+        else:
+            values = list(cursor)
+        values = [v.id if isinstance(v, MemoryDocumentReference) else _normalize(v) for v in values]
+        q = self._copy()
+        q._cursor = (values, inclusive)
+        return q
+
+    def start_after(self, document_fields_or_snapshot: Any) -> 'MemoryQuery':
+        return self._set_cursor(document_fields_or_snapshot, inclusive=False)
+
+    def start_at(self, document_fields_or_snapshot: Any) -> 'MemoryQuery':
+        return self._set_cursor(document_fields_or_snapshot, inclusive=True)
+
+    def _effective_orders(self) -> List[Tuple[str, str]]:
+        orders = list(self._orders)
+        # Firestore orders by the first inequality field first when no explicit order is given
+        if not orders:
+            for f, op, _ in self._filters:
+                if op in _RANGE_OPS or op in ('!=', 'not-in'):
+                    orders.append((f, ASCENDING))
+                    break
+        if all(f != DOCUMENT_ID for f, _ in orders):
+            orders.append((DOCUMENT_ID, orders[-1][1] if orders else ASCENDING))
+        return orders
+
+    def _execute(self) -> List[MemoryDocumentSnapshot]:
+        store = self._store
+        orders = self._effective_orders()
+        with store._lock:
+            candidates = store._candidates(self._collection_path, self._collection_group, self._filters)
+            rows = []
+            for ref_path, record in candidates:
+                doc_id = ref_path[-1]
+                if not all(_matches(record.data, doc_id, f, op, v) for f, op, v in self._filters):
+                    continue
+                # Documents lacking an order_by field are not part of the result (as in Firestore)
+                keys = []
+                for f, _ in orders:
+                    val = doc_id if f == DOCUMENT_ID else _get_field(record.data, f)
+                    if val is _MISSING:
+                        break
+                    keys.append(val)
+                else:
+                    rows.append((keys, ref_path, record))
+
+            def cmp(a, b):
+                for (va, vb), (_, direction) in zip(zip(a[0], b[0]), orders):
+                    c = _compare_values(va, vb)
+                    if c:
+                        return -c if direction == DESCENDING else c
+                return 0
+
+            rows.sort(key=functools.cmp_to_key(cmp))
+            if self._cursor is not None:
+                values, inclusive = self._cursor
+                rows = [r for r in rows if self._after_cursor(r[0], values, orders, inclusive)]
+            rows = rows[self._offset:]
+            if self._limit is not None:
+                rows = rows[:self._limit]
+            read_time = _now()
+            snaps = [MemoryDocumentSnapshot(MemoryDocumentReference(store, list(p)), rec, read_time)
+                     for _, p, rec in rows]
+        return snaps
+
+    @staticmethod
+    def _after_cursor(keys: List[Any], values: List[Any], orders, inclusive: bool) -> bool:
+        for key, value, (_, direction) in zip(keys, values, orders):
+            c = _compare_values(key, value)
+            if direction == DESCENDING:
+                c = -c
+            if c:
+                return c > 0
+        return inclusive
+
+    def stream(self, transaction: Any = None) -> Iterator[MemoryDocumentSnapshot]:
+        self._store._rpc('query')
+        snaps = self._execute()
+        self._store._count_reads(max(1, len(snaps)))
+        return iter(snaps)
+
+    def get(self, transaction: Any = None) -> List[MemoryDocumentSnapshot]:
+        return list(self.stream(transaction=transaction))
+
+
+class MemoryCollectionReference(MemoryQuery):
+    def __init__(self, store: 'MemoryFirestore', path: List[str]):
+        if len(path) % 2 != 1:
+            raise ValueError(f"A collection path needs an odd number of segments: {'/'.join(path)}")
+        super().__init__(store, collection_path=path)
+        self._path = path
+        self.id = path[-1]
+        self.path = '/'.join(path)
+
+    @property
+    def parent(self) -> Optional[MemoryDocumentReference]:
+        return MemoryDocumentReference(self._store, self._path[:-1]) if len(self._path) > 1 else None
+
+    def document(self, document_id: Optional[str] = None) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self._store, self._path + _split_path((document_id or _auto_id(),)))
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        result = ref.create(document_data)
+        return result.update_time, ref
+
+    def list_documents(self) -> List[MemoryDocumentReference]:
+        with self._store._lock:
+            ids = list(self._store._collections.get(self.path, {}).keys())
+        return [self.document(i) for i in ids]
+
+
+# ---- writes ----
+
+class MemoryWriteBatch:
+    """Buffered writes applied atomically on commit(), like Firestore's WriteBatch."""
+
+    def __init__(self, store: 'MemoryFirestore'):
+        self._store = store
+        self._writes: List[Tuple[str, MemoryDocumentReference, Any, bool, Optional[MemoryWriteOption]]] = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def create(self, reference: MemoryDocumentReference, document_data: Dict[str, Any]):
+        self._writes.append(('create', reference, document_data, False, None))
+
+    def set(self, reference: MemoryDocumentReference, document_data: Dict[str, Any], merge: bool = False):
+        self._writes.append(('set', reference, document_data, merge, None))
+
+    def update(self, reference: MemoryDocumentReference, field_updates: Dict[str, Any],
+               option: Optional[MemoryWriteOption] = None):
+        self._writes.append(('update', reference, field_updates, False, option))
+
+    def delete(self, reference: MemoryDocumentReference, option: Optional[MemoryWriteOption] = None):
+        self._writes.append(('delete', reference, None, False, option))
+
+    def commit(self) -> List[WriteResult]:
+        self._store._rpc('commit')
+        results = self._store._apply(self._writes)
+        self._writes = []
+        return results
+
+
+# ---- the client ----
+
+class MemoryFirestore:
+    """
+    In-process stand-in for the Firestore client.
+
+    Implements the storage interface in ``storage.base`` with Firestore semantics
+    that matter to the app: equality/range/in filters, multi-field ordering with
+    an implicit document-id tie-break, cursors, merge/dotted-path updates,
+    transforms, atomic batches, write preconditions and NotFound/AlreadyExists/
+    FailedPrecondition errors. Equality filters are served from lazily built
+    per-field hash indexes so queries stay proportional to their result size at
+    production data volumes.
+
+    Every RPC sleeps ``latency_ms`` (+ up to ``jitter_ms``) to simulate network
+    round trips; ``stats`` counts RPCs per kind and billed document reads.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.stats: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._collections: Dict[str, Dict[str, _Record]] = defaultdict(dict)
+        # collection path -> field -> value -> set(doc ids)
+        self._indexes: Dict[str, Dict[str, Dict[Any, set]]] = defaultdict(dict)
+        # Commit times strictly increase so last_update_time preconditions detect every write
+        self._last_commit = datetime.min.replace(tzinfo=timezone.utc)
+
+    # -- public client API --
+
+    def collection(self, *collection_path: str) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self, _split_path(collection_path))
+
+    def document(self, *document_path: str) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self, _split_path(document_path))
+
+    def collection_group(self, collection_id: str) -> MemoryQuery:
+        return MemoryQuery(self, collection_group=collection_id)
+
+    def batch(self) -> MemoryWriteBatch:
+        return MemoryWriteBatch(self)
+
+    @staticmethod
+    def write_option(**kwargs) -> MemoryWriteOption:
+        """``write_option(last_update_time=...)`` or ``write_option(exists=...)``, exactly one."""
+        if len(kwargs) != 1 or next(iter(kwargs)) not in ('last_update_time', 'exists'):
+            raise TypeError("write_option() takes exactly one of last_update_time or exists")
+        return MemoryWriteOption(**kwargs)
+
+    def get_all(self, references: Iterable[MemoryDocumentReference], field_paths: Optional[Iterable[str]] = None,
+                transaction: Any = None) -> Iterator[MemoryDocumentSnapshot]:
+        refs = list(references)
+        self._rpc('get_all')
+        with self._lock:
+            snaps = [self._snapshot(ref) for ref in refs]
+        self._count_reads(len(snaps))
+        return iter(snaps)
+
+    def collections(self) -> List[MemoryCollectionReference]:
+        with self._lock:
+            roots = sorted({p for p in self._collections if '/' not in p})
+        return [self.collection(p) for p in roots]
+
+    def reset(self):
+        with self._lock:
+            self._collections.clear()
+            self._indexes.clear()
+            self.stats.clear()
+
+    def count(self, collection_path: str) -> int:
+        with self._lock:
+            return len(self._collections.get(collection_path, {}))
+
+    # -- internals --
+
+    def _rpc(self, kind: str):
+        self.stats[f'rpc.{kind}'] += 1
+        delay = self.latency_ms
+        if self.jitter_ms:
+            delay += self._rng.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def _count_reads(self, n: int):
+        self.stats['documents_read'] += n
+
+    def _snapshot(self, ref: MemoryDocumentReference) -> MemoryDocumentSnapshot:
+        record = self._collections.get('/'.join(ref._path[:-1]), {}).get(ref.id)
+        return MemoryDocumentSnapshot(ref, record, _now())
+
+    def _candidates(self, collection_path: Optional[List[str]], group: Optional[str],
+                    filters: List[Tuple[str, str, Any]]) -> Iterable[Tuple[Tuple[str, ...], _Record]]:
+        if collection_path is not None:
+            paths = ['/'.join(collection_path)]
+        else:
+            paths = [p for p in self._collections if p.rsplit('/', 1)[-1] == group]
+        out = []
+        for path in paths:
+            docs = self._collections.get(path)
+            if not docs:
+                continue
+            prefix = tuple(path.split('/'))
+            ids = self._indexed_ids(path, docs, filters)
+            if ids is None:
+                out.extend((prefix + (doc_id,), rec) for doc_id, rec in docs.items())
+            else:
+                out.extend((prefix + (doc_id,), docs[doc_id]) for doc_id in ids if doc_id in docs)
+        return out
+
+    def _indexed_ids(self, path: str, docs: Dict[str, _Record], filters) -> Optional[set]:
+        """Narrow candidates with the most selective equality filter, building its index on demand."""
+        best = None
+        for field, op, value in filters:
+            if op not in ('==', 'in') or field == DOCUMENT_ID:
+                continue
+            values = value if op == 'in' else [value]
+            if not all(_hashable(v) for v in values):
+                continue
+            index = self._indexes[path].get(field)
+            if index is None:
+                index = self._build_index(path, docs, field)
+            ids = set()
+            for v in values:
+                ids |= index.get(_index_key(v), set())
+            if best is None or len(ids) < len(best):
+                best = ids
+        return best
+
+    def _build_index(self, path: str, docs: Dict[str, _Record], field: str) -> Dict[Any, set]:
+        index: Dict[Any, set] = defaultdict(set)
+        for doc_id, rec in docs.items():
+            v = _get_field(rec.data, field)
+            if v is not _MISSING and _hashable(v):
+                index[_index_key(v)].add(doc_id)
+        self._indexes[path][field] = index
+        return index
+
+    def _reindex(self, path: str, doc_id: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        for field, index in self._indexes.get(path, {}).items():
+            if old is not None:
+                v = _get_field(old, field)
+                if v is not _MISSING and _hashable(v):
+                    index.get(_index_key(v), set()).discard(doc_id)
+            if new is not None:
+                v = _get_field(new, field)
+                if v is not _MISSING and _hashable(v):
+                    index[_index_key(v)].add(doc_id)
+
+    def _apply(self, writes: List[Tuple[str, MemoryDocumentReference, Any, bool, Optional[MemoryWriteOption]]]
+               ) -> List[WriteResult]:
+        with self._lock:
+            # Validate everything first so a failing write leaves the store untouched
+            pending: Dict[str, Optional[_Record]] = {}
+
+            def current(ref):
+                if ref.path in pending:
+                    return pending[ref.path]
+                return self._collections.get('/'.join(ref._path[:-1]), {}).get(ref.id)
+
+            now = max(_now(), self._last_commit + timedelta(microseconds=1))
+            self._last_commit = now
+            for op, ref, data, merge, option in writes:
+                existing = current(ref)
+                if option is not None:
+                    option.check(ref, existing)
+                if op == 'create':
+                    if existing is not None:
+                        raise storage_errors.AlreadyExists(f"Document already exists: {ref.path}")
+                    pending[ref.path] = _Record(_strip_transforms(data), now, now)
+                elif op == 'set':
+                    if merge and existing is not None:
+                        merged = copy.deepcopy(existing.data)
+                        _write_fields(merged, data, dotted=False)
+                        pending[ref.path] = _Record(merged, existing.create_time, now)
+                    else:
+                        create_time = existing.create_time if existing is not None else now
+                        pending[ref.path] = _Record(_strip_transforms(data), create_time, now)
+                elif op == 'update':
+                    if existing is None:
+                        raise storage_errors.NotFound(f"No document to update: {ref.path}")
+                    updated = copy.deepcopy(existing.data)
+                    _write_fields(updated, data, dotted=True)
+                    pending[ref.path] = _Record(updated, existing.create_time, now)
+                elif op == 'delete':
+                    pending[ref.path] = None
+                else:
+                    raise ValueError(f"Unknown write: {op}")
+
+            for path, record in pending.items():
+                col_path, doc_id = path.rsplit('/', 1)
+                docs = self._collections[col_path]
+                old = docs.get(doc_id)
+                if record is None:
+                    docs.pop(doc_id, None)
+                else:
+                    docs[doc_id] = record
+                self._reindex(col_path, doc_id, old.data if old else None, record.data if record else None)
+            self.stats['documents_written'] += len(writes)
+            return [WriteResult(now) for _ in writes]
+
+
+def _hashable(value: Any) -> bool:
+    return not isinstance(value, (dict, list))
+
+
+def _index_key(value: Any) -> Any:
+    # The type rank keeps True and 1 apart, as Firestore does
+    if isinstance(value, datetime):
+        value = _normalize(value)
+    return (_type_rank(value), value.path if isinstance(value, MemoryDocumentReference) else value)
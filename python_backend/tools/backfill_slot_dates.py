@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Add the ``date`` field to availability slots written before it existed.
+
+The open-slot index only queries slots with ``date >= today``, so older slot
+documents (``counsellors/{id}/availability/{dateKey}/slots/{time}``) without the
+field are invisible to /api/counsellor/availability/search until backfilled.
+Reads every slot once; only upcoming slots are written unless --all is given.
+
+Usage (from python_backend/):
+    python tools/backfill_slot_dates.py [--all] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from scheduling.slot_index import DATE_FIELD  # noqa: E402
+from storage.batch_writer import commit_groups  # noqa: E402
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--all', action='store_true', help='also backfill slots on past days')
+    parser.add_argument('--dry-run', action='store_true', help='print counts without writing')
+    args = parser.parse_args()
+
+    import app as backend
+
+    db = backend.db
+    if not db:
+        raise SystemExit("Database not available")
+
+    started = time.perf_counter()
+    today = date.today().isoformat()
+    scanned = 0
+    groups = []
+    for snap in db.collection_group('slots').stream():
+        scanned += 1
+        parts = snap.reference.path.split('/')
+        # counsellors/{id}/availability/{dateKey}/slots/{slotId}
+        if len(parts) != 6 or parts[0] != 'counsellors' or parts[2] != 'availability':
+            continue
+        if (parts[3] < today and not args.all) or (snap.to_dict() or {}).get(DATE_FIELD) == parts[3]:
+            continue
+        groups.append([('update', snap.reference, {DATE_FIELD: parts[3]}, None)])
+    print(f"{scanned} slots, {len(groups)} to backfill ({time.perf_counter() - started:.1f}s)")
+    if args.dry_run:
+        return
+    failed = sum(1 for error in commit_groups(db, groups) if error is not None)
+    print(f"updated {len(groups) - failed} slots, {failed} failed ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON serialization backends and response compression on realistic payloads.
+
+Usage (from python_backend/):
+    python tools/bench_serialization.py [--appointments 500] [--repeat 200]
+"""
+
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from web.json_provider import FastJSONProvider, orjson  # noqa: E402
+from web.compression import brotli  # noqa: E402
+
+
+def chat_payload():
+    text = "I'm feeling really overwhelmed with exams and I can't sleep properly anymore"
+    return {
+        'user_message': text,
+        'ai_reply': 'It sounds like you are carrying a lot right now. ' * 8,
+        'sentiment': {
+            'text': text,
+            'cleaned_text': text.lower(),
+            'label': 'negative',
+            'score': -0.42,
+            'confidence': 0.63,
+            'crisis_detected': False,
+            'crisis_indicators': [],
+            'emotional_keywords': {'positive': [], 'negative': ['overwhelmed']},
+            'intensity': 'medium',
+            'recommendations': ['Moderate support needed', 'Offer coping strategies',
+                                'Consider counseling referral', 'Monitor progress'],
+        },
+    }
+
+
+def appointments_payload(count: int):
+    now = datetime.now()
+    items = []
+    for i in range(count):
+        items.append({
+            'id': f'appt{i:06d}',
+            'studentId': f'student{random.randint(1, 5000)}',
+            'studentName': f'Student {i}',
+            'studentEmail': f'student{i}@university.edu',
+            'counsellorId': 'counsellor42',
+            'counsellorName': 'Dr. Sarah Johnson',
+            'appointmentDate': (now + timedelta(days=i % 30)).strftime('%Y-%m-%d'),
+            'appointmentTime': random.choice(['09:00', '10:00', '11:00', '14:00', '15:00']),
+            'sessionType': random.choice(['video', 'phone', 'in-person']),
+            'status': random.choice(['pending', 'confirmed', 'completed', 'cancelled']),
+            'reason': random.choice(['anxiety', 'depression', 'academic']),
+            'notes': f'Mock appointment notes for appointment {i}',
+            'createdAt': now - timedelta(days=random.randint(1, 30)),
+            'updatedAt': now,
+        })
+    return {'appointments': items, 'nextCursor': None}
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--appointments', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(7)
+    app = Flask(__name__)
+    providers = {'std': FastJSONProvider(app, backend='std')}
+    if orjson is not None:
+        providers['orjson'] = FastJSONProvider(app, backend='orjson')
+
+    payloads = {'chat': chat_payload(), f'appointments[{args.appointments}]': appointments_payload(args.appointments)}
+    for name, payload in payloads.items():
+        print(f"\n== {name}")
+        body = None
+        for backend, provider in providers.items():
+            us = timeit(lambda: provider.dump_bytes(payload), args.repeat)
+            body = provider.dump_bytes(payload)
+            print(f"  {backend:<8} serialize {us:9.1f} us  {len(body):8d} bytes")
+        us = timeit(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+        print(f"  gzip-6   compress  {us:9.1f} us  {len(gzip.compress(body, compresslevel=6)):8d} bytes")
+        if brotli is not None:
+            us = timeit(lambda: brotli.compress(body, quality=4), args.repeat)
+            print(f"  br-4     compress  {us:9.1f} us  {len(brotli.compress(body, quality=4)):8d} bytes")
+
+
+if __name__ == '__main__':
+    main()
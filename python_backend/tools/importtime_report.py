@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Report per-module import cost using the interpreter's ``-X importtime`` trace.
+
+Usage (from python_backend/):
+    python tools/importtime_report.py                     # import app
+    python tools/importtime_report.py --module sentiment.sentiment_analyzer
+    python tools/importtime_report.py --by-package --top 15
+    python tools/importtime_report.py --exec "import app; app.warm_up()"
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def run_importtime(code: str) -> Tuple[List[Dict], float]:
+    """Run ``code`` in a fresh interpreter with -X importtime and parse the trace."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"import failed with exit code {proc.returncode}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, name = m.groups()
+        entries.append({
+            'module': name,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(indent) - 1) // 2,
+        })
+    total_us = sum(e['cumulative_us'] for e in entries if e['depth'] == 0)
+    return entries, total_us
+
+
+def aggregate_by_package(entries: List[Dict]) -> List[Dict]:
+    """Sum self time per top-level package (what the package costs including its submodules)."""
+    totals = defaultdict(lambda: {'self_us': 0, 'modules': 0})
+    for e in entries:
+        top = e['module'].split('.')[0]
+        totals[top]['self_us'] += e['self_us']
+        totals[top]['modules'] += 1
+    return [{'module': name, **vals} for name, vals in totals.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app', help='module to import (default: app)')
+    parser.add_argument('--exec', dest='code', help='arbitrary code to trace instead of --module')
+    parser.add_argument('--top', type=int, default=25, help='rows to print')
+    parser.add_argument('--by-package', action='store_true', help='aggregate self time per top-level package')
+    args = parser.parse_args()
+
+    code = args.code or f'import {args.module}'
+    entries, total_us = run_importtime(code)
+
+    print(f"Traced: {code}")
+    print(f"Total import time: {total_us / 1000:.1f} ms across {len(entries)} modules\n")
+    if args.by_package:
+        rows = sorted(aggregate_by_package(entries), key=lambda r: r['self_us'], reverse=True)[:args.top]
+        print(f"{'package':<40} {'self ms':>10} {'share':>7} {'modules':>8}")
+        for r in rows:
+            share = r['self_us'] / total_us * 100 if total_us else 0
+            print(f"{r['module']:<40} {r['self_us'] / 1000:>10.1f} {share:>6.1f}% {r['modules']:>8}")
+    else:
+        rows = sorted(entries, key=lambda r: r['cumulative_us'], reverse=True)[:args.top]
+        print(f"{'module':<50} {'cumulative ms':>14} {'self ms':>9}")
+        for r in rows:
+            print(f"{r['module']:<50} {r['cumulative_us'] / 1000:>14.1f} {r['self_us'] / 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
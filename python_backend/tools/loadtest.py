@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test against a local backend with stand-in dependencies.
+
+By default this starts the backend in a child process with the in-memory
+document store (seeded through DatabaseSeeder) and a fake OpenRouter server,
+then drives an open-loop traffic mix at a target request rate and reports
+throughput, latency percentiles and error rates per route.
+
+Usage (from python_backend/):
+    python tools/loadtest.py --rps 50 --duration 30
+    python tools/loadtest.py --ramp 10:200:10 --duration 15 --slo-ms 500
+    python tools/loadtest.py --mix chat=5,phq9=2,insights=3,availability=6,status=2
+    python tools/loadtest.py --students 5000 --counsellors 100 --appointments 20000 --store-latency-ms 5
+    python tools/loadtest.py --dataset ../mock_data/data --rps 100
+
+Latency is measured from each request's scheduled start, so queueing caused by a
+saturated server is included (no coordinated omission). Connection failures, 5xx
+and 429 (load shed by admission control) all count as errors. The chat admission
+limits are lifted in the child backend so a ramp measures capacity rather than
+CHAT_USER_RATE_PER_MIN; pass --chat-admission to keep the configured limits.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOCK_DATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), 'mock_data')
+
+DEFAULT_MIX = 'chat=30,phq9=8,gad7=8,insights=12,availability=25,appointments=10,status=5,reschedule=2'
+
+CHAT_MESSAGES = [
+    "I'm feeling really stressed about my exams",
+    "I can't sleep and I feel tired all the time",
+    "Today was actually a good day, I feel hopeful",
+    "I feel lonely since I moved to campus",
+    "My anxiety gets worse before presentations",
+    "I'm overwhelmed with assignments and deadlines",
+]
+
+
+# ---------------- server side (child process) ----------------
+
+class FakeOpenRouterHandler(BaseHTTPRequestHandler):
+    latency_ms = 300.0
+    jitter_ms = 200.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000.0)
+        body = json.dumps({'choices': [{'message': {'content': 'That sounds hard. Let us try a breathing exercise together.'}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def seed_population(db, args) -> Dict:
+    sys.path.insert(0, MOCK_DATA_DIR)
+    from seed_database import DatabaseSeeder
+
+    seeder = DatabaseSeeder(db=db, verbose=False, seed=args.seed)
+    if args.dataset:
+        seeder.seed_from_export(args.dataset)
+        users = [(doc.id, doc.get('role')) for doc in db.collection('users').stream()]
+        students = [uid for uid, role in users if role == 'student']
+        counsellors = [uid for uid, role in users if role == 'counsellor']
+    else:
+        students = seeder.seed_users(args.students)
+        counsellors = seeder.seed_counsellors(args.counsellors)
+        seeder.seed_appointments(students, counsellors, args.appointments)
+        seeder.seed_assessments(students, args.assessments)
+        seeder.seed_mood_scores(students, args.mood_scores)
+        seeder.seed_availability(counsellors, days=14)
+
+    appointments = []
+    for doc in db.collection('appointments').stream():
+        a = doc.to_dict()
+        appointments.append([doc.id, a['counsellorId'], a['studentId']])
+    return {'students': students, 'counsellors': counsellors, 'appointments': appointments}
+
+
+def serve(args):
+    fake = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenRouterHandler)
+    FakeOpenRouterHandler.latency_ms = args.llm_latency_ms
+    FakeOpenRouterHandler.jitter_ms = args.llm_jitter_ms
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+
+    os.environ['STORAGE_BACKEND'] = 'memory'
+    os.environ['OPENROUTER_URL'] = f'http://127.0.0.1:{fake.server_address[1]}/api/v1/chat/completions'
+    os.environ.setdefault('OPENROUTER_API_KEY', 'loadtest')
+    if not args.chat_admission:
+        # A rate or cap of 0 disables that part of the chat admission control
+        for name in ('CHAT_USER_RATE_PER_MIN', 'CHAT_GLOBAL_RATE_PER_MIN', 'CHAT_MAX_IN_FLIGHT'):
+            os.environ[name] = '0'
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    import logging
+    import app as backend
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    backend.warm_up()
+    started = time.perf_counter()
+    population = seed_population(backend.db, args)
+    # Seed at memory speed, then switch on simulated network latency
+    backend.db.latency_ms = args.store_latency_ms
+    backend.db.jitter_ms = args.store_jitter_ms
+    backend.db.stats.clear()
+    with open(args.population, 'w') as f:
+        json.dump(population, f)
+    print(f"seeded {len(population['students'])} students, {len(population['counsellors'])} counsellors, "
+          f"{len(population['appointments'])} appointments in {time.perf_counter() - started:.1f}s", flush=True)
+
+    server = make_server('127.0.0.1', args.port, backend.app, threaded=True)
+    server.serve_forever()
+
+
+# ---------------- client side ----------------
+
+class TrafficMix:
+    """Builds weighted random requests against the seeded population."""
+
+    def __init__(self, population: Dict, weights: Dict[str, float], rng: random.Random):
+        self.population = population
+        self.rng = rng
+        self.ops: Dict[str, Callable[[], Tuple[str, str, Optional[Dict]]]] = {
+            'chat': self.chat,
+            'phq9': self.phq9,
+            'gad7': self.gad7,
+            'insights': self.insights,
+            'availability': self.availability,
+            'appointments': self.appointments,
+            'status': self.status,
+            'reschedule': self.reschedule,
+        }
+        unknown = set(weights) - set(self.ops)
+        if unknown:
+            raise SystemExit(f"unknown operations in mix: {', '.join(sorted(unknown))}")
+        self.names = [n for n in weights if weights[n] > 0]
+        self.weights = [weights[n] for n in self.names]
+
+    def next(self) -> Tuple[str, str, str, Optional[Dict]]:
+        name = self.rng.choices(self.names, self.weights)[0]
+        return (name,) + self.ops[name]()
+
+    def _appointment(self):
+        return self.rng.choice(self.population['appointments'])
+
+    def chat(self):
+        student = self.rng.choice(self.population['students'])
+        return 'POST', '/api/chat', {'message': self.rng.choice(CHAT_MESSAGES), 'user_id': student,
+                                     'session_id': f'lt-{student}'}
+
+    def phq9(self):
+        return 'POST', '/api/assessment/phq9', {'responses': [self.rng.randint(0, 3) for _ in range(9)],
+                                                'user_id': self.rng.choice(self.population['students'])}
+
+    def gad7(self):
+        return 'POST', '/api/assessment/gad7', {'responses': [self.rng.randint(0, 3) for _ in range(7)],
+                                                'user_id': self.rng.choice(self.population['students'])}
+
+    def insights(self):
+        appt_id, counsellor_id, _ = self._appointment()
+        return 'GET', f'/api/counsellor/appointments/{appt_id}/insights?counsellorId={counsellor_id}', None
+
+    def availability(self):
+        counsellor_id = self.rng.choice(self.population['counsellors'])
+        date_key = (datetime.now() + timedelta(days=self.rng.randint(0, 13))).strftime('%Y-%m-%d')
+        return 'GET', f'/api/counsellor/availability?counsellorId={counsellor_id}&dateKey={date_key}', None
+
+    def appointments(self):
+        counsellor_id = self.rng.choice(self.population['counsellors'])
+        return 'GET', f'/api/counsellor/appointments?counsellorId={counsellor_id}&limit=50', None
+
+    def status(self):
+        appt_id, counsellor_id, _ = self._appointment()
+        return 'PATCH', f'/api/counsellor/appointments/{appt_id}/status', {
+            'status': self.rng.choice(['approved', 'pending', 'confirmed']), 'counsellorId': counsellor_id}
+
+    def reschedule(self):
+        appt_id, counsellor_id, _ = self._appointment()
+        date_key = (datetime.now() + timedelta(days=self.rng.randint(1, 30))).strftime('%Y-%m-%d')
+        return 'PATCH', f'/api/counsellor/appointments/{appt_id}/reschedule', {
+            'appointmentDate': date_key, 'appointmentTime': self.rng.choice(['09:00', '10:00', '14:00']),
+            'counsellorId': counsellor_id}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def run_stage(base_url: str, mix: TrafficMix, rps: float, duration: float, concurrency: int,
+              timeout: float) -> Dict:
+    import requests
+
+    local = threading.local()
+    results = defaultdict(lambda: {'latencies': [], 'errors': 0, 'statuses': defaultdict(int)})
+    lock = threading.Lock()
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    def fire(name, method, path, body, scheduled):
+        status = 0
+        try:
+            resp = session().request(method, base_url + path, json=body, timeout=timeout)
+            status = resp.status_code
+        except Exception:
+            status = 0
+        latency = time.perf_counter() - scheduled
+        with lock:
+            r = results[name]
+            r['latencies'].append(latency)
+            r['statuses'][status] += 1
+            # A 429 was shed, not served: it counts against the stage like a 5xx
+            if status == 0 or status == 429 or status >= 500:
+                r['errors'] += 1
+
+    total = int(rps * duration)
+    interval = 1.0 / rps
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            name, method, path, body = mix.next()
+            pool.submit(fire, name, method, path, body, scheduled)
+    elapsed = time.perf_counter() - start
+
+    report = {'target_rps': rps, 'elapsed': elapsed, 'routes': {}}
+    all_lat, all_err, all_n = [], 0, 0
+    for name, r in sorted(results.items()):
+        lat = sorted(r['latencies'])
+        all_lat.extend(lat)
+        all_err += r['errors']
+        all_n += len(lat)
+        report['routes'][name] = {
+            'requests': len(lat), 'errors': r['errors'],
+            'p50': percentile(lat, 50), 'p95': percentile(lat, 95), 'p99': percentile(lat, 99),
+            'statuses': dict(r['statuses']),
+        }
+    all_lat.sort()
+    report['total'] = {
+        'requests': all_n, 'errors': all_err, 'throughput': all_n / elapsed if elapsed else 0.0,
+        'p50': percentile(all_lat, 50), 'p95': percentile(all_lat, 95), 'p99': percentile(all_lat, 99),
+    }
+    return report
+
+
+def print_report(report: Dict):
+    t = report['total']
+    print(f"\n== target {report['target_rps']:.0f} rps: achieved {t['throughput']:.1f} rps, "
+          f"{t['requests']} requests, error rate {t['errors'] / max(1, t['requests']) * 100:.2f}%")
+    print(f"{'route':<14} {'reqs':>6} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for name, r in report['routes'].items():
+        err = r['errors'] / max(1, r['requests']) * 100
+        statuses = ' '.join(f"{k}:{v}" for k, v in sorted(r['statuses'].items()))
+        print(f"{name:<14} {r['requests']:>6} {err:>6.2f} {r['p50'] * 1000:>9.1f} {r['p95'] * 1000:>9.1f} "
+              f"{r['p99'] * 1000:>9.1f}  {statuses}")
+    print(f"{'ALL':<14} {t['requests']:>6} {t['errors'] / max(1, t['requests']) * 100:>6.2f} "
+          f"{t['p50'] * 1000:>9.1f} {t['p95'] * 1000:>9.1f} {t['p99'] * 1000:>9.1f}")
+
+
+def saturated(report: Dict, slo_ms: float, max_error_rate: float) -> Optional[str]:
+    t = report['total']
+    if t['throughput'] < 0.95 * report['target_rps']:
+        return f"throughput {t['throughput']:.1f} < 95% of {report['target_rps']:.0f} rps"
+    if t['p99'] * 1000 > slo_ms:
+        return f"p99 {t['p99'] * 1000:.0f} ms > SLO {slo_ms:.0f} ms"
+    if t['errors'] / max(1, t['requests']) > max_error_rate:
+        return f"error rate above {max_error_rate * 100:.1f}%"
+    return None
+
+
+def wait_for(url: str, proc: subprocess.Popen, timeout: float = 600.0):
+    import requests
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("backend process exited during startup")
+        try:
+            if requests.get(url + '/health', timeout=1).status_code == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise SystemExit("backend did not become healthy in time")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rps', type=float, default=20, help='target requests per second')
+    parser.add_argument('--ramp', help='start:stop:step rps stages to find the saturation point')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per stage')
+    parser.add_argument('--concurrency', type=int, default=256, help='max client requests in flight')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout (s)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='op=weight,... (chat, phq9, gad7, insights, '
+                                                          'availability, appointments, status, reschedule)')
+    parser.add_argument('--slo-ms', type=float, default=1000, help='p99 latency SLO used for saturation')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--counsellors', type=int, default=50)
+    parser.add_argument('--appointments', type=int, default=5000)
+    parser.add_argument('--assessments', type=int, default=5000)
+    parser.add_argument('--mood-scores', type=int, default=20000)
+    parser.add_argument('--dataset', help='seed from a seed_database.py --export directory instead')
+    parser.add_argument('--store-latency-ms', type=float, default=3.0, help='simulated Firestore RPC latency')
+    parser.add_argument('--store-jitter-ms', type=float, default=2.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0, help='simulated OpenRouter latency')
+    parser.add_argument('--llm-jitter-ms', type=float, default=200.0)
+    parser.add_argument('--chat-admission', action='store_true',
+                        help="keep the backend's CHAT_* admission limits instead of lifting them")
+    parser.add_argument('--json', help='write the stage reports to this file')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--population', default=os.path.join(BACKEND_DIR, '.loadtest_population.json'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    child_args = [a for a in sys.argv[1:]]
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve'] + child_args)
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_for(base_url, proc)
+        with open(args.population) as f:
+            population = json.load(f)
+        mix = TrafficMix(population, parse_mix(args.mix), random.Random(args.seed))
+
+        if args.ramp:
+            start, stop, step = (float(x) for x in args.ramp.split(':'))
+            stages = []
+            rps = start
+            while rps <= stop:
+                stages.append(rps)
+                rps += step
+        else:
+            stages = [args.rps]
+
+        reports = []
+        saturation = None
+        for rps in stages:
+            report = run_stage(base_url, mix, rps, args.duration, args.concurrency, args.timeout)
+            reports.append(report)
+            print_report(report)
+            reason = saturated(report, args.slo_ms, args.max_error_rate)
+            if reason:
+                saturation = {'rps': rps, 'reason': reason}
+                break
+
+        if args.ramp:
+            if saturation:
+                ok = [r['target_rps'] for r in reports[:-1]]
+                print(f"\nSaturation at {saturation['rps']:.0f} rps ({saturation['reason']}); "
+                      f"last healthy stage: {ok[-1]:.0f} rps" if ok else
+                      f"\nSaturated at the first stage ({saturation['reason']})")
+            else:
+                print(f"\nNo saturation up to {stages[-1]:.0f} rps")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'stages': reports, 'saturation': saturation}, f, indent=2)
+    finally:
+        proc.terminate()
+        proc.wait()
+        if os.path.exists(args.population):
+            os.remove(args.population)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Rebuild assessment_summaries/{userId} from the full assessments collection.
+
+Summaries are otherwise created lazily: a student's first assessment write or
+insights view after deploying per-student summaries builds theirs from the
+stored history. Run this to backfill every student up front (so risk dashboards
+see students who have not been active since), or whenever summaries need
+repairing. Reads every assessment once.
+
+Usage (from python_backend/):
+    python tools/rebuild_assessment_summaries.py [--user UID] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from assessment import assessment_index  # noqa: E402
+from storage.batch_writer import commit_batched  # noqa: E402
+
+load_dotenv()
+
+# Only what the summary needs is kept per assessment while grouping
+FIELDS = ('user_id', 'userId', 'type', 'score', 'severity', 'timestamp', 'createdAt', 'suicide_risk')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--user', help='rebuild a single student')
+    parser.add_argument('--dry-run', action='store_true', help='print counts without writing')
+    args = parser.parse_args()
+
+    import app as backend
+
+    db = backend.db
+    if not db:
+        raise SystemExit("Database not available")
+
+    started = time.perf_counter()
+    by_user = defaultdict(dict)
+    collection = db.collection('assessments')
+    queries = ([collection.where(field, '==', args.user) for field in ('user_id', 'userId')]
+               if args.user else [collection])
+    scanned = 0
+    for query in queries:
+        for doc in query.stream():
+            data = doc.to_dict() or {}
+            scanned += 1
+            user_id = data.get('user_id') or data.get('userId')
+            if user_id:
+                by_user[user_id][doc.id] = {k: data[k] for k in FIELDS if k in data}
+
+    summaries = [(db.collection(assessment_index.SUMMARY_COLLECTION).document(user_id),
+                  assessment_index.build_summary(user_id, docs.items()))
+                 for user_id, docs in by_user.items()]
+    print(f"{scanned} assessments, {len(summaries)} students ({time.perf_counter() - started:.1f}s)")
+    if args.dry_run:
+        return
+    written = commit_batched(db, summaries)
+    print(f"wrote {written} summaries ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import importlib
+import sys
+import threading
+import types
+from typing import Any, Callable
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module placeholder that performs the real import on first attribute access.
+
+    Use for heavy or optional dependencies that are not needed on every code
+    path: ``textblob = lazy_import('textblob')`` costs nothing until
+    ``textblob.TextBlob`` is touched. A missing package raises ImportError
+    at that point instead of at startup.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return ``name`` if already imported, else a LazyModule that imports it on first use."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+class LazyObject:
+    """
+    Proxy that builds its target with ``factory()`` on first use.
+
+    Attribute access and truth tests are forwarded, so module-level singletons
+    such as the Firestore client (``if not db: ...``) keep working unchanged
+    while their construction moves off the import path.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_resolved', False)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _resolve(self) -> Any:
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    object.__setattr__(self, '_target', self._factory())
+                    object.__setattr__(self, '_resolved', True)
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._resolve(), name, value)
+
+    def __bool__(self) -> bool:
+        return bool(self._resolve())
+
+    def __repr__(self) -> str:
+        if self._resolved:
+            return repr(self._target)
+        return f"<LazyObject {getattr(self._factory, '__name__', self._factory)!r} (unresolved)>"
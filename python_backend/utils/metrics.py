@@ -0,0 +1,153 @@
+import functools
+import inspect
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+try:
+    import prometheus_client
+except ImportError:  # metrics become no-ops
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# Request latencies span ~1ms (cached GETs) to tens of seconds (LLM calls)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Crisis escalations: paging should take well under a second, acknowledgement takes minutes
+ESCALATION_NOTIFY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ESCALATION_ACK_BUCKETS = (15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        'http_request_duration_seconds', 'HTTP request latency by route',
+        ['method', 'route', 'status'], buckets=LATENCY_BUCKETS)
+    REQUESTS_IN_FLIGHT = prometheus_client.Gauge(
+        'http_requests_in_flight', 'Requests currently being handled',
+        ['route'], multiprocess_mode='livesum')
+    SPAN_LATENCY = prometheus_client.Histogram(
+        'backend_span_duration_seconds', 'Latency of calls made while handling requests',
+        ['span', 'outcome'], buckets=LATENCY_BUCKETS)
+    ESCALATION_LATENCY = {
+        'notify': prometheus_client.Histogram(
+            'escalation_time_to_notify_seconds', 'Time from escalation to counsellors being paged',
+            ['severity'], buckets=ESCALATION_NOTIFY_BUCKETS),
+        'ack': prometheus_client.Histogram(
+            'escalation_time_to_ack_seconds', 'Time from escalation to a counsellor acknowledging it',
+            ['severity'], buckets=ESCALATION_ACK_BUCKETS),
+    }
+    ADMISSION_REJECTED = prometheus_client.Counter(
+        'admission_rejected_total', 'Requests refused by admission control',
+        ['limiter', 'reason'])
+else:
+    REQUEST_LATENCY = REQUESTS_IN_FLIGHT = SPAN_LATENCY = ADMISSION_REJECTED = None
+    ESCALATION_LATENCY = {}
+
+
+def observe_span(name: str, seconds: float, outcome: str = 'ok'):
+    if SPAN_LATENCY is not None:
+        SPAN_LATENCY.labels(name, outcome).observe(seconds)
+
+
+def observe_escalation(stage: str, severity: str, seconds: float):
+    """Record time-to-notify (stage 'notify') or time-to-acknowledge (stage 'ack') of an escalation."""
+    histogram = ESCALATION_LATENCY.get(stage)
+    if histogram is not None:
+        histogram.labels(severity).observe(seconds)
+
+
+def count_rejection(limiter: str, reason: str):
+    if ADMISSION_REJECTED is not None:
+        ADMISSION_REJECTED.labels(limiter, reason).inc()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block as a sub-span of the current request.
+
+    Usage:
+        with span('smtp.send'):
+            server.sendmail(...)
+    """
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        observe_span(name, time.perf_counter() - start, outcome)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of span(); generators are timed until exhausted."""
+    def decorator(fn: Callable) -> Callable:
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                with span(name):
+                    yield from fn(*args, **kwargs)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _timed_method(cls, method: str, name: str, generator: bool = False):
+    original = getattr(cls, method, None)
+    if original is None or getattr(original, '_metrics_wrapped', False):
+        return
+    if generator:
+        @functools.wraps(original)
+        def wrapper(self, *args, **kwargs):
+            with span(name):
+                yield from original(self, *args, **kwargs)
+    else:
+        @functools.wraps(original)
+        def wrapper(self, *args, **kwargs):
+            with span(name):
+                return original(self, *args, **kwargs)
+    wrapper._metrics_wrapped = True
+    setattr(cls, method, wrapper)
+
+
+def instrument_firestore():
+    """
+    Record a span for every Firestore round trip without touching call sites.
+
+    Only leaf methods are wrapped (collection.add/stream and query.get delegate
+    to them), so each RPC is observed exactly once.
+    """
+    if prometheus_client is None:
+        return
+    try:
+        from google.cloud.firestore_v1 import batch, document, query, transaction
+    except ImportError as e:
+        logger.warning(f"Firestore instrumentation unavailable: {e}")
+        return
+    for method in ('get', 'create', 'set', 'update', 'delete'):
+        _timed_method(document.DocumentReference, method, f'firestore.document.{method}')
+    _timed_method(query.Query, 'stream', 'firestore.query.stream', generator=True)
+    _timed_method(batch.WriteBatch, 'commit', 'firestore.batch.commit')
+    _timed_method(transaction.Transaction, '_commit', 'firestore.transaction.commit')
+
+
+def render_latest() -> Optional[tuple]:
+    """Return (body, content_type) in Prometheus text format, or None if metrics are disabled."""
+    if prometheus_client is None:
+        return None
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,72 @@
+import gzip
+import logging
+from typing import Optional
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+
+class ResponseCompressor:
+    """
+    Negotiated brotli/gzip compression for responses above a size threshold.
+
+    Small bodies are sent as-is: below ~1 KB the framing overhead and CPU cost
+    outweigh the bytes saved. Streaming and already-encoded responses are left alone.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, min_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.after_request(self.compress_response)
+
+    def choose_encoding(self, accept_encoding) -> Optional[str]:
+        """Pick the best encoding the client accepts (brotli first when installed)."""
+        if brotli is not None and accept_encoding['br']:
+            return 'br'
+        if accept_encoding['gzip']:
+            return 'gzip'
+        return None
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level)
+
+    def compress_response(self, response: Response) -> Response:
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        try:
+            compressed = self.compress(data, encoding)
+        except Exception as e:
+            logger.warning(f"{encoding} compression failed: {e}")
+            return response
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # Encoded bytes differ per encoding, so a strong validator would be wrong here
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
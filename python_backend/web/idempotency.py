@@ -0,0 +1,245 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Flask, Response, g, jsonify, request
+
+from storage import errors as storage_errors
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+MAX_KEY_LENGTH = 255
+# Firestore documents are capped at 1 MiB; larger responses are not stored
+MAX_STORED_BODY = 256 * 1024
+# Transient refusals and server errors are not stored, so the retry runs again. 409 is
+# "changed concurrently / still in progress, retry": replaying it would make the retry fail forever
+RETRYABLE_STATUSES = (408, 409, 425, 429)
+
+
+class IdempotencyKeys:
+    """
+    Honour an ``Idempotency-Key`` header on write requests: the first request
+    with a key runs and its response is stored; retries with the same key get
+    the stored response back (with ``Idempotent-Replayed: true``) without
+    running the view again, so no second document, notification or email.
+
+    Responses live in a per-process LRU for instant replays and in the
+    ``collection`` Firestore collection so a retry landing on another worker
+    is answered too. The Firestore document is created before the view runs
+    and doubles as a lock: a concurrent duplicate gets ``409`` until the first
+    finishes. The lock is a ``lease`` that a background thread extends every
+    ``lease / 3`` seconds while the view runs, so a slow request keeps it however
+    long it takes, and a worker that dies frees it after at most ``lease``.
+    Entries expire after ``ttl`` seconds (set a Firestore TTL policy on
+    ``expiresAt`` to have them deleted). A key reused with a different body
+    gets ``422``.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, db_provider: Callable[[], Any] = lambda: None,
+                 ttl: float = 24 * 3600, lease: float = 60, max_entries: int = 10000,
+                 collection: str = 'idempotency_keys'):
+        self._db = db_provider
+        self.ttl = ttl
+        self.lease = lease
+        self.max_entries = max_entries
+        self.collection = collection
+        self._cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Claims this process is running: scoped key -> (reference, update time of our last write)
+        self._held: Dict[str, Tuple[Any, Any]] = {}
+        self._renewer: Optional[threading.Thread] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+
+    # ---------------- request hooks ----------------
+
+    def _before(self):
+        key = request.headers.get(HEADER, '').strip()
+        if request.method not in METHODS or not key:
+            return None
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+        scoped = hashlib.sha256(f"{request.method} {request.path} {key}".encode('utf-8')).hexdigest()
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+        entry = self._cached(scoped)
+        if entry is None:
+            try:
+                entry = self._claim(scoped, fingerprint)
+            except Exception as e:
+                # Without the shared store the request still runs; only deduplication is lost
+                logger.warning(f"Idempotency claim failed, running request without it: {e}")
+                return None
+        if entry is None:
+            g._idempotency = (scoped, fingerprint)
+            return None
+        if entry.get('fingerprint') != fingerprint:
+            return jsonify({'error': f'{HEADER} was already used with a different request'}), 422
+        if entry.get('state') != 'completed':
+            response = jsonify({'error': f'A request with this {HEADER} is still in progress'})
+            response.headers['Retry-After'] = '1'
+            return response, 409
+        return self._replay(entry)
+
+    def _after(self, response: Response) -> Response:
+        claim = g.pop('_idempotency', None)
+        if claim is None:
+            return response
+        scoped, fingerprint = claim
+        self._unhold(scoped)
+        try:
+            if (response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES
+                    or response.is_streamed or response.direct_passthrough):
+                self._release(scoped)
+                return response
+            body = response.get_data(as_text=True)
+            if len(body) > MAX_STORED_BODY:
+                self._release(scoped)
+                return response
+            self._complete(scoped, {
+                'state': 'completed',
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'mimetype': response.mimetype,
+                'body': body,
+            })
+        except Exception as e:
+            logger.warning(f"Storing idempotent response failed: {e}")
+        return response
+
+    def _teardown(self, exc):
+        # The view raised before a response existed: free the key so a retry can run
+        claim = g.pop('_idempotency', None)
+        if claim is not None:
+            self._unhold(claim[0])
+            try:
+                self._release(claim[0])
+            except Exception as e:
+                logger.warning(f"Releasing idempotency key failed: {e}")
+
+    @staticmethod
+    def _replay(entry: Dict[str, Any]) -> Response:
+        response = Response(entry.get('body', ''), status=entry.get('status', 200),
+                            mimetype=entry.get('mimetype') or 'application/json')
+        response.headers[REPLAYED_HEADER] = 'true'
+        return response
+
+    # ---------------- storage ----------------
+
+    def _cached(self, scoped: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(scoped)
+            if entry is None:
+                return None
+            if entry['expires'] <= time.monotonic():
+                del self._cache[scoped]
+                return None
+            self._cache.move_to_end(scoped)
+            return entry
+
+    def _remember(self, scoped: str, entry: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._cache[scoped] = dict(entry, expires=time.monotonic() + ttl)
+            self._cache.move_to_end(scoped)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _claim(self, scoped: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Reserve the key; None when reserved, else the existing entry."""
+        db = self._db()
+        if not db:
+            return None
+        ref = db.collection(self.collection).document(scoped)
+        now = datetime.now()
+        claim = {'state': 'in_progress', 'fingerprint': fingerprint, 'createdAt': now,
+                 'expiresAt': now + timedelta(seconds=self.lease)}
+        try:
+            self._hold(scoped, ref, ref.create(claim).update_time)
+            return None
+        except storage_errors.AlreadyExists:
+            pass
+        snap = ref.get()
+        entry = snap.to_dict() if snap.exists else None
+        expires_at = entry.get('expiresAt') if entry else None
+        if entry is None or (isinstance(expires_at, datetime) and expires_at.replace(tzinfo=None) <= now):
+            # Expired entry or abandoned claim (its worker died): take it over, unless someone else just did
+            try:
+                if snap.exists:
+                    result = ref.update(claim, option=db.write_option(last_update_time=snap.update_time))
+                else:
+                    result = ref.create(claim)
+                self._hold(scoped, ref, result.update_time)
+                return None
+            except (storage_errors.AlreadyExists, storage_errors.FailedPrecondition, storage_errors.NotFound):
+                return {'state': 'in_progress', 'fingerprint': fingerprint}
+        if entry.get('state') == 'completed':
+            remaining = (expires_at.replace(tzinfo=None) - now).total_seconds() if isinstance(expires_at, datetime) else self.ttl
+            self._remember(scoped, entry, min(self.ttl, remaining))
+        return entry
+
+    def _complete(self, scoped: str, entry: Dict[str, Any]):
+        self._remember(scoped, entry, self.ttl)
+        db = self._db()
+        if db:
+            now = datetime.now()
+            db.collection(self.collection).document(scoped).set(
+                dict(entry, createdAt=now, expiresAt=now + timedelta(seconds=self.ttl)))
+
+    def _release(self, scoped: str):
+        db = self._db()
+        if db:
+            db.collection(self.collection).document(scoped).delete()
+
+    # ---------------- lease renewal ----------------
+
+    def _hold(self, scoped: str, ref: Any, update_time: Any):
+        with self._lock:
+            self._held[scoped] = (ref, update_time)
+            if self._renewer is None:
+                self._renewer = threading.Thread(target=self._renew_loop, name='idempotency-lease-renewer',
+                                                 daemon=True)
+                self._renewer.start()
+
+    def _unhold(self, scoped: str):
+        with self._lock:
+            self._held.pop(scoped, None)
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(self.lease / 3)
+            try:
+                self._renew()
+            except Exception as e:
+                logger.warning(f"Renewing idempotency leases failed: {e}")
+
+    def _renew(self):
+        with self._lock:
+            held = list(self._held.items())
+        db = self._db() if held else None
+        if not db:
+            return
+        for scoped, (ref, update_time) in held:
+            try:
+                # Conditional on our own last write: a completed, released or taken-over claim is left alone
+                result = ref.update({'expiresAt': datetime.now() + timedelta(seconds=self.lease)},
+                                    option=db.write_option(last_update_time=update_time))
+            except (storage_errors.FailedPrecondition, storage_errors.NotFound):
+                with self._lock:
+                    if self._held.get(scoped, (None, None))[1] == update_time:
+                        del self._held[scoped]
+                continue
+            with self._lock:
+                if scoped in self._held:
+                    self._held[scoped] = (ref, result.update_time)
@@ -0,0 +1,72 @@
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from flask import Response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for values neither serializer handles natively (Firestore types included)."""
+    if isinstance(obj, (datetime, date)):
+        # Covers Firestore's DatetimeWithNanoseconds, which orjson rejects as a subclass
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, 'latitude') and hasattr(obj, 'longitude'):  # GeoPoint
+        return {'latitude': obj.latitude, 'longitude': obj.longitude}
+    if hasattr(obj, 'path') and hasattr(obj, 'id'):  # DocumentReference
+        return obj.path
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed, stdlib json otherwise.
+
+    Datetimes are emitted as ISO-8601 strings by both backends (Flask's default
+    provider uses HTTP dates), so switching backends never changes the payload.
+    ``response()`` builds the body as bytes to skip the str round trip.
+    """
+
+    mimetype = 'application/json'
+
+    def __init__(self, app, backend: str = 'auto'):
+        super().__init__(app)
+        if backend == 'orjson' and orjson is None:
+            logger.warning("orjson requested but not installed; using stdlib json")
+        self.use_orjson = orjson is not None and backend in ('auto', 'orjson')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.dump_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if self.use_orjson:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def dump_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        if self.use_orjson:
+            option = orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_default, option=option)
+        if indent:
+            return json.dumps(obj, default=_default, ensure_ascii=False, indent=2).encode('utf-8')
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self.dump_bytes(obj, indent=self._app.debug)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,63 @@
+import gzip
+import hashlib
+from typing import Any, Callable, Optional
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class PrebuiltPayload:
+    """
+    A JSON payload serialized and compressed once, then served as stored bytes.
+
+    The content hash is the version: it is the ETag and, passed back as ``?v=``,
+    marks a URL whose body can never change, so it is cached as immutable.
+    Compression uses the slowest, smallest settings since it happens only once.
+    """
+
+    def __init__(self, payload: Any, dumps: Callable[[Any], str]):
+        self.body = dumps(payload).encode('utf-8')
+        self.version = hashlib.sha256(self.body).hexdigest()[:20]
+        self.encoded = {'gzip': gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.body, quality=11)
+
+    def choose_encoding(self) -> Optional[str]:
+        accept = request.accept_encodings
+        if 'br' in self.encoded and accept['br']:
+            return 'br'
+        if accept['gzip']:
+            return 'gzip'
+        return None
+
+    def respond(self, max_age: int, location: Optional[str] = None, vary: tuple = ()) -> Response:
+        """
+        Serve the payload (or 304). Requests carrying ``v`` equal to the current
+        version are cached for a year as immutable; others get ``max_age`` and a
+        Content-Location naming the versioned URL.
+        """
+        immutable = request.args.get('v') == self.version
+        if request.if_none_match.contains_weak(self.version):
+            response = Response(status=304)
+        else:
+            encoding = self.choose_encoding()
+            response = Response(self.encoded[encoding] if encoding else self.body, mimetype='application/json')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(self.version, weak=True)
+        response.vary.add('Accept-Encoding')
+        for header in vary:
+            response.vary.add(header)
+        if immutable:
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = f'public, max-age={max_age}'
+            if location:
+                response.headers['Content-Location'] = location
+        return response
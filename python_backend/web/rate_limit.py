@@ -0,0 +1,115 @@
+"""
+Admission control for expensive endpoints.
+
+A token bucket refills continuously at ``rate`` tokens per second up to
+``burst``; each request takes one token or is refused with the time until the
+next token, which becomes the 429's Retry-After. ``Admission`` combines a bucket
+per caller, one shared bucket and a cap on concurrent upstream calls, so a few
+noisy clients cannot occupy every worker thread or exhaust the upstream quota.
+
+All state is per process: with several gunicorn workers the effective limits
+are the configured ones times the worker count.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from utils.metrics import count_rejection
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class Admission:
+    """
+    Per-key and global token buckets plus an in-flight cap. A rate of 0
+    disables that bucket; max_in_flight=0 disables the cap.
+
+    Usage:
+        refused = admission.enter(key)
+        if refused:
+            reason, retry_after = refused   # reason: 'user', 'global' or 'busy'
+            ...429...
+        try:
+            call_upstream()
+        finally:
+            admission.leave(elapsed)
+    """
+
+    def __init__(self, name: str, user_rate: float, user_burst: float, global_rate: float = 0,
+                 global_burst: float = 0, max_in_flight: int = 0, max_users: int = 10000):
+        self.name = name
+        self.user_rate = user_rate
+        self.user_burst = max(1.0, user_burst)
+        self.max_in_flight = max_in_flight
+        self.max_users = max_users
+        self._global = TokenBucket(global_rate, max(1.0, global_burst)) if global_rate > 0 else None
+        # Least recently seen first; an evicted caller simply starts again with a full bucket
+        self._users: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        # Moving average of upstream call time, used as Retry-After when every slot is busy
+        self._avg_seconds = 1.0
+
+    def enter(self, key: str, bypass: bool = False) -> Optional[Tuple[str, float]]:
+        """
+        Admit a request for key, taking a token from each bucket and an in-flight
+        slot. Returns None when admitted, else (reason, retry_after_seconds).
+        bypass=True always admits without spending tokens (the slot still counts).
+        """
+        with self._lock:
+            if not bypass:
+                refused = self._check(key)
+                if refused:
+                    count_rejection(self.name, refused[0])
+                    return refused
+            self.in_flight += 1
+            return None
+
+    def _check(self, key: str) -> Optional[Tuple[str, float]]:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return 'busy', self._avg_seconds
+        now = time.monotonic()
+        user = None
+        if self.user_rate > 0:
+            user = self._users.get(key)
+            if user is None:
+                user = self._users[key] = TokenBucket(self.user_rate, self.user_burst, now)
+                if len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(key)
+            wait = user.wait_time(now)
+            if wait > 0:
+                return 'user', wait
+        if self._global is not None:
+            wait = self._global.wait_time(now)
+            if wait > 0:
+                return 'global', wait
+            self._global.take()
+        if user is not None:
+            user.take()
+        return None
+
+    def leave(self, seconds: float):
+        with self._lock:
+            self.in_flight -= 1
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
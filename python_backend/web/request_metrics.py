@@ -0,0 +1,67 @@
+import hmac
+import os
+import time
+from typing import Optional
+
+from flask import Flask, Response, g, request
+
+from utils.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, render_latest
+
+
+class RequestMetrics:
+    """
+    Per-route latency histograms, status codes and in-flight gauges for a Flask app,
+    exposed in Prometheus text format at ``endpoint``.
+
+    Routes are labelled by their URL rule (``/api/counsellor/appointments/<appointment_id>/status``)
+    so label cardinality stays bounded. Set METRICS_TOKEN to require
+    ``Authorization: Bearer <token>`` on the metrics endpoint.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, endpoint: str = '/metrics'):
+        self.endpoint = endpoint
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        if REQUEST_LATENCY is None:
+            app.logger.warning("prometheus_client not installed; request metrics disabled")
+            return
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.add_url_rule(self.endpoint, 'metrics', self.metrics_view, methods=['GET'])
+
+    @staticmethod
+    def _route() -> str:
+        rule = request.url_rule
+        return rule.rule if rule is not None else '<unmatched>'
+
+    def _before(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_route = self._route()
+        REQUESTS_IN_FLIGHT.labels(g._metrics_route).inc()
+
+    def _after(self, response: Response) -> Response:
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown(self, exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        route = g.pop('_metrics_route')
+        status = g.pop('_metrics_status', 500)
+        REQUESTS_IN_FLIGHT.labels(route).dec()
+        REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - start)
+
+    def metrics_view(self):
+        token = os.getenv('METRICS_TOKEN')
+        if token:
+            supplied = request.headers.get('Authorization', '')
+            if supplied.startswith('Bearer '):
+                supplied = supplied[len('Bearer '):].strip()
+            if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+                return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        body, content_type = render_latest()
+        return Response(body, content_type=content_type)
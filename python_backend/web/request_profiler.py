@@ -0,0 +1,217 @@
+import cProfile
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import Flask, Response, abort, g, jsonify, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sample')
+_FILENAME_RE = re.compile(r'^[\w.-]+\.(prof|collapsed)$')
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a helper thread.
+
+    Output is in collapsed-stack format (``frame;frame;frame count`` per line),
+    ready for flamegraph.pl, speedscope or inferno.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class RequestProfiler:
+    """
+    Admin-gated, on-demand profiling of individual requests.
+
+    A request carrying ``X-Admin-Token: $PROFILER_TOKEN`` plus either the
+    ``X-Profile`` header or the ``__profile`` query parameter (``cprofile``
+    or ``sample``) runs under that profiler; nothing changes for other requests.
+    The result is written to ``output_dir`` named after the time, route and
+    request id, and the response carries ``X-Profile-Id`` with the file name.
+    Recent profiles are listed at ``/api/admin/profiles`` and downloaded from
+    ``/api/admin/profiles/<name>``. Profiling is disabled while PROFILER_TOKEN is unset.
+
+    Only one request per process is profiled at a time. Since Python 3.12,
+    cProfile registers through sys.monitoring, which allows a single active
+    profiler per interpreter, so a second concurrent ``cprofile`` request under
+    gthread workers would fail (or, on older versions, be mixed into the
+    first). A profiling request that arrives while another is running gets
+    ``409`` with ``Retry-After`` instead.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, output_dir: str = 'profiles',
+                 keep: int = 50, sample_interval: float = 0.001):
+        self.output_dir = os.path.abspath(output_dir)
+        self.keep = keep
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.add_url_rule('/api/admin/profiles', 'list_profiles', self.list_view, methods=['GET'])
+        app.add_url_rule('/api/admin/profiles/<name>', 'download_profile', self.download_view, methods=['GET'])
+
+    @staticmethod
+    def authorized() -> bool:
+        token = os.getenv('PROFILER_TOKEN')
+        supplied = request.headers.get('X-Admin-Token', '')
+        return bool(token) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+    def _requested_mode(self) -> Optional[str]:
+        mode = request.headers.get('X-Profile') or request.args.get('__profile')
+        if not mode:
+            return None
+        mode = mode.lower()
+        return mode if mode in PROFILE_MODES else None
+
+    def _before(self):
+        mode = self._requested_mode()
+        if mode is None or not self.authorized():
+            return None
+        if not self._active.acquire(blocking=False):
+            return self._busy()
+        try:
+            if mode == 'cprofile':
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                profiler = StackSampler(threading.get_ident(), self.sample_interval)
+                profiler.start()
+        except ValueError:
+            # Another profiler (e.g. a debugger or coverage tool) already owns the interpreter
+            self._active.release()
+            return self._busy()
+        g._profile_mode = mode
+        g._profile_request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+        g._profile_started = time.perf_counter()
+        g._profiler = profiler
+        return None
+
+    @staticmethod
+    def _busy():
+        response = jsonify({'error': 'Another request is being profiled, try again shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 409
+
+    def _after(self, response: Response) -> Response:
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return response
+        elapsed_ms = (time.perf_counter() - g.pop('_profile_started')) * 1000
+        mode = g.pop('_profile_mode')
+        request_id = g.pop('_profile_request_id')
+        try:
+            self._stop(profiler)
+            name = self._save(profiler, mode, request_id)
+            response.headers['X-Profile-Id'] = name
+            logger.info(f"Profiled {request.method} {request.path} ({mode}, {elapsed_ms:.1f} ms) -> {name}")
+        except Exception as e:
+            logger.error(f"Failed to save profile: {e}")
+        return response
+
+    def _teardown(self, exc):
+        # Unhandled exceptions skip after_request; never leave a profiler running
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return
+        self._stop(profiler)
+
+    def _stop(self, profiler):
+        try:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+            else:
+                profiler.stop()
+        finally:
+            self._active.release()
+
+    def _save(self, profiler, mode: str, request_id: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        route = re.sub(r'[^\w-]+', '_', rule).strip('_') or 'root'
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        safe_id = re.sub(r'[^\w-]+', '', request_id)[:40] or uuid.uuid4().hex[:12]
+        ext = 'prof' if mode == 'cprofile' else 'collapsed'
+        name = f"{stamp}_{route}_{safe_id}.{ext}"
+        path = os.path.join(self.output_dir, name)
+        if mode == 'cprofile':
+            profiler.dump_stats(path)
+        else:
+            with open(path, 'w') as f:
+                f.write(profiler.collapsed())
+        self._prune()
+        return name
+
+    def _prune(self):
+        with self._lock:
+            files = self._profiles()
+            for entry in files[self.keep:]:
+                try:
+                    os.remove(os.path.join(self.output_dir, entry['name']))
+                except OSError:
+                    pass
+
+    def _profiles(self) -> List[Dict]:
+        if not os.path.isdir(self.output_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.output_dir):
+            if not _FILENAME_RE.match(name):
+                continue
+            st = os.stat(os.path.join(self.output_dir, name))
+            entries.append({'name': name, 'size': st.st_size, 'createdAt': datetime.fromtimestamp(st.st_mtime)})
+        entries.sort(key=lambda e: e['createdAt'], reverse=True)
+        return entries
+
+    def list_view(self):
+        if not self.authorized():
+            abort(404)
+        return jsonify({'profiles': self._profiles()})
+
+    def download_view(self, name: str):
+        if not self.authorized() or not _FILENAME_RE.match(name):
+            abort(404)
+        return send_from_directory(self.output_dir, name, as_attachment=True)
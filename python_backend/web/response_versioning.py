@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Response, current_app, request
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseVersioner:
+    """
+    Conditional GET support for read-heavy JSON endpoints.
+
+    Each cached entry holds the serialized body, a weak ETag derived from the
+    source data version (document update times, rollup counters, ...) and an
+    expiry. Within ``max_age`` polls are answered from memory without touching
+    Firestore; afterwards an optional cheap probe decides whether the body can
+    be reused. Clients sending a matching ``If-None-Match`` get a bodyless 304.
+
+    Entries live in this process only, and so does ``invalidate``. With several
+    workers, the others keep serving their entry (and its ETag) until it
+    expires, so ``max_age`` is also how stale another worker's answer can be.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_etag(version: Any) -> str:
+        """Hash an arbitrary (JSON-able) version description into an ETag value."""
+        raw = json.dumps(version, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+    def respond(self, key: str, max_age: int,
+                build: Callable[[], Tuple[Any, Any]],
+                probe: Optional[Callable[[], Any]] = None) -> Response:
+        """
+        Serve ``key`` with ETag/Cache-Control headers.
+
+        Args:
+            key: Cache key, usually route name plus the identifying query args
+            max_age: Seconds the response may be reused without revalidation
+            build: Returns (payload, version) by reading the source data
+            probe: Optional cheap read returning only the current version
+
+        Returns:
+            A 200 JSON response or a 304 when the client copy is current
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None or entry['expires'] <= now:
+            version = None
+            if entry is not None and probe is not None:
+                try:
+                    version = probe()
+                except Exception as e:
+                    logger.warning(f"version probe failed for {key}: {e}")
+            if entry is not None and version is not None and version == entry['version']:
+                entry = dict(entry, expires=now + max_age)
+            else:
+                payload, version = build()
+                entry = {
+                    'version': version,
+                    'etag': self.make_etag(version),
+                    'body': current_app.json.dumps(payload),
+                    'expires': now + max_age,
+                }
+            self._store(key, entry)
+
+        return self._conditional(entry, max_age)
+
+    def invalidate(self, key: str):
+        """Drop ``key`` and every entry nested under it (``key:...``)."""
+        nested = key + ':'
+        with self._lock:
+            for k in [k for k in self._entries if k == key or k.startswith(nested)]:
+                del self._entries[k]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _conditional(self, entry: Dict[str, Any], max_age: int) -> Response:
+        if request.if_none_match.contains_weak(entry['etag']):
+            response = Response(status=304)
+        else:
+            response = Response(entry['body'], mimetype='application/json')
+        response.set_etag(entry['etag'], weak=True)
+        response.headers['Cache-Control'] = f'private, max-age={max_age}'
+        return response
@@ -19,8 +19,8 @@ import {
   increment,
   
 } from 'firebase/firestore';
-import { db, storage } from './config';
-import { apiJson } from '../utils/api';
+import { auth, db, storage } from './config';
+import { apiJson, apiUrl } from '../utils/api';
 import { ref as storageRef, uploadBytes, getDownloadURL } from 'firebase/storage';
 
 // Collections
@@ -246,6 +246,28 @@ export const rescheduleAppointment = async (appointmentId, { appointmentDate, ap
   }
 };
 
+// Apply many counsellor actions in one request.
+// actions: [{ appointmentId, action: 'approve'|'confirm'|'cancel'|'pending'|'reschedule', appointmentDate?, appointmentTime? }]
+// Each result is 'ok', 'not_found', 'forbidden', 'conflict' (changed meanwhile, retry) or 'error'.
+export const bulkAppointmentActions = async (counsellorId, actions) => {
+  try {
+    const res = await apiJson('/api/counsellor/appointments/bulk', 'POST', { counsellorId, actions });
+    return { success: true, results: res.results || [], updated: res.updated || 0 };
+  } catch (error) {
+    return { success: false, error: error.message };
+  }
+};
+
+// Take a crisis escalation (stops further paging). Fails with status 409 if another counsellor took it first.
+export const acknowledgeEscalation = async (escalationId, counsellorId) => {
+  try {
+    const res = await apiJson(`/api/escalation/${encodeURIComponent(escalationId)}/ack`, 'POST', { counsellorId });
+    return { success: true, acknowledgedBy: res.acknowledgedBy };
+  } catch (error) {
+    return { success: false, error: error.message, acknowledgedBy: error.data?.acknowledgedBy };
+  }
+};
+
 // Toggle availability slot 'active' flag by counsellor
 // (moved to bottom section: see Counsellor-specific helpers)
 
@@ -399,6 +421,50 @@ export const subscribeNotifications = (userId, onData, onError = console.error,
   }, onError);
 };
 
+// Server-pushed notifications: onNotification(item) once per new notification.
+// EventSource reconnects by itself and resumes from the last received id; if the
+// backend is unreachable or at its stream limit, falls back to the Firestore listener.
+export const streamNotifications = (userId, onNotification, onError = console.error) => {
+  if (!userId) return () => {};
+  let fallback = null;
+  // The listener's first snapshot is history; only notifications arriving after it are passed on
+  const listen = () => {
+    let seen = null;
+    return subscribeNotifications(userId, (items) => {
+      if (seen) items.filter(n => !seen.has(n.id)).reverse().forEach(onNotification);
+      seen = new Set(items.map(n => n.id));
+    }, onError);
+  };
+  if (typeof EventSource === 'undefined') return listen();
+  let source = null;
+  let lastId = null;
+  let stopped = false;
+  // EventSource cannot send headers, so the ID token goes in the query string
+  const connect = async () => {
+    let token = null;
+    try { token = auth.currentUser ? await auth.currentUser.getIdToken() : null; } catch (err) { onError(err); }
+    if (stopped) return;
+    if (!token) { fallback = listen(); return; }
+    const params = new URLSearchParams({ userId, token });
+    if (lastId) params.set('lastEventId', lastId);
+    const current = source = new EventSource(apiUrl(`/api/notifications/stream?${params}`));
+    let opened = false;
+    current.onopen = () => { opened = true; };
+    current.addEventListener('notification', (e) => {
+      lastId = e.lastEventId || lastId;
+      try { onNotification(JSON.parse(e.data)); } catch (err) { onError(err); }
+    });
+    current.onerror = () => {
+      // CLOSED means the browser gave up; OPEN/CONNECTING are normal reconnects. After a working
+      // stream that is usually a 401 for an expired token, so retry with a fresh one; else (503, 403) poll
+      if (current.readyState !== EventSource.CLOSED || stopped || fallback) return;
+      if (opened) connect(); else fallback = listen();
+    };
+  };
+  connect();
+  return () => { stopped = true; if (source) source.close(); if (fallback) fallback(); };
+};
+
 export const searchStudents = async (searchTerm = '', maxItems = 200) => {
   try {
     // Simple approach: fetch recent and filter client-side for demo purposes
@@ -603,6 +669,35 @@ export const subscribeAvailabilitySlots = (counsellorId, dateKey, onData, onErro
   return () => { cancelled = true; if (timer) clearTimeout(timer); };
 };
 
+// Polls a whole date range (inclusive, at most 31 days) in one request: onData([{ dateKey, slots }])
+// Slots are unfiltered (booked and inactive included) so callers can compute their own counts.
+export const subscribeAvailabilityRange = (counsellorId, fromKey, toKey, onData, onError = console.error) => {
+  if (!counsellorId || !fromKey || !toKey) return () => {};
+  let cancelled = false;
+  let timer = null;
+  let intervalMs = 7000;
+  const MIN_INTERVAL = 4000;
+  const MAX_INTERVAL = 30000;
+
+  const scheduleNext = () => { if (!cancelled) timer = setTimeout(fetchOnce, intervalMs); };
+
+  const fetchOnce = async () => {
+    try {
+      const res = await apiJson(`/api/counsellor/availability/range?counsellorId=${encodeURIComponent(counsellorId)}&from=${encodeURIComponent(fromKey)}&to=${encodeURIComponent(toKey)}`, 'GET');
+      if (!cancelled) onData(res.days || []);
+      intervalMs = Math.max(MIN_INTERVAL, Math.floor(intervalMs * 0.9));
+    } catch (e) {
+      if (!cancelled) onError(e);
+      intervalMs = Math.min(MAX_INTERVAL, Math.floor(intervalMs * 2));
+    } finally {
+      scheduleNext();
+    }
+  };
+
+  fetchOnce();
+  return () => { cancelled = true; if (timer) clearTimeout(timer); };
+};
+
 // Realtime availability via Firestore (owner/student read)
 export const subscribeAvailabilitySlotsRealtime = (counsellorId, dateKey, onData, onError = console.error) => {
   try {
@@ -1008,7 +1103,8 @@ export const saveAssessment = async (assessmentData) => {
   try {
     const docRef = await addDoc(collection(db, COLLECTIONS.ASSESSMENTS), {
       ...assessmentData,
-      createdAt: serverTimestamp()
+      createdAt: serverTimestamp(),
+      updatedAt: serverTimestamp()
     });
     return { success: true, id: docRef.id };
   } catch (error) {
@@ -1045,7 +1141,8 @@ export const addMoodScore = async ({ userId, score, mood, note = null, recordedA
       mood: mood || null, // optional label like 'happy', 'sad'
       note, // optional free text
       recordedAt: recordedAt ? recordedAt : serverTimestamp(),
-      createdAt: serverTimestamp()
+      createdAt: serverTimestamp(),
+      updatedAt: serverTimestamp()
     });
     return { success: true, id: docRef.id };
   } catch (error) {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import { createChatSession, sendChatMessage } from '../firebase/firestore';
+import { withAuthFetch } from '../utils/api';
 import { 
   Send, 
   Bot, 
@@ -95,14 +96,19 @@ How are you feeling today?`,
       userId: user.uid
     });
 
-    // Call Python backend
-    const response = await fetch('http://localhost:5000/api/chat', {
+    // Call Python backend (the ID token identifies the caller for rate limiting)
+    const response = await withAuthFetch('/api/chat', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ message: inputMessage, userId: user.uid, session_id: sessionId })
     });
 
     const data = await response.json();
+    if (response.status === 429) {
+      toast.error(`You're sending messages quickly. Please wait ${data.retryAfter || response.headers.get('Retry-After') || 'a few'} seconds.`);
+      setIsLoading(false);
+      setIsTyping(false);
+      return;
+    }
 
     // **Filter out repeated general support messages**
     let botText = data.ai_reply;
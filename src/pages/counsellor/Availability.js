@@ -2,6 +2,7 @@ import React, { useEffect, useMemo, useState } from 'react';
 import { useAuth } from '../../contexts/AuthContext';
 import {
   subscribeAvailabilitySlots,
+  subscribeAvailabilityRange,
   upsertAvailabilitySlot,
   toggleAvailabilityActive,
   deleteAvailabilitySlot
@@ -44,15 +45,18 @@ const Availability = () => {
     return () => unsub && unsub();
   }, [counsellorId, selectedDate]);
 
-  // Load weekly counts by briefly subscribing each day once
+  // Load weekly counts with one range poll for the whole week
   useEffect(() => {
     if (!counsellorId) return;
-    const unsubs = weekDays.map(iso => subscribeAvailabilitySlots(
-      counsellorId, iso,
-      (items) => setWeekCounts(prev => ({ ...prev, [iso]: { total: items.length, booked: items.filter(s=>s.booked).length } })),
+    const unsub = subscribeAvailabilityRange(
+      counsellorId, weekDays[0], weekDays[weekDays.length - 1],
+      (days) => setWeekCounts(Object.fromEntries(days.map(({ dateKey, slots }) => {
+        const active = slots.filter(s => s.active !== false);
+        return [dateKey, { total: active.length, booked: active.filter(s => s.booked).length }];
+      }))),
       (e)=>console.error(e)
-    ));
-    return () => unsubs.forEach(u=>u&&u());
+    );
+    return () => unsub && unsub();
   }, [counsellorId, weekDays.join(',')]);
 
   const addSlot = async () => {
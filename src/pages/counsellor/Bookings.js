@@ -1,6 +1,6 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { useAuth } from '../../contexts/AuthContext';
-import { subscribeAppointments, subscribeNotifications, updateAppointmentStatus, rescheduleAppointment, createChatSession, completeAppointment, startAppointment } from '../../firebase/firestore';
+import { subscribeAppointments, streamNotifications, updateAppointmentStatus, rescheduleAppointment, createChatSession, completeAppointment, startAppointment } from '../../firebase/firestore';
 import { Calendar, Clock, CheckCircle, XCircle, Edit2, Save, X, ChevronLeft, ChevronRight, Mail, MessageCircle } from 'lucide-react';
 import toast from 'react-hot-toast';
 
@@ -50,19 +50,19 @@ const Bookings = () => {
   useEffect(() => {
     if (!user) return;
     let seen = new Set();
-    const unsub = subscribeNotifications(user.uid, (items)=>{
-      items.slice(0, 5).forEach(n => {
-        if (seen.has(n.id)) return;
-        seen.add(n.id);
-        const t = String(n.type||'');
-        if (t === 'appointment_status') {
-          toast.success(n.title || 'Appointment update');
-        } else if (t === 'appointment_deleted') {
-          toast('Appointment cancelled and removed', { icon: '🗑️' });
-        } else if (t === 'appointment_completed') {
-          toast('Student prompted for feedback', { icon: '⭐' });
-        }
-      });
+    const unsub = streamNotifications(user.uid, (n)=>{
+      if (seen.has(n.id)) return;
+      seen.add(n.id);
+      const t = String(n.type||'');
+      if (t === 'appointment_status') {
+        toast.success(n.title || 'Appointment update');
+      } else if (t === 'appointment_deleted') {
+        toast('Appointment cancelled and removed', { icon: '🗑️' });
+      } else if (t === 'appointment_completed') {
+        toast('Student prompted for feedback', { icon: '⭐' });
+      } else if (t === 'escalation') {
+        toast.error(n.title || 'Crisis escalation', { duration: 15000 });
+      }
     }, (err)=>console.error(err));
     return () => unsub && unsub();
   }, [user]);
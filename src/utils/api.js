@@ -2,6 +2,10 @@ import { auth } from '../firebase/config';
 
 const BASE_URL = process.env.REACT_APP_PYTHON_BACKEND_URL || 'http://localhost:5000';
 
+export function apiUrl(path) {
+  return `${BASE_URL}${path}`;
+}
+
 export async function withAuthFetch(path, options = {}) {
   const user = auth.currentUser;
   const token = user ? await user.getIdToken(/* forceRefresh */ false) : null;
@@ -14,10 +18,29 @@ export async function withAuthFetch(path, options = {}) {
   return resp;
 }
 
+function newIdempotencyKey() {
+  if (typeof crypto !== 'undefined' && crypto.randomUUID) return crypto.randomUUID();
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+const WRITE_RETRIES = 2;
+
 export async function apiJson(path, method = 'GET', body = null) {
   const opts = { method };
   if (body != null) opts.body = JSON.stringify(body);
-  const res = await withAuthFetch(path, opts);
+  const isWrite = method !== 'GET';
+  // One key for every attempt, so a write whose response was lost is replayed, not repeated
+  if (isWrite) opts.headers = { 'Idempotency-Key': newIdempotencyKey() };
+  let res;
+  for (let attempt = 0; ; attempt++) {
+    try {
+      res = await withAuthFetch(path, opts);
+      break;
+    } catch (networkError) {
+      if (!isWrite || attempt >= WRITE_RETRIES) throw networkError;
+      await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+  }
   const data = await res.json().catch(() => ({}));
   if (!res.ok) {
     const err = new Error(data?.error || `Request failed: ${res.status}`);
@@ -17,9 +17,10 @@ async function http(method, path, body) {
   return res.json();
 }
 
-export async function fetchQuestions(type) {
+export async function fetchQuestions(type, locale) {
   const t = (type || '').toLowerCase();
-  return http('GET', `/api/assessment/questions?type=${encodeURIComponent(t)}`);
+  const query = locale ? `?locale=${encodeURIComponent(locale)}` : '';
+  return http('GET', `/api/assessment/questions/${encodeURIComponent(t)}${query}`);
 }
 
 export async function submitPHQ9(responses, userId) {
@@ -30,6 +31,15 @@ export async function submitGAD7(responses, userId) {
   return http('POST', '/api/assessment/gad7', { responses, user_id: userId });
 }
 
+// Scores both questionnaires and saves them in a single request
+export async function submitCombined(phq9Responses, gad7Responses, userId) {
+  return http('POST', '/api/assessment/combined', {
+    phq9_responses: phq9Responses,
+    gad7_responses: gad7Responses,
+    user_id: userId,
+  });
+}
+
 export async function submitGHQ12(responses, userId) {
   return http('POST', '/api/assessment/ghq12', { responses, user_id: userId });
 }
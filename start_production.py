@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the MINDLY Python backend.
+
+Unlike start_backend.py this does not install dependencies and does not use the
+Flask development server: it runs gunicorn with python_backend/gunicorn.conf.py,
+which preloads the models in the master and forks worker processes.
+
+Usage:
+    python start_production.py [--workers N] [--threads N] [--bind HOST:PORT]
+    python start_production.py reload    # graceful worker replacement (SIGHUP)
+    python start_production.py stop      # graceful shutdown (SIGTERM)
+"""
+
+import argparse
+import os
+import signal
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python_backend')
+
+
+def read_pid(pidfile):
+    try:
+        with open(pidfile) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def signal_master(pidfile, sig):
+    pid = read_pid(pidfile)
+    if pid is None:
+        print(f"❌ No running backend found (pidfile {pidfile})")
+        sys.exit(1)
+    os.kill(pid, sig)
+    print(f"✅ Sent {signal.Signals(sig).name} to gunicorn master {pid}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the MINDLY backend with gunicorn')
+    parser.add_argument('command', nargs='?', default='start', choices=['start', 'reload', 'stop'])
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--threads', type=int, help='threads per worker (default: 4)')
+    parser.add_argument('--bind', help='address to bind (default: 0.0.0.0:$PORT)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(BACKEND_DIR):
+        print("❌ Error: python_backend directory not found!")
+        sys.exit(1)
+    os.chdir(BACKEND_DIR)
+    pidfile = os.path.abspath(os.getenv('GUNICORN_PIDFILE', 'gunicorn.pid'))
+
+    if args.command == 'reload':
+        signal_master(pidfile, signal.SIGHUP)
+        return
+    if args.command == 'stop':
+        signal_master(pidfile, signal.SIGTERM)
+        return
+
+    if args.workers:
+        os.environ['WEB_CONCURRENCY'] = str(args.workers)
+    if args.threads:
+        os.environ['WORKER_THREADS'] = str(args.threads)
+    if args.bind:
+        os.environ['BIND'] = args.bind
+    os.environ['GUNICORN_PIDFILE'] = pidfile
+
+    print("🚀 Starting MINDLY Python Backend (production)...")
+    # Replace this process so signals reach the gunicorn master directly
+    os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'])
+
+
+if __name__ == "__main__":
+    main()